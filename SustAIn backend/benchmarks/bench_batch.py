@@ -0,0 +1,112 @@
+"""
+/chat/batch vs the same prompts as separate /chat calls.
+
+    python benchmarks/bench_batch.py --users 50 --batch 20 --model-latency-ms 50
+
+Boots the app in-process like bench_load.py (stub model, quotas lifted,
+throwaway database) and sends --users x --batch prompts twice:
+
+- single: one POST /chat per prompt, --concurrency in flight
+- batch:  one POST /chat/batch per user, --concurrency in flight
+
+Reports elapsed time, prompts per second, DB writes and commits per
+prompt, and status codes (per item for the batches).
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+import common
+from bench_load import boot_app
+
+
+async def run_single(client, users, batch, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    statuses = Counter()
+
+    async def one(user, i):
+        async with sem:
+            resp = await client.post("/chat", json={"user_id": user, "message": f"Question {i}: how green is this?"})
+            statuses[resp.status_code] += 1
+
+    await asyncio.gather(*(one(u, i) for u in users for i in range(batch)))
+    return statuses
+
+
+async def run_batch(client, users, batch, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    statuses = Counter()
+
+    async def one(user):
+        messages = [f"Question {i}: how green is this?" for i in range(batch)]
+        async with sem:
+            resp = await client.post("/chat/batch", json={"user_id": user, "messages": messages})
+        if resp.status_code != 200:
+            statuses[resp.status_code] += batch
+            return
+        for item in resp.json()["results"]:
+            statuses[item.get("status", 200)] += 1
+
+    await asyncio.gather(*(one(u) for u in users))
+    return statuses
+
+
+async def run(args):
+    import httpx
+
+    app, engine = boot_app(args.model_latency_ms / 1000.0, unlimited=True)
+    counter = common.DBWriteCounter(engine)
+    prompts = args.users * args.batch
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        while (await client.get("/ready")).status_code != 200:
+            await asyncio.sleep(0.01)
+        await run_single(client, ["warm-up"], 10, 10)
+
+        for mode, fn in (("single", run_single), ("batch", run_batch)):
+            users = [f"{mode}-user-{u}" for u in range(args.users)]
+            writes0, commits0 = counter.snapshot()
+            t0 = time.perf_counter()
+            statuses = await fn(client, users, args.batch, args.concurrency)
+            elapsed = time.perf_counter() - t0
+            writes1, commits1 = counter.snapshot()
+            results[mode] = {
+                "elapsed_s": round(elapsed, 4),
+                "prompts_per_s": round(prompts / elapsed, 1),
+                "db_writes_per_prompt": round((writes1 - writes0) / prompts, 3),
+                "db_commits_per_prompt": round((commits1 - commits0) / prompts, 3),
+                "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+            }
+
+    results["speedup"] = round(results["single"]["elapsed_s"] / results["batch"]["elapsed_s"], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=20, help="prompts per user")
+    parser.add_argument("--concurrency", type=int, default=32, help="HTTP requests in flight")
+    parser.add_argument("--batch-concurrency", type=int, default=8,
+                        help="CHAT_BATCH_CONCURRENCY: model calls in flight per batch")
+    parser.add_argument("--batch-threads", type=int, default=64,
+                        help="CHAT_BATCH_THREADS: threads shared by all batches")
+    parser.add_argument("--model-latency-ms", type=float, default=50.0)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/batch-<commit>.json)")
+    args = parser.parse_args()
+
+    os.environ["CHAT_BATCH_CONCURRENCY"] = str(args.batch_concurrency)
+    os.environ["CHAT_BATCH_THREADS"] = str(args.batch_threads)
+    results = asyncio.run(run(args))
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("batch", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
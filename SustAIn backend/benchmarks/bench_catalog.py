@@ -0,0 +1,145 @@
+"""
+Catalog scoring throughput: images per second on CPU, 10k images.
+
+    python benchmarks/bench_catalog.py --images 10000 --decode-workers 1 3 7 --batch-sizes 8 16
+
+Writes --images synthetic product photos (--size px JPEGs, --unique
+distinct ones repeated) to a temporary directory with a descriptions.csv,
+then scores the whole catalog with catalog.CatalogJob for every
+combination of --decode-workers and --batch-sizes and reports images/s
+and wall time. Each run starts from an empty output directory.
+
+- sequential: the way the catalog would be scored through the endpoint
+              path, one model.score([bytes]) call per image, timed on
+              --sequential-sample images and extrapolated
+- resume:     a run stopped half way, then resumed; images scored twice
+              (should be 0) and total time against an uninterrupted run
+
+The model is a randomly initialised ResNet-18 in the real Grad-CAM
+wrapper unless --weights is given: the cost is the same, the scores are
+meaningless. Requires torch and torchvision.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import common  # noqa: F401  (puts the backend on sys.path)
+
+WORDS = ("plastic bottle", "cardboard box", "aluminum can", "glass jar", "lithium ion battery",
+         "cotton shirt", "steel frame", "paper bag")
+
+
+def make_catalog(root, images, unique, size):
+    import torch
+    from torchvision.io import encode_jpeg
+
+    torch.manual_seed(0)
+    blobs = []
+    for _ in range(unique):
+        # smooth colour fields with noise compress like photos, not like static
+        low = torch.rand(3, 8, 8)
+        img = torch.nn.functional.interpolate(low[None], size=(size, size), mode="bicubic")[0]
+        img = (img + 0.05 * torch.randn(3, size, size)).clamp(0, 1).mul(255).to(torch.uint8)
+        blobs.append(bytes(encode_jpeg(img, quality=85).numpy()))
+    with open(os.path.join(root, "descriptions.csv"), "w") as fh:
+        fh.write("image,description\n")
+        for i in range(images):
+            name = f"product-{i:05d}.jpg"
+            with open(os.path.join(root, name), "wb") as img_fh:
+                img_fh.write(blobs[i % unique])
+            fh.write(f"{name},{WORDS[i % len(WORDS)]} with {WORDS[(i * 7) % len(WORDS)]}\n")
+    return sum(len(b) for b in blobs) / unique
+
+
+def make_model(weights, tmpdir):
+    import torchvision
+
+    import gradcam_model
+
+    if weights is None:
+        weights = os.path.join(tmpdir, "random.safetensors")
+        state = torchvision.models.resnet18(weights=None, num_classes=1).state_dict()
+        gradcam_model.export_weights(state, weights)
+    model = gradcam_model.GradCamModel(weights, batch_sizes=(1, 8, 16, 32))
+    model.warmup()
+    return model
+
+
+def run_job(catalog, source, out_dir, model, decode_workers, batch_size, stop_after=None):
+    job = catalog.CatalogJob(source, out_dir, model=model, decode_workers=decode_workers,
+                             batch_size=batch_size)
+    if stop_after is not None:
+        threading.Timer(stop_after, job.stop).start()
+    t0 = time.perf_counter()
+    progress = job.run()
+    return progress, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=10000)
+    parser.add_argument("--unique", type=int, default=64)
+    parser.add_argument("--size", type=int, default=512, help="image width and height")
+    parser.add_argument("--decode-workers", type=int, nargs="+",
+                        default=sorted({1, max(1, (os.cpu_count() or 2) - 1)}))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16])
+    parser.add_argument("--sequential-sample", type=int, default=200)
+    parser.add_argument("--weights", help="Grad-CAM weights (default: random ResNet-18)")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/catalog-<commit>.json)")
+    args = parser.parse_args()
+
+    import catalog
+
+    results = {"cpu_count": os.cpu_count(), "runs": {}}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "catalog")
+        os.makedirs(source)
+        results["avg_image_bytes"] = round(make_catalog(source, args.images, args.unique, args.size))
+        model = make_model(args.weights, tmpdir)
+
+        # one image per call, as through the endpoint
+        names = sorted(n for n in os.listdir(source) if n.endswith(".jpg"))[:args.sequential_sample]
+        t0 = time.perf_counter()
+        for name in names:
+            with open(os.path.join(source, name), "rb") as fh:
+                model.score([fh.read()])
+        per_image = (time.perf_counter() - t0) / len(names)
+        results["sequential"] = {"images_per_s": round(1 / per_image, 1),
+                                 "extrapolated_s": round(per_image * args.images, 1)}
+
+        best = None
+        for workers in args.decode_workers:
+            for batch in args.batch_sizes:
+                out_dir = os.path.join(tmpdir, f"out-{workers}-{batch}")
+                progress, wall = run_job(catalog, source, out_dir, model, workers, batch)
+                row = {"images_per_s": round(args.images / wall, 1), "wall_s": round(wall, 1),
+                       "failed": progress["failed"]}
+                results["runs"][f"decode{workers}_batch{batch}"] = row
+                if best is None or wall < best[2]:
+                    best = (workers, batch, wall)
+
+        # stop half way through, resume, check nothing was scored twice
+        workers, batch, full_wall = best
+        out_dir = os.path.join(tmpdir, "out-resume")
+        first, wall1 = run_job(catalog, source, out_dir, model, workers, batch, stop_after=full_wall / 2)
+        second, wall2 = run_job(catalog, source, out_dir, model, workers, batch)
+        with open(os.path.join(out_dir, catalog.RESULTS_FILE)) as fh:
+            scored = [json.loads(line)["image"] for line in fh]
+        results["resume"] = {
+            "stopped_at": first["done"],
+            "final_state": second["state"],
+            "scored_twice": len(scored) - len(set(scored)),
+            "total_s": round(wall1 + wall2, 1),
+            "uninterrupted_s": round(full_wall, 1),
+        }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("catalog", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
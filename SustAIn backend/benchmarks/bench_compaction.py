@@ -0,0 +1,112 @@
+"""
+Prompt compaction speed and savings on large pasted inputs.
+
+    python benchmarks/bench_compaction.py --size-kb 100 --scaling 10 100 1000
+
+For each input kind at --size-kb, reports the median time of
+compaction.compact over --repeat runs, throughput, and tokens saved:
+
+- prose:       distinct sentences, nothing to remove (pure overhead)
+- pasted_twice: a document pasted twice with a question in between
+- log:         a log excerpt with a 40-line cycle repeating
+- indented:    code-like text with trailing spaces and blank-line runs
+- truncated:   prose compacted with a 2000-token budget
+
+plus the log kind at every --scaling size, to show the time growing
+linearly with the input.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import common  # noqa: F401  (puts the backend on sys.path)
+from compaction import compact
+
+WORDS = ("energy water cooling token prompt model data centre server rack "
+         "recycling battery cardboard renewable grid carbon footprint report "
+         "quarter efficiency inference training cluster").split()
+
+
+def prose(size, rng):
+    out, total = [], 0
+    while total < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        out.append(sentence + ("\n\n" if rng.random() < 0.2 else " "))
+        total += len(out[-1])
+    return "".join(out)[:size]
+
+
+def pasted_twice(size, rng):
+    doc = prose(size // 2 - 40, rng)
+    return doc + "\n\nWhat does this mean? Here it is again:\n\n" + doc
+
+
+def log(size, rng):
+    cycle = [f"2026-10-19T10:{i:02d}:00Z worker-{i % 7} WARN connection reset by peer (attempt {i})"
+             for i in range(40)]
+    out, total, i = [], 0, 0
+    while total < size:
+        out.append(cycle[i % len(cycle)])
+        total += len(out[-1]) + 1
+        i += 1
+    return "\n".join(out)
+
+
+def indented(size, rng):
+    out, total = [], 0
+    while total < size:
+        depth = rng.randint(0, 4)
+        line = "    " * depth + " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))) + "   \t "
+        line += "\n\n\n" if rng.random() < 0.1 else "\n"
+        out.append(line)
+        total += len(line)
+    return "".join(out)
+
+
+KINDS = {"prose": prose, "pasted_twice": pasted_twice, "log": log, "indented": indented}
+
+
+def measure(text, repeat, max_tokens=None):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        compacted, saved = compact(text, max_tokens)
+        samples.append(time.perf_counter() - t0)
+    median = statistics.median(samples)
+    return {
+        "input_bytes": len(text.encode()),
+        "output_bytes": len(compacted.encode()),
+        "median_ms": round(median * 1000, 3),
+        "mb_per_s": round(len(text) / median / 1e6, 1),
+        "tokens_saved": saved,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-kb", type=int, default=100)
+    parser.add_argument("--scaling", type=int, nargs="+", default=[10, 100, 1000],
+                        help="input sizes in KB for the linear-time check")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/compaction-<commit>.json)")
+    args = parser.parse_args()
+
+    size = args.size_kb * 1024
+    results = {"kinds": {}, "scaling": {}}
+    for name, make in KINDS.items():
+        results["kinds"][name] = measure(make(size, random.Random(0)), args.repeat)
+    results["kinds"]["truncated"] = measure(prose(size, random.Random(0)), args.repeat, max_tokens=2000)
+
+    for kb in args.scaling:
+        stats = measure(log(kb * 1024, random.Random(0)), args.repeat)
+        stats["us_per_kb"] = round(stats["median_ms"] * 1000 / kb, 2)
+        results["scaling"][f"{kb}KB"] = stats
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("compaction", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
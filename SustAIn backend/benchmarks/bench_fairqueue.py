@@ -0,0 +1,158 @@
+"""
+Upstream model fairness: a light tenant's latency while a heavy one floods.
+
+    python benchmarks/bench_fairqueue.py --duration 10 --heavy-threads 64 --light-rps 5
+
+The upstream model is simulated: --capacity calls at a time, each taking
+--latency-ms. A heavy tenant runs --heavy-threads closed loops of calls
+(each thread calls again as soon as it has an answer); a light tenant
+sends --light-rps calls a second. Both run for --duration seconds:
+
+- direct:   calls go straight to the upstream, as before the queue; the
+            light tenant waits behind the heavy tenant's backlog
+- fair:     calls go through fairqueue.FairQueue sized to the upstream
+            (heavy capped at --heavy-cap calls in flight); the light
+            tenant's p99 should stay near one upstream call
+- weighted: two flooding tenants with model_weight 1 and --weight, no
+            caps; the share of calls each got should follow the weights
+
+Reports latency percentiles per tenant (queue wait included), calls
+served and calls the queue turned away.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import common
+from fairqueue import FairQueue, QueueRejected
+
+
+class Upstream:
+    """--capacity concurrent calls of --latency-ms each; the rest wait in line."""
+
+    def __init__(self, capacity, latency_s):
+        self._slots = threading.Semaphore(capacity)
+        self.latency_s = latency_s
+
+    def call(self):
+        with self._slots:
+            time.sleep(self.latency_s)
+
+
+class Tenant:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def timed_call(self, upstream, queue, weight, cap):
+        t0 = time.perf_counter()
+        try:
+            if queue is None:
+                upstream.call()
+            else:
+                handle = queue.acquire(self.name, weight, cap)
+                try:
+                    upstream.call()
+                finally:
+                    queue.release(handle)
+        except QueueRejected:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.latencies.append(time.perf_counter() - t0)
+        return True
+
+    def summary(self, duration_s):
+        return {
+            "calls": len(self.latencies),
+            "calls_per_s": round(len(self.latencies) / duration_s, 1),
+            "rejected": self.rejected,
+            "latency": common.latency_summary(self.latencies),
+        }
+
+
+def flood(tenant, threads, until, upstream, queue, weight, cap):
+    def loop():
+        while time.monotonic() < until:
+            if not tenant.timed_call(upstream, queue, weight, cap):
+                time.sleep(0.01)  # a rejected client backs off a little
+    workers = [threading.Thread(target=loop, daemon=True) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    return workers
+
+
+def trickle(tenant, rps, until, upstream, queue, weight, cap):
+    def run():
+        with ThreadPoolExecutor(64) as pool:
+            next_at = time.monotonic()
+            while next_at < until:
+                pool.submit(tenant.timed_call, upstream, queue, weight, cap)
+                next_at += 1 / rps
+                time.sleep(max(0.0, next_at - time.monotonic()))
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    return [worker]
+
+
+def scenario(args, fair):
+    upstream = Upstream(args.capacity, args.latency_ms / 1000)
+    queue = FairQueue(args.capacity, args.deadline_s, args.max_queued) if fair else None
+    heavy, light = Tenant("heavy"), Tenant("light")
+    until = time.monotonic() + args.duration
+    workers = flood(heavy, args.heavy_threads, until, upstream, queue, 1.0, args.heavy_cap)
+    workers += trickle(light, args.light_rps, until, upstream, queue, 1.0, args.heavy_cap)
+    for w in workers:
+        w.join()
+    result = {"heavy": heavy.summary(args.duration), "light": light.summary(args.duration)}
+    if queue is not None:
+        result["queue"] = queue.stats()
+    return result
+
+
+def weighted(args):
+    upstream = Upstream(args.capacity, args.latency_ms / 1000)
+    queue = FairQueue(args.capacity, args.deadline_s, args.max_queued)
+    one, heavier = Tenant("weight-1"), Tenant(f"weight-{args.weight:g}")
+    until = time.monotonic() + args.duration
+    workers = flood(one, args.heavy_threads // 2, until, upstream, queue, 1.0, args.capacity)
+    workers += flood(heavier, args.heavy_threads // 2, until, upstream, queue, args.weight, args.capacity)
+    for w in workers:
+        w.join()
+    return {
+        one.name: one.summary(args.duration),
+        heavier.name: heavier.summary(args.duration),
+        "share_ratio": round(len(heavier.latencies) / max(1, len(one.latencies)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--capacity", type=int, default=8, help="upstream calls in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=50, help="upstream call latency")
+    parser.add_argument("--heavy-threads", type=int, default=64)
+    parser.add_argument("--heavy-cap", type=int, default=6, help="heavy tenant's max_concurrent_model_calls")
+    parser.add_argument("--light-rps", type=float, default=5)
+    parser.add_argument("--max-queued", type=int, default=16, help="MODEL_MAX_QUEUED_PER_TENANT")
+    parser.add_argument("--deadline-s", type=float, default=20, help="MODEL_QUEUE_DEADLINE_S")
+    parser.add_argument("--weight", type=float, default=3, help="model_weight of the second tenant")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/fairqueue-<commit>.json)")
+    args = parser.parse_args()
+
+    results = {
+        "direct": scenario(args, fair=False),
+        "fair": scenario(args, fair=True),
+        "weighted": weighted(args),
+    }
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("fairqueue", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+First /gradcam request latency after a deploy, with and without warm-up.
+
+    python benchmarks/bench_first_request.py --repeat 3
+
+Generates a throwaway ResNet-18 state dict and a synthetic JPEG, then for
+each mode boots the app in a fresh interpreter and times the first few
+/gradcam uploads:
+
+- lazy: SUSTAIN_WARMUP=0, the first request loads weights and pays the
+        first forward/backward pass
+- warm: the warm-up scheduler runs at lifespan start and the probe waits
+        for /ready before sending traffic (what a load balancer does)
+
+Requires torch and torchvision.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import common
+
+PROBE = r"""
+import asyncio, json, os, sys, time
+sys.path.insert(0, "benchmarks")
+import common
+import httpx
+import main, providers
+
+providers.set_model(common.StubModel())
+image = open(sys.argv[1], "rb").read()
+requests = int(sys.argv[2])
+
+async def go():
+    transport = httpx.ASGITransport(app=main.app)
+    t0 = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        while (await client.get("/ready")).status_code != 200:
+            await asyncio.sleep(0.005)
+        ready_s = time.perf_counter() - t0
+        latencies = []
+        for i in range(requests):
+            t = time.perf_counter()
+            resp = await client.post(f"/gradcam/probe-{os.getpid()}-{i}",
+                                     files={"image": ("item.jpg", image, "image/jpeg")})
+            latencies.append(time.perf_counter() - t)
+            resp.raise_for_status()
+        return ready_s, latencies
+
+ready_s, latencies = asyncio.run(go())
+print(json.dumps({"ready_s": ready_s, "latencies_s": latencies}))
+"""
+
+
+def make_fixtures(tmpdir):
+    import torch
+    import torchvision
+    from torchvision.io import encode_jpeg
+
+    weights = os.path.join(tmpdir, "gradcam.pt")
+    torch.save(torchvision.models.resnet18(weights=None, num_classes=1).state_dict(), weights)
+
+    image = os.path.join(tmpdir, "item.jpg")
+    pixels = (torch.rand(3, 1200, 1600) * 255).to(torch.uint8)
+    with open(image, "wb") as fh:
+        fh.write(encode_jpeg(pixels).numpy().tobytes())
+    return weights, image
+
+
+def run_mode(warm, weights, image, requests):
+    env = dict(os.environ)
+    env["GRADCAM_WEIGHTS"] = weights
+    env["SUSTAIN_WARMUP"] = "1" if warm else "0"
+    env["DATABASE_URL"] = os.environ["DATABASE_URL"]
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, image, str(requests)],
+        cwd=common.BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if out.returncode:
+        sys.exit(f"probe failed ({'warm' if warm else 'lazy'}):\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    ms = lambda v: round(v * 1000, 2)
+    first = [s["latencies_s"][0] for s in samples]
+    steady = [statistics.median(s["latencies_s"][1:]) for s in samples if len(s["latencies_s"]) > 1]
+    return {
+        "ready_s": round(statistics.median(s["ready_s"] for s in samples), 4),
+        "first_request_ms": ms(statistics.median(first)),
+        "steady_request_ms": ms(statistics.median(steady)) if steady else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per mode")
+    parser.add_argument("--requests", type=int, default=5, help="requests per process")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/first_request-<commit>.json)")
+    args = parser.parse_args()
+
+    common.use_temp_database()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        weights, image = make_fixtures(tmpdir)
+        results = {
+            mode: summarize([run_mode(mode == "warm", weights, image, args.requests)
+                             for _ in range(args.repeat)])
+            for mode in ("lazy", "warm")
+        }
+
+    lazy, warm = results["lazy"]["first_request_ms"], results["warm"]["first_request_ms"]
+    results["first_request_speedup"] = round(lazy / warm, 2) if warm else None
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("first_request", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
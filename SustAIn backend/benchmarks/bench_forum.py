@@ -0,0 +1,137 @@
+"""
+Forum page latency with a large table: OFFSET vs keyset pagination.
+
+    python benchmarks/bench_forum.py --threads 1000000 --page-size 20
+
+Fills a throwaway SQLite database with N threads (through the FTS5
+triggers, like real posts), then for pages at increasing depth measures:
+
+- offset_ms:    ORDER BY id DESC LIMIT n OFFSET k  (the usual approach)
+- keyset_ms:    ORDER BY id DESC with id < cursor  (what /forum uses)
+- endpoint_ms:  GET /forum/threads?before=cursor through the ASGI app
+- not_modified_ms: the same request with If-None-Match (304, no body)
+
+plus GET /forum/search latency for common and rare words.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import common
+
+WORDS = ["recycling", "battery", "cardboard", "prompts", "water", "energy", "compost",
+         "aluminum", "plastic", "solar", "cooling", "policy", "tokens", "repair", "reuse"]
+RARE_WORD = "zeolite"
+
+
+def populate(engine, threads, batch=50000):
+    rng = random.Random(0)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for start in range(0, threads, batch):
+            rows = []
+            for i in range(start, min(start + batch, threads)):
+                words = rng.sample(WORDS, 4) + ([RARE_WORD] if i % 100000 == 0 else [])
+                rows.append((f"Thread {i}: {words[0]} and {words[1]}", f"user{i % 5000}",
+                             " ".join(words) + " how do you handle this?", "2026-01-01 00:00:00", 0))
+            cur.executemany(
+                "INSERT INTO forum_threads (title, author, body, created_at, post_count) "
+                "VALUES (?, ?, ?, ?, ?)", rows,
+            )
+            raw.commit()
+    finally:
+        raw.close()
+
+
+def time_query(engine, sql, params, repeat):
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            cur.execute(sql, params).fetchall()
+            samples.append(time.perf_counter() - t0)
+    finally:
+        raw.close()
+    return round(statistics.median(samples) * 1000, 3)
+
+
+async def time_request(client, url, repeat, headers=None):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resp = await client.get(url, headers=headers)
+        samples.append(time.perf_counter() - t0)
+    return round(statistics.median(samples) * 1000, 3), resp
+
+
+async def run(args):
+    import httpx
+
+    common.use_temp_database()
+    import main
+    from database import engine, init_db
+
+    init_db()
+    t0 = time.perf_counter()
+    populate(engine, args.threads)
+    results = {"populate_s": round(time.perf_counter() - t0, 1), "pages": {}}
+
+    columns = "id, title, author, body, created_at, post_count, last_post_at"
+    n = args.page_size
+    depths = [p for p in args.pages if (p - 1) * n < args.threads]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for page in depths:
+            cursor = args.threads - (page - 1) * n + 1  # ids are 1..N
+            url = f"/forum/threads?before={cursor}&limit={n}"
+            endpoint_ms, resp = await time_request(client, url, args.repeat)
+            not_modified_ms, resp304 = await time_request(
+                client, url, args.repeat, headers={"If-None-Match": resp.headers["etag"]}
+            )
+            assert resp304.status_code == 304
+            results["pages"][str(page)] = {
+                "offset_ms": time_query(
+                    engine, f"SELECT {columns} FROM forum_threads ORDER BY id DESC LIMIT ? OFFSET ?",
+                    (n, (page - 1) * n), args.repeat,
+                ),
+                "keyset_ms": time_query(
+                    engine, f"SELECT {columns} FROM forum_threads WHERE id < ? ORDER BY id DESC LIMIT ?",
+                    (cursor, n), args.repeat,
+                ),
+                "endpoint_ms": endpoint_ms,
+                "not_modified_ms": not_modified_ms,
+                "body_bytes": len(resp.content),
+            }
+
+        results["search"] = {}
+        for word in (WORDS[0], RARE_WORD):
+            ms, resp = await time_request(client, f"/forum/search?q={word}&limit={n}", args.repeat)
+            results["search"][word] = {"endpoint_ms": ms, "hits_on_page": len(resp.json()["items"])}
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=1000000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 10000, 50000],
+                        help="page numbers to measure (1 = newest)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/forum-<commit>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("forum", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Client retries after timeouts: charges and model calls with and without
+Idempotency-Key.
+
+    python benchmarks/bench_idempotency.py --users 50 --requests-per-user 5 --timeout-ms 80
+
+Boots the app in-process like bench_load.py, with a stub model whose
+latency is uniform in [--min-latency-ms, --max-latency-ms], and sends
+--requests-per-user /chat requests per user. The client gives up on an
+attempt after --timeout-ms and retries, up to --retries times; the
+attempt it gave up on keeps running in the app, as it would on a server
+whose client went away. Each logical request either gets a 200 or runs
+out of retries.
+
+Runs twice, with a key per logical request (reused on its retries) and
+without keys, and reports per run:
+
+- attempts, timeouts and the logical requests that got a 200
+- model calls and prompts charged (user_usage.prompts_used)
+- double charges: prompts charged beyond one per logical request that
+  reached the model (each message is tagged, the stub model counts them);
+  the keyed run must have none, and the script exits 1 otherwise
+- idempotency store counters (replayed, waited)
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import common
+
+
+_TAG_RE = re.compile(r"\[req ([^\]]+)\]")
+
+
+class CountingModel(common.StubModel):
+    """StubModel with a random latency per call, counting calls per tagged request."""
+
+    def __init__(self, min_latency_s, max_latency_s, seed):
+        super().__init__()
+        self.min_latency_s = min_latency_s
+        self.max_latency_s = max_latency_s
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        tag = _TAG_RE.search(str(prompt))
+        with self._lock:
+            self.calls[tag.group(1) if tag else None] += 1
+            latency = self._rng.uniform(self.min_latency_s, self.max_latency_s)
+        time.sleep(latency)
+        return super().generate_content(prompt, stream)
+
+
+async def logical_request(client, user_id, i, use_key, timeout_s, retries, abandoned, counts):
+    body = {"user_id": user_id, "message": f"[req {user_id}/{i}] How do I cut my prompt in half?"}
+    headers = {"Idempotency-Key": uuid.uuid4().hex} if use_key else {}
+    for attempt in range(retries + 1):
+        counts["attempts"] += 1
+        task = asyncio.ensure_future(client.post("/chat", json=body, headers=headers))
+        done, _ = await asyncio.wait({task}, timeout=timeout_s)
+        if not done:
+            # the client gives up; the app keeps working on it
+            counts["timeouts"] += 1
+            abandoned.append(task)
+            await asyncio.sleep(0.01 * (attempt + 1))
+            continue
+        resp = task.result()
+        if resp.status_code == 200:
+            counts["succeeded"] += 1
+            counts["replayed"] += resp.headers.get("idempotent-replayed") == "true"
+            return
+        counts[f"status_{resp.status_code}"] = counts.get(f"status_{resp.status_code}", 0) + 1
+        return
+    counts["gave_up"] += 1
+
+
+async def run_once(app, model, args, use_key, prefix):
+    import httpx
+
+    import idempotency
+    from database import SessionLocal
+    from models import UserUsage
+
+    stats0 = idempotency.store.stats()
+    counts = {"attempts": 0, "timeouts": 0, "succeeded": 0, "replayed": 0, "gave_up": 0}
+    abandoned = []
+    users = [f"{prefix}-{u}" for u in range(args.users)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        t0 = time.perf_counter()
+
+        async def one_user(user_id):
+            for i in range(args.requests_per_user):
+                await logical_request(client, user_id, i, use_key, args.timeout_ms / 1000,
+                                      args.retries, abandoned, counts)
+
+        await asyncio.gather(*(one_user(u) for u in users))
+        elapsed = time.perf_counter() - t0
+        # let the attempts the client gave up on finish charging
+        await asyncio.gather(*abandoned, return_exceptions=True)
+
+    with SessionLocal() as db:
+        charged = sum(
+            prompts for (prompts,) in
+            db.query(UserUsage.prompts_used).filter(UserUsage.user_id.in_(users))
+        )
+    stats1 = idempotency.store.stats()
+    calls = {tag: n for tag, n in model.calls.items() if tag and tag.startswith(prefix + "-")}
+    return {
+        **counts,
+        "elapsed_s": round(elapsed, 3),
+        "model_calls": sum(calls.values()),
+        "prompts_charged": charged,
+        # no limits and no model errors here: every model call is charged
+        "double_charges": charged - len(calls),
+        "store_replayed": stats1["replayed"] - stats0["replayed"],
+        "store_waited": stats1["waited"] - stats0["waited"],
+    }
+
+
+async def run(args):
+    common.use_temp_database()
+
+    import main
+    import policies
+    import providers
+
+    model = CountingModel(args.min_latency_ms / 1000, args.max_latency_ms / 1000, args.seed)
+    providers.set_model(model)
+    policies.engine.set_defaults(max_prompts_per_day=10 ** 9, max_tokens_per_day=10 ** 12)
+    app = main.app
+
+    async with app.router.lifespan_context(app):
+        return {
+            "with_key": await run_once(app, model, args, True, "keyed"),
+            "without_key": await run_once(app, model, args, False, "plain"),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests-per-user", type=int, default=5)
+    parser.add_argument("--min-latency-ms", type=float, default=20)
+    parser.add_argument("--max-latency-ms", type=float, default=200)
+    parser.add_argument("--timeout-ms", type=float, default=80, help="client timeout per attempt")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/idempotency-<commit>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("idempotency", config, results, args.out)
+    return 1 if results["with_key"]["double_charges"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
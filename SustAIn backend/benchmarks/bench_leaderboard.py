@@ -0,0 +1,98 @@
+"""
+ASI leaderboard: update and query cost at a million users.
+
+    python benchmarks/bench_leaderboard.py --users 1000000 --companies 5000
+
+Builds leaderboard.Leaderboard from --users synthetic (user, company,
+tokens, prompts) rows, as Leaderboard.load does from user_usage, then
+reports:
+
+- build:        seconds to sort and link both indexes; peak RSS
+- update:       median / p99 us of update_user for random users (a
+                charge: new ASI, same company), --moves of them also
+                switching company
+- top:          median / p99 us of top_companies(10) and of a deep page
+                (offset = half the companies)
+- rank:         median / p99 us of rank_of (user rank + company rank)
+- naive_rank:   one "my rank" computed the way it would be without the
+                index: calculate_asi over every row, then a sort
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import common  # noqa: F401  (puts the backend on sys.path)
+from leaderboard import Leaderboard
+from utils import MAX_PROMPTS_PER_DAY, MAX_TOKENS_PER_DAY, calculate_asi
+
+
+def rows(users, companies, rng):
+    for u in range(users):
+        yield (f"user-{u}", f"company-{rng.randrange(companies)}",
+               rng.randrange(MAX_TOKENS_PER_DAY), rng.randrange(MAX_PROMPTS_PER_DAY + 1))
+
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 2),
+        "p99_us": round(common.percentile(samples, 99) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--companies", type=int, default=5000)
+    parser.add_argument("--ops", type=int, default=20000, help="operations timed per measurement")
+    parser.add_argument("--moves", type=int, default=2000, help="updates that also switch company")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/leaderboard-<commit>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    data = list(rows(args.users, args.companies, rng))
+    results = {}
+
+    board = Leaderboard()
+    t0 = time.perf_counter()
+    board.build((uid, company, calculate_asi(tokens, prompts)["asi_score"])
+                for uid, company, tokens, prompts in data)
+    results["build"] = {"seconds": round(time.perf_counter() - t0, 2),
+                        "peak_rss_mb": round(common.peak_rss_bytes() / 2 ** 20)}
+
+    picks = [data[rng.randrange(args.users)] for _ in range(args.ops)]
+    results["update"] = timed(board.update_user, [
+        (uid, company, calculate_asi(min(MAX_TOKENS_PER_DAY, tokens + 400),
+                                     min(MAX_PROMPTS_PER_DAY, prompts + 1))["asi_score"])
+        for uid, company, tokens, prompts in picks
+    ])
+    results["update_move_company"] = timed(board.update_user, [
+        (uid, f"company-{rng.randrange(args.companies)}", rng.uniform(0, 100))
+        for uid, _, _, _ in picks[:args.moves]
+    ])
+
+    results["top_10"] = timed(board.top_companies, [(10, 0)] * args.ops)
+    results["top_10_deep_page"] = timed(board.top_companies, [(10, args.companies // 2)] * args.ops)
+    results["rank"] = timed(board.rank_of, [(uid,) for uid, _, _, _ in picks])
+
+    # the same question without the index: score everyone, sort, look up
+    uid = picks[0][0]
+    t0 = time.perf_counter()
+    ranked = sorted((-calculate_asi(tokens, prompts)["asi_score"], u) for u, _, tokens, prompts in data)
+    next(i for i, (_, u) in enumerate(ranked, 1) if u == uid)
+    results["naive_rank"] = {"seconds": round(time.perf_counter() - t0, 2)}
+    results["stats"] = board.stats()
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("leaderboard", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
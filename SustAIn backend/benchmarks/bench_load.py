@@ -0,0 +1,121 @@
+"""
+In-process load test for /chat and /gradcam.
+
+Boots the FastAPI app against a throwaway SQLite file with a stub model
+provider, then drives the endpoints through httpx's ASGI transport (no
+sockets, so the numbers reflect the app and the DB, not the network).
+
+    python benchmarks/bench_load.py --requests 2000 --concurrency 32 --users 500
+    python benchmarks/bench_load.py --endpoint chat --model-latency-ms 50
+
+Reports throughput, p50/p95/p99 latency, DB writes per second and RSS.
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import common
+
+
+def boot_app(model_latency_s, unlimited):
+    common.use_temp_database()
+
+    import main
+    import policies
+    import providers
+    from database import engine
+
+    providers.set_model(common.StubModel(latency_s=model_latency_s))
+    if unlimited:
+        policies.engine.set_defaults(max_prompts_per_day=10 ** 9, max_tokens_per_day=10 ** 12,
+                                     max_gradcam_per_day=10 ** 9)
+    return main.app, engine
+
+
+def request_for(endpoint, user_id, i):
+    if endpoint == "chat":
+        return "POST", "/chat", {"user_id": user_id, "message": f"How do I cut prompt #{i} by half?"}
+    return "POST", f"/gradcam/{user_id}", None
+
+
+async def drive(client, endpoint, total, concurrency, users):
+    latencies = []
+    statuses = Counter()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        method, url, body = request_for(endpoint, f"bench-user-{i % users}", i)
+        async with sem:
+            t0 = time.perf_counter()
+            resp = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - t0)
+            statuses[resp.status_code] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - t0, latencies, statuses
+
+
+async def run(args):
+    import httpx
+
+    app, engine = boot_app(args.model_latency_ms / 1000.0, not args.respect_limits)
+    counter = common.DBWriteCounter(engine)
+    endpoints = ["chat", "gradcam"] if args.endpoint == "both" else [args.endpoint]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        while (await client.get("/ready")).status_code != 200:
+            await asyncio.sleep(0.01)
+
+        # warm the route table, pydantic models and the DB connection pool
+        await drive(client, "chat", min(50, args.requests), args.concurrency, args.users)
+
+        for endpoint in endpoints:
+            writes0, commits0 = counter.snapshot()
+            rss0 = common.rss_bytes()
+            elapsed, latencies, statuses = await drive(
+                client, endpoint, args.requests, args.concurrency, args.users
+            )
+            writes1, commits1 = counter.snapshot()
+            results[endpoint] = {
+                "elapsed_s": round(elapsed, 4),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "latency": common.latency_summary(latencies),
+                "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+                "db_writes": writes1 - writes0,
+                "db_writes_per_s": round((writes1 - writes0) / elapsed, 2),
+                "db_commits_per_s": round((commits1 - commits0) / elapsed, 2),
+                "rss_start_bytes": rss0,
+                "rss_end_bytes": common.rss_bytes(),
+            }
+
+    results["peak_rss_bytes"] = common.peak_rss_bytes()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoint", choices=["chat", "gradcam", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=500,
+                        help="distinct user_ids the requests are spread over")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0,
+                        help="simulated upstream model latency")
+    parser.add_argument("--respect-limits", action="store_true",
+                        help="keep the daily quotas (most requests will then be 429s)")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("load", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
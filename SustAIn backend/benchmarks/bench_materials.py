@@ -0,0 +1,143 @@
+"""
+Material scoring throughput and table load time.
+
+    python benchmarks/bench_materials.py --descriptions 20000 --words 40
+
+Generates product / waste descriptions mixing material names and aliases
+(and their plurals) with filler words, then reports:
+
+- load:      compiled .bin vs compiling the CSV, median of --repeat
+- automaton: MaterialIndex.score, descriptions per second
+- naive:     one word-boundary regex per alias, tested against every
+             description (the straightforward approach), for comparison
+- agree:     descriptions where both approaches find the same materials
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+import common  # noqa: F401  (puts the backend on sys.path)
+import materials
+
+FILLER = ("a the with and old used small large broken some of in for our new "
+          "packaging item product container made from mostly lid part cover").split()
+
+
+def make_descriptions(index, count, words, seed=0):
+    rng = random.Random(seed)
+    phrases = [w for w in index.vocab]  # singular and plural material words
+    aliases = []
+    with open(materials.TABLE_PATH, encoding="utf-8") as fh:
+        for line in fh:
+            if line.startswith(("#", "name,")):
+                continue
+            name, alias_field = line.split(",")[:2]
+            aliases += [name] + [a for a in alias_field.split("|") if a]
+    out = []
+    for _ in range(count):
+        parts = []
+        while len(parts) < words:
+            roll = rng.random()
+            if roll < 0.1:
+                parts += rng.choice(aliases).split()
+            elif roll < 0.15:
+                parts.append(rng.choice(phrases))
+            else:
+                parts.append(rng.choice(FILLER))
+        out.append(" ".join(parts[:words]).capitalize() + ".")
+    return out
+
+
+def naive_scorer(index):
+    """Every alias as its own regex, longest first, each material once."""
+    patterns = []
+    with open(materials.TABLE_PATH, encoding="utf-8") as fh:
+        material = -1
+        for line in fh:
+            if line.startswith(("#", "name,")):
+                continue
+            material += 1
+            name, alias_field = line.split(",")[:2]
+            for phrase in [name] + [a for a in alias_field.split("|") if a]:
+                words = re.findall(r"[a-z0-9]+", phrase.lower())
+                body = r"[^a-z0-9]+".join(re.escape(w) for w in words[:-1])
+                last = re.escape(words[-1]) + "(?:s|es)?"
+                regex = (body + r"[^a-z0-9]+" + last) if body else last
+                patterns.append((len(words), material, re.compile(r"(?<![a-z0-9])" + regex + r"(?![a-z0-9])")))
+    patterns.sort(key=lambda p: -p[0])
+
+    def score(text):
+        text = text.lower()
+        taken = []
+        seen = {}
+        for _, material, regex in patterns:
+            for m in regex.finditer(text):
+                span = m.span()
+                if any(span[0] < b and a < span[1] for a, b in taken):
+                    continue
+                taken.append(span)
+                seen.setdefault(material, None)
+        if not seen:
+            return {"material_score": None, "materials": []}
+        total = sum(index.weights[m] for m in seen)
+        return {
+            "material_score": round(sum(index.weights[m] * index.scores[m] for m in seen) / total, 4),
+            "materials": [index.names[m] for m in seen],
+        }
+
+    return score
+
+
+def timed(fn, items):
+    t0 = time.perf_counter()
+    results = [fn(d) for d in items]
+    return time.perf_counter() - t0, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--descriptions", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=40, help="words per description")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/materials-<commit>.json)")
+    args = parser.parse_args()
+
+    with open(materials.COMPILED_PATH, "rb") as fh:
+        blob = fh.read()
+    digest = materials._file_sha256(materials.TABLE_PATH)
+    load_bin, load_csv = [], []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        materials.MaterialIndex.from_bytes(blob, digest)
+        load_bin.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        materials.MaterialIndex.compile()
+        load_csv.append(time.perf_counter() - t0)
+
+    index = materials.load()
+    descriptions = make_descriptions(index, args.descriptions, args.words)
+    auto_s, auto = timed(index.score, descriptions)
+    naive_s, naive = timed(naive_scorer(index), descriptions)
+
+    results = {
+        "table": {"materials": len(index.names), "vocabulary": len(index.vocab),
+                  "states": len(index.goto), "bin_bytes": len(blob)},
+        "load_ms": {"bin": round(statistics.median(load_bin) * 1000, 3),
+                    "csv_compile": round(statistics.median(load_csv) * 1000, 3)},
+        "automaton": {"elapsed_s": round(auto_s, 4),
+                      "descriptions_per_s": round(args.descriptions / auto_s)},
+        "naive": {"elapsed_s": round(naive_s, 4),
+                  "descriptions_per_s": round(args.descriptions / naive_s)},
+        "speedup": round(naive_s / auto_s, 1),
+        "agree": sum(sorted(a["materials"]) == sorted(b["materials"]) for a, b in zip(auto, naive)),
+        "with_materials": sum(a["material_score"] is not None for a in auto),
+    }
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("materials", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
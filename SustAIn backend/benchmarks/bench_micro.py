@@ -0,0 +1,99 @@
+"""
+Micro-benchmarks for the hot helpers behind /chat and /gradcam.
+
+    python benchmarks/bench_micro.py --repeat 7
+
+Covers calculate_asi, calculate_psi, the limit policy lookup (a table
+compiled from --policies company rows) and the per-request quota update
+(lookup UserUsage, bump counters, commit) against a throwaway SQLite file.
+"""
+
+import argparse
+import timeit
+
+import common
+
+
+def time_callable(fn, number, repeat):
+    runs = timeit.repeat(fn, number=number, repeat=repeat)
+    per_call = [r / number for r in runs]
+    best = min(per_call)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "best_us": round(best * 1e6, 4),
+        "median_us": round(sorted(per_call)[len(per_call) // 2] * 1e6, 4),
+        "ops_per_s": round(1 / best, 1),
+    }
+
+
+def bench_quota_update(number, repeat, users):
+    from database import SessionLocal, engine
+    from models import Base, UserUsage
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add_all(UserUsage(user_id=f"micro-{i}", prompts_used=0, tokens_used=0,
+                             gradcam_used=0) for i in range(users))
+        db.commit()
+
+    counter = common.DBWriteCounter(engine)
+    state = {"i": 0}
+
+    def update():
+        user_id = f"micro-{state['i'] % users}"
+        state["i"] += 1
+        with SessionLocal() as db:
+            user = db.query(UserUsage).filter(UserUsage.user_id == user_id).first()
+            user.prompts_used += 1
+            user.tokens_used += 120
+            db.commit()
+
+    stats = time_callable(update, number, repeat)
+    writes, commits = counter.snapshot()
+    stats["db_writes"] = writes
+    stats["db_commits"] = commits
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000,
+                        help="calls per timing run for the pure functions")
+    parser.add_argument("--db-number", type=int, default=500,
+                        help="calls per timing run for the quota update")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--policies", type=int, default=1000, help="company rows in the policy table")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/micro-<commit>.json)")
+    args = parser.parse_args()
+
+    common.use_temp_database()
+    from policies import FIELDS, PolicyEngine, compile_policies
+    from utils import calculate_asi, calculate_psi
+
+    rows = [{"company": f"company-{i}", "role": "business", **dict.fromkeys(FIELDS), "max_prompts_per_day": 20}
+            for i in range(args.policies)]
+    policy_engine = PolicyEngine(refresh_s=0)
+    policy_engine._table = compile_policies(rows)
+    company = f"company-{args.policies // 2}"
+    policy = policy_engine.lookup(company, "business")
+
+    results = {
+        "calculate_asi": time_callable(lambda: calculate_asi(3200, 4), args.number, args.repeat),
+        "calculate_asi_policy": time_callable(lambda: calculate_asi(3200, 4, policy=policy),
+                                              args.number, args.repeat),
+        "policy_lookup": time_callable(lambda: policy_engine.lookup(company, "business"),
+                                       args.number, args.repeat),
+        "policy_lookup_unknown_company": time_callable(lambda: policy_engine.lookup("elsewhere", "consumer"),
+                                                       args.number, args.repeat),
+        "calculate_psi": time_callable(lambda: calculate_psi(0.72, 0.81), args.number, args.repeat),
+        "quota_update": bench_quota_update(args.db_number, args.repeat, args.users),
+    }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("micro", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
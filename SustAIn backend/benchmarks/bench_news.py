@@ -0,0 +1,98 @@
+"""
+News ingestion poll cycles against hundreds of local feeds.
+
+    python benchmarks/bench_news.py --feeds 500 --items 20 --changed 0.1
+
+Serves the feeds from news_fixture.FeedFixture and runs NewsIngestor
+cycles against a throwaway database:
+
+- cold:         first poll, every feed fetched and parsed
+- naive:        a repeat poll without validators or body hashes (what
+                polling costs without conditional fetch caching)
+- unchanged:    a repeat poll with them: 304s, plus body-hash hits for the
+                feeds that ignore the validators
+- changed:      after --changed of the feeds published one story
+
+Each cycle reports bytes transferred, total parse time, wall time and
+new items. Finally it compares the /news delta a client fetches after
+the changed cycle with a full first page.
+"""
+
+import argparse
+import asyncio
+
+import common
+from news_fixture import FeedFixture
+
+
+async def fetch(app, url):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        resp = await client.get(url)
+    return resp.json(), len(resp.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--feeds", type=int, default=500)
+    parser.add_argument("--items", type=int, default=20, help="items per feed")
+    parser.add_argument("--changed", type=float, default=0.1, help="fraction of feeds with a new story")
+    parser.add_argument("--ignore-validators", type=float, default=0.1,
+                        help="fraction of feeds that never answer 304")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/news-<commit>.json)")
+    args = parser.parse_args()
+
+    common.use_temp_database()
+    import main as backend
+    import news
+    from database import SessionLocal, init_db
+    from models import NewsFeed, NewsItem
+
+    init_db()
+    fixture = FeedFixture(args.feeds, args.items, args.ignore_validators)
+    ingestor = news.NewsIngestor(feeds=fixture.urls, concurrency=args.concurrency)
+
+    def cycle():
+        before = dict(fixture.requests)
+        stats = ingestor.poll_once()
+        stats["served"] = {k: fixture.requests[k] - before[k] for k in before}
+        stats["bytes_per_feed"] = round(stats["bytes"] / args.feeds)
+        return stats
+
+    results = {"cycles": {}}
+    results["cycles"]["cold"] = cycle()
+
+    db = SessionLocal()
+    saved = {f.url: (f.etag, f.last_modified, f.body_hash) for f in db.query(NewsFeed)}
+    db.query(NewsFeed).update({"etag": None, "last_modified": None, "body_hash": None})
+    db.commit()
+    results["cycles"]["naive"] = cycle()
+    for f in db.query(NewsFeed):
+        f.etag, f.last_modified, f.body_hash = saved[f.url]
+    db.commit()
+
+    results["cycles"]["unchanged"] = cycle()
+    since = db.query(NewsItem.id).order_by(NewsItem.id.desc()).limit(1).scalar()
+    db.close()
+    results["feeds_changed"] = fixture.advance(args.changed)
+    results["cycles"]["changed"] = cycle()
+    fixture.shutdown()
+
+    delta, delta_bytes = asyncio.run(fetch(backend.app, f"/news?since={since}&limit={news.MAX_PAGE_SIZE}"))
+    full, full_bytes = asyncio.run(fetch(backend.app, f"/news?limit={news.MAX_PAGE_SIZE}"))
+    results["client"] = {
+        "delta_items": len(delta["items"]),
+        "delta_bytes": delta_bytes,
+        "full_page_items": len(full["items"]),
+        "full_page_bytes": full_bytes,
+    }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("news", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+WebSocket push load test: many idle connections plus active users.
+
+    python benchmarks/bench_push.py --idle 10000 --active 1000 --rounds 5
+
+Starts one uvicorn worker in a subprocess (stub model provider, quotas
+lifted, throwaway database) and opens --idle connections to /ws for users
+that never do anything and --active connections for users that then send
+--rounds of POST /chat each. Reports:
+
+- connect:   time to open each group, server RSS before and after
+- delivery:  POST /chat start -> pushed update received, per update
+- missing:   updates that did not arrive within --settle-s
+- server:    /ws/status at the end (published, slow consumers dropped)
+
+Needs `websockets` (the client side; uvicorn uses it for the server).
+Opening 11k sockets needs a file-descriptor limit above that on both
+sides; the script raises its soft limit as far as the hard limit allows.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import common
+
+
+def raise_fd_limit():
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def serve(port):
+    """Subprocess entry point: one uvicorn worker for the benchmark."""
+    raise_fd_limit()
+    common.use_temp_database()
+    os.environ.setdefault("SUSTAIN_WARMUP", "0")
+    import uvicorn
+
+    import main
+    import policies
+    import providers
+
+    providers.set_model(common.StubModel())
+    policies.engine.set_defaults(max_prompts_per_day=10 ** 9, max_tokens_per_day=10 ** 12)
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning",
+                ws="websockets", backlog=4096)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_rss(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+async def open_connections(url, user_ids, concurrency, on_message=None):
+    import websockets
+
+    sem = asyncio.Semaphore(concurrency)
+    conns = {}
+
+    async def one(user_id):
+        async with sem:
+            ws = await websockets.connect(f"{url}?user_id={user_id}", max_queue=None)
+            await ws.recv()  # the snapshot
+            conns[user_id] = ws
+
+    await asyncio.gather(*(one(u) for u in user_ids))
+    if on_message is not None:
+        for user_id, ws in conns.items():
+            asyncio.ensure_future(on_message(user_id, ws))
+    return conns
+
+
+async def run(args, port, server):
+    import httpx
+
+    base = f"http://127.0.0.1:{port}"
+    url = f"ws://127.0.0.1:{port}/ws"
+    results = {"fd_limit": raise_fd_limit()}
+
+    async with httpx.AsyncClient(base_url=base, timeout=60,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("server did not start")
+            await asyncio.sleep(0.1)
+
+        rss0 = server_rss(server.pid)
+        t0 = time.perf_counter()
+        idle = await open_connections(url, [f"idle-{i}" for i in range(args.idle)], args.concurrency)
+        idle_s = time.perf_counter() - t0
+        rss_idle = server_rss(server.pid)
+
+        sent_at = {}
+        latencies = []
+        received = 0
+
+        async def listen(user_id, ws):
+            nonlocal received
+            async for message in ws:
+                json.loads(message)
+                received += 1
+                latencies.append(time.perf_counter() - sent_at[user_id])
+
+        active_ids = [f"active-{i}" for i in range(args.active)]
+        t0 = time.perf_counter()
+        active = await open_connections(url, active_ids, args.concurrency, on_message=listen)
+        active_s = time.perf_counter() - t0
+        rss_active = server_rss(server.pid)
+
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def chat(user_id, i):
+            async with sem:
+                sent_at[user_id] = time.perf_counter()
+                resp = await client.post("/chat", json={"user_id": user_id, "message": f"Prompt {i}"})
+                resp.raise_for_status()
+
+        t0 = time.perf_counter()
+        for r in range(args.rounds):
+            # one request per user at a time, so each update maps to its request
+            await asyncio.gather(*(chat(u, r) for u in active_ids))
+        chat_s = time.perf_counter() - t0
+
+        expected = args.rounds * args.active
+        settle = time.monotonic() + args.settle_s
+        while received < expected and time.monotonic() < settle:
+            await asyncio.sleep(0.05)
+
+        status = (await client.get("/ws/status")).json()
+
+    for ws in list(idle.values()) + list(active.values()):
+        await ws.close()
+
+    mib = lambda v: round(v / 2 ** 20, 1) if v is not None else None
+    results.update({
+        "connect": {
+            "idle_s": round(idle_s, 3),
+            "active_s": round(active_s, 3),
+            "server_rss_mib": {"start": mib(rss0), "after_idle": mib(rss_idle), "after_active": mib(rss_active)},
+            "server_kib_per_connection": (
+                round((rss_active - rss0) / 1024 / (args.idle + args.active), 1)
+                if rss0 is not None and rss_active is not None and args.idle + args.active else None
+            ),
+        },
+        "chat": {"requests": expected, "elapsed_s": round(chat_s, 3),
+                 "throughput_rps": round(expected / chat_s, 1) if chat_s else None},
+        "delivery": common.latency_summary(latencies),
+        "missing": expected - received,
+        "server": status,
+    })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--idle", type=int, default=10000)
+    parser.add_argument("--active", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5, help="chat requests per active user")
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="connections opened / requests in flight at once")
+    parser.add_argument("--settle-s", type=float, default=10.0)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/push-<commit>.json)")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, __file__, "--serve", str(port)], cwd=common.BACKEND_DIR)
+    try:
+        results = asyncio.run(run(args, port, server))
+    finally:
+        server.terminate()
+        server.wait(10)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "serve")}
+    common.write_results("push", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
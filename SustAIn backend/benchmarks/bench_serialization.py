@@ -0,0 +1,126 @@
+"""
+Response encoding: time and bytes per payload and encoder.
+
+    python benchmarks/bench_serialization.py --repeat 200
+
+Payloads shaped like the real responses:
+
+- chat:     one /chat response
+- gradcam:  one /gradcam response with matched materials
+- batch:    /chat/batch with 50 replies
+- news:     a 200-item /news page
+- export:   2000 chat messages (history / export sized)
+
+Encoders:
+
+- fastapi_default: jsonable_encoder + json.dumps, what a dict returned
+                   from an endpoint used to cost
+- json:            responses.dumps_json (orjson if installed)
+- msgpack:         responses.dumps_msgpack (if installed)
+
+and, for the JSON body, gzip and brotli (if installed) size and time.
+Encoders whose package is missing are reported as null.
+"""
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+
+import common  # noqa: F401  (puts the backend on sys.path)
+import responses
+
+WORDS = ("energy water cooling token prompt model data centre recycling battery cardboard "
+         "renewable grid carbon footprint efficiency inference cluster").split()
+
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def payloads(rng):
+    chat = {
+        "reply": " ".join(sentence(rng, 14) for _ in range(6)),
+        "tokens_used": 412, "prompts_left": 4, "tokens_left": 6120, "ASI": 81.25,
+        "energy_saved_kWh": 0.0153, "water_saved_liters": 0.0075,
+        "session_id": "k3Jd9sQ0aLm2", "tokens_saved_by_trimming": 120, "tokens_saved_by_compaction": 35,
+    }
+    return {
+        "chat": chat,
+        "gradcam": {"PSI": 63.4, "uses_left": 0, "material_score": 0.4636,
+                    "materials": ["lithium ion battery", "plastic", "aluminum", "cardboard"]},
+        "batch": {
+            "results": [{"reply": " ".join(sentence(rng, 14) for _ in range(4)), "tokens_used": 300 + i,
+                         "tokens_saved_by_compaction": i % 7} for i in range(50)],
+            "tokens_used": 17000, "prompts_left": 10, "tokens_left": 40000, "ASI": 55.5,
+            "energy_saved_kWh": 0.1, "water_saved_liters": 0.05, "tokens_saved_by_compaction": 150,
+        },
+        "news": {
+            "items": [{"id": 1000 + i, "title": sentence(rng, 8), "summary": " ".join(sentence(rng, 16) for _ in range(3)),
+                       "link": f"https://example.org/news/{i}", "source": f"Feed {i % 30}",
+                       "published": f"2026-10-{1 + i % 28:02d}T08:00:00Z"} for i in range(200)],
+            "next_since": 1199,
+        },
+        "export": {"messages": [{"role": "user" if i % 2 == 0 else "model", "text": sentence(rng, 25),
+                                 "ts": 1760000000.0 + i} for i in range(2000)]},
+    }
+
+
+def fastapi_default(payload):
+    from fastapi.encoders import jsonable_encoder
+
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode()
+
+
+def median_us(fn, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(arg)
+        samples.append(time.perf_counter() - t0)
+    return round(statistics.median(samples) * 1e6, 1), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/serialization-<commit>.json)")
+    args = parser.parse_args()
+
+    encoders = {
+        "fastapi_default": fastapi_default,
+        "json": responses.dumps_json,
+        "msgpack": responses.dumps_msgpack if responses.msgpack is not None else None,
+    }
+    results = {"orjson": responses.orjson is not None, "payloads": {}}
+    for name, payload in payloads(random.Random(0)).items():
+        row = {}
+        for enc_name, fn in encoders.items():
+            if fn is None:
+                row[enc_name] = None
+                continue
+            us, body = median_us(fn, payload, args.repeat)
+            row[enc_name] = {"encode_us": us, "bytes": len(body)}
+
+        body = responses.dumps_json(payload)
+        us, packed = median_us(lambda b: gzip.compress(b, responses.GZIP_LEVEL), body, max(1, args.repeat // 4))
+        row["gzip"] = {"compress_us": us, "bytes": len(packed)}
+        if responses.brotli is not None:
+            us, packed = median_us(lambda b: responses.brotli.compress(b, quality=responses.BROTLI_QUALITY),
+                                   body, max(1, args.repeat // 4))
+            row["br"] = {"compress_us": us, "bytes": len(packed)}
+        else:
+            row["br"] = None
+        row["compressed_by_default"] = len(body) >= responses.COMPRESS_MIN_BYTES
+        results["payloads"][name] = row
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    config["compress_min_bytes"] = responses.COMPRESS_MIN_BYTES
+    common.write_results("serialization", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-worker memory of the Grad-CAM model with 1, 4 and 8 worker processes.
+
+    python benchmarks/bench_shared_weights.py --workers 1 4 8
+
+For each weight format, starts N processes that each load the model and
+run one warm-up pass (like N uvicorn workers after the lifespan), then
+reads /proc/<pid>/smaps_rollup while all N are alive:
+
+- heap:        torch.load without mmap, every worker owns a private copy
+- torch_mmap:  torch.load(mmap=True), copy-on-write file mapping
+- safetensors: export_weights + read-only shared mapping
+
+uss_mb is memory only that worker holds (what N multiplies), pss_mb
+splits shared pages evenly between the workers mapping them.
+Linux only. Requires torch and torchvision.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import common
+
+CHILD = r"""
+import sys
+import torch
+import gradcam_model
+
+path, fmt = sys.argv[1], sys.argv[2]
+if fmt == "heap":
+    # same model, but the state dict is read fully onto the heap
+    _load = torch.load
+    torch.load = lambda *a, **kw: _load(*a, **{**kw, "mmap": False})
+model = gradcam_model.GradCamModel(path, batch_sizes=(1,))
+model.warmup()
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def measure(path, fmt, workers):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", CHILD, path, fmt],
+            cwd=common.BACKEND_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        for p in procs:
+            if p.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"worker {p.pid} failed to load {fmt} weights")
+        samples = [smaps_rollup(p.pid) for p in procs]
+    finally:
+        for p in procs:
+            p.stdin.close()
+            p.wait()
+
+    mb = lambda v: round(v / 2 ** 20, 1)
+    return {
+        "uss_mb": mb(statistics.mean(s["uss"] for s in samples)),
+        "pss_mb": mb(statistics.mean(s["pss"] for s in samples)),
+        "rss_mb": mb(statistics.mean(s["rss"] for s in samples)),
+        "total_pss_mb": mb(sum(s["pss"] for s in samples)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--out", help="result file (default: benchmarks/results/shared_weights-<commit>.json)")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("needs /proc/<pid>/smaps_rollup (Linux 4.14+)")
+
+    import torch
+    import torchvision
+    import gradcam_model
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        state = torchvision.models.resnet18(weights=None, num_classes=1).state_dict()
+        pt_path = os.path.join(tmpdir, "gradcam.pt")
+        st_path = os.path.join(tmpdir, "gradcam.safetensors")
+        torch.save(state, pt_path)
+        gradcam_model.export_weights(state, st_path)
+
+        formats = {"heap": pt_path, "torch_mmap": pt_path, "safetensors": st_path}
+        results = {
+            "weights_mb": round(os.path.getsize(st_path) / 2 ** 20, 1),
+            "formats": {
+                fmt: {str(n): measure(path, fmt, n) for n in args.workers}
+                for fmt, path in formats.items()
+            },
+        }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("shared_weights", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
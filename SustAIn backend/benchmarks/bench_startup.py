@@ -0,0 +1,128 @@
+"""
+Cold-start benchmark: how long until a fresh worker can serve traffic.
+
+    python benchmarks/bench_startup.py --repeat 5
+
+Each sample is a fresh interpreter that imports `main`, enters the app
+lifespan and waits for the warm-up to finish. Reports
+
+- import_s:  `import main` (what the process manager waits on)
+- startup_s: import + lifespan startup (when the socket starts accepting)
+- ready_s:   startup + background warm-up (when /ready turns 200)
+
+plus the slowest modules from `python -X importtime -c "import main"`.
+Set GEMINI_API_KEY to measure the real provider; a dummy key is used
+otherwise (genai.configure does not hit the network).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import common
+
+PROBE = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        t_started = time.perf_counter() - t0
+        while not main.warmup.wait(0):
+            await asyncio.sleep(0.001)
+        return t_started, time.perf_counter() - t0
+
+t_started, t_ready = asyncio.run(boot())
+print(json.dumps({
+    "import_s": t_import,
+    "startup_s": t_started,
+    "ready_s": t_ready,
+    "modules_loaded": len(sys.modules),
+    "errors": {k: t["error"] for k, t in main.warmup.status()["tasks"].items() if t["error"]},
+}))
+"""
+
+
+def probe_env():
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "bench-key")
+    env["DATABASE_URL"] = os.environ["DATABASE_URL"]
+    return env
+
+
+def run_probe(env):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=common.BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=common.BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line.split("|")
+        self_us = int(parts[0].split(":")[1])
+        cumulative_us = int(parts[1])
+        name = parts[2].rstrip()
+        # direct imports of main only; importtime indents each nesting level by two
+        if len(name) - len(name.lstrip()) == 3:
+            rows.append({"module": name.strip(), "cumulative_ms": round(cumulative_us / 1000, 2),
+                         "self_ms": round(self_us / 1000, 2)})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def summarize(samples, key):
+    values = [s[key] for s in samples]
+    return {
+        "min_s": round(min(values), 4),
+        "median_s": round(statistics.median(values), 4),
+        "max_s": round(max(values), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to report")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/startup-<commit>.json)")
+    args = parser.parse_args()
+
+    common.use_temp_database()
+    env = probe_env()
+
+    run_probe(env)  # first run pays .pyc compilation, not representative
+    samples = [run_probe(env) for _ in range(args.repeat)]
+    baseline = subprocess.run(
+        [sys.executable, "-c", "import time; t=time.perf_counter(); import sqlalchemy, fastapi; print(time.perf_counter()-t)"],
+        capture_output=True, text=True, check=True,
+    )
+
+    results = {
+        "import": summarize(samples, "import_s"),
+        "startup": summarize(samples, "startup_s"),
+        "ready": summarize(samples, "ready_s"),
+        "modules_loaded": samples[-1]["modules_loaded"],
+        "warmup_errors": samples[-1]["errors"],
+        "framework_floor_s": round(float(baseline.stdout.strip()), 4),
+        "slowest_imports": slowest_imports(env, args.top),
+    }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("startup", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
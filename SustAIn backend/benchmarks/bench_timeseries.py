@@ -0,0 +1,122 @@
+"""
+ASI / PSI history: range query latency as the number of series grows.
+
+    python benchmarks/bench_timeseries.py --users 100 1000 5000 --events-per-user 2000
+
+For each --users count, fills a fresh timeseries.TimeSeriesStore with a
+year of events (--events-per-user per user, spread over 365 days, one
+company per 50 users) and reports:
+
+- ingest:   events/s through add_events (the usage log sink)
+- memory:   bytes of one series (tracemalloc) after 0, 10 and 100
+            events over the last day and after a year of one event a
+            minute (every ring dense: the most a series takes), and the
+            total series
+- queries:  median / p99 latency of /history-shaped queries for random
+            users: last hour, day, week, month and year at 200 points,
+            plus a company over the year
+
+Query latency should stay flat from the smallest to the largest store.
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+import common  # noqa: F401  (puts the backend on sys.path)
+from timeseries import Series, TimeSeriesStore
+
+DAY = 86400
+RANGES = {"hour": 3600, "day": DAY, "week": 7 * DAY, "month": 30 * DAY, "year": 365 * DAY}
+
+
+def fill(store, users, per_user, now, rng):
+    rows = []
+    for u in range(users):
+        company = f"company-{u // 50}"
+        for _ in range(per_user):
+            ts = now - rng.random() * 365 * DAY
+            psi = rng.uniform(20, 95) if rng.random() < 0.05 else None
+            rows.append((ts, f"user-{u}", "chat", 200, rng.randint(50, 900), None, None, False,
+                         rng.uniform(0, 100), psi, company))
+    rows.sort()
+    t0 = time.perf_counter()
+    for i in range(0, len(rows), 1000):
+        store.add_events(rows[i:i + 1000])
+    return len(rows) / (time.perf_counter() - t0)
+
+
+def series_bytes(now, events, span):
+    """Traced size of one series holding `events` evenly spread over `span` seconds."""
+    slots = TimeSeriesStore()._slots
+    tracemalloc.start()
+    series = Series(slots)
+    for i in range(events):
+        series.add(now - span + span * i / events, 50.0, 100, None)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del series
+    return size
+
+
+def time_queries(store, kind, keys, span, points, now, repeat, rng):
+    samples = []
+    for _ in range(repeat):
+        key = rng.choice(keys)
+        t0 = time.perf_counter()
+        store.query(kind, key, now - span, now, points, now=now)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 1),
+        "p99_us": round(common.percentile(samples, 99) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--events-per-user", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/timeseries-<commit>.json)")
+    args = parser.parse_args()
+
+    now = time.time()
+    bytes_per_series = {
+        "empty": series_bytes(now, 0, DAY),
+        "10_events": series_bytes(now, 10, DAY),
+        "100_events": series_bytes(now, 100, DAY),
+        "full": series_bytes(now, 365 * 1440, 365 * DAY),
+    }
+
+    results = {}
+    for users in args.users:
+        rng = random.Random(users)
+        store = TimeSeriesStore()
+        events_per_s = fill(store, users, args.events_per_user, now, rng)
+        series = sum(store.stats()[k] for k in ("users", "companies"))
+
+        user_keys = [f"user-{u}" for u in range(users)]
+        queries = {
+            name: time_queries(store, "user", user_keys, span, args.points, now, args.repeat, rng)
+            for name, span in RANGES.items()
+        }
+        company_keys = sorted({f"company-{u // 50}" for u in range(users)})
+        queries["company_year"] = time_queries(store, "company", company_keys, RANGES["year"],
+                                               args.points, now, args.repeat, rng)
+        results[f"{users}_users"] = {
+            "ingest_events_per_s": round(events_per_s),
+            "series": series,
+            "queries": queries,
+        }
+    results["bytes_per_series"] = bytes_per_series
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("timeseries", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
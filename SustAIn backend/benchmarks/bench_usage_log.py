@@ -0,0 +1,128 @@
+"""
+Usage event log: request-path cost and writer throughput.
+
+    python benchmarks/bench_usage_log.py --events 200000 --threads 8
+
+- record:          median ns per usage_log.record() call, single thread,
+                   writer stopped (the pure hot-path cost)
+- record_threads:  the same with --threads request threads recording at
+                   once while the writer drains to a throwaway SQLite file
+- writer:          events/s written and INSERT statements / commits per
+                   event (one executemany per batch)
+- overflow:        a writer that is never started, --events recorded into
+                   a buffer of --capacity: events kept vs dropped, and the
+                   buffer's memory staying bounded
+- shutdown:        time for stop() to flush a full buffer
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import common
+
+common.use_temp_database()
+
+
+def time_record(writer, n, rounds=5):
+    """Median ns per record() over `rounds` runs of n calls."""
+    per_call = []
+    for _ in range(rounds):
+        record = writer.record
+        t0 = time.perf_counter_ns()
+        for i in range(n):
+            record("bench-user", "chat", 200, 412, "gemini-pro", 850.0, False, 81.25, None)
+        per_call.append((time.perf_counter_ns() - t0) / n)
+        writer._buffer.clear()
+    return round(statistics.median(per_call), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--capacity", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/usage_log-<commit>.json)")
+    args = parser.parse_args()
+
+    from database import engine, init_db
+    from usage_log import UsageLogWriter
+
+    init_db()
+    counter = common.DBWriteCounter(engine)
+    results = {}
+
+    # hot path alone
+    idle = UsageLogWriter(capacity=args.events, batch=args.batch)
+    results["record"] = {"ns_per_event": time_record(idle, args.events)}
+
+    # hot path from many threads while the writer drains
+    writer = UsageLogWriter(capacity=args.events, batch=args.batch, interval_s=0.05)
+    writer.start()
+    per_thread = args.events // args.threads
+    thread_ns = []
+
+    def worker():
+        record = writer.record
+        t0 = time.perf_counter_ns()
+        for _ in range(per_thread):
+            record("bench-user", "chat", 200, 412, "gemini-pro", 850.0, False, 81.25, None)
+        thread_ns.append((time.perf_counter_ns() - t0) / per_thread)
+
+    writes0, commits0 = counter.snapshot()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    recorded_s = time.perf_counter() - t0
+    writer.stop()
+    total_s = time.perf_counter() - t0
+    writes1, commits1 = counter.snapshot()
+    stats = writer.stats()
+    results["record_threads"] = {
+        "threads": args.threads,
+        "ns_per_event_median_thread": round(statistics.median(thread_ns), 1),
+        "record_wall_s": round(recorded_s, 3),
+    }
+    results["writer"] = {
+        "events": per_thread * args.threads,
+        "written": stats["written"],
+        "dropped": stats["dropped"],
+        "events_per_s": round(stats["written"] / total_s),
+        "inserts_per_event": round((writes1 - writes0) / max(1, stats["written"]), 3),
+        "commits": commits1 - commits0,
+    }
+
+    # bounded buffer under a writer that never runs
+    stalled = UsageLogWriter(capacity=args.capacity, batch=args.batch)
+    for i in range(args.events):
+        stalled.record("bench-user", "gradcam", 200, 0, None, 12.0, i % 2 == 0, None, 63.4)
+    stats = stalled.stats()
+    results["overflow"] = {
+        "recorded": args.events,
+        "buffered": stats["buffered"],
+        "dropped": stats["dropped"],
+    }
+
+    # flush on shutdown: stop() writes the whole buffer before returning
+    writes0, _ = counter.snapshot()
+    t0 = time.perf_counter()
+    stalled.start()
+    stalled.stop()
+    writes1, _ = counter.snapshot()
+    results["shutdown"] = {
+        "flushed": writes1 - writes0,
+        "flush_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "left_buffered": stalled.stats()["buffered"],
+    }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("usage_log", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Shared helpers for the backend benchmarks.
+
+Every benchmark script in this folder runs from anywhere, e.g.
+
+    python benchmarks/bench_load.py --requests 2000 --concurrency 32
+
+and writes one JSON result file so two commits can be compared with
+`python benchmarks/compare.py old.json new.json`.
+"""
+
+import atexit
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+# =====================================================
+# ENVIRONMENT
+# =====================================================
+
+def use_temp_database():
+    """
+    Point database.py at a throwaway SQLite file.
+    Must run before anything imports `database`.
+    """
+    fd, path = tempfile.mkstemp(prefix="sustain-bench-", suffix=".db")
+    os.close(fd)
+    atexit.register(lambda: os.path.exists(path) and os.remove(path))
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# =====================================================
+# STUB MODEL PROVIDER
+# =====================================================
+
+class _StubUsage:
+    def __init__(self, total_token_count):
+        self.total_token_count = total_token_count
+
+
+class _StubResponse:
+    def __init__(self, text, total_token_count):
+        self.text = text
+        self.usage_metadata = _StubUsage(total_token_count)
+
+
+class _StubStream:
+    """Iterates reply chunks like a streamed Gemini response, then has usage."""
+
+    def __init__(self, text, total_token_count, chunk_chars, chunk_latency_s):
+        self._chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        self._chunk_latency_s = chunk_latency_s
+        self.usage_metadata = _StubUsage(total_token_count)
+
+    def __iter__(self):
+        for text in self._chunks:
+            if self._chunk_latency_s:
+                time.sleep(self._chunk_latency_s)
+            yield _StubResponse(text, 0)
+
+
+class StubModel:
+    """
+    Stands in for `genai.GenerativeModel`: fixed latency, token count
+    derived from prompt length (~4 chars per token). With stream=True the
+    reply arrives in `chunk_chars` pieces, `chunk_latency_s` apart.
+    """
+
+    def __init__(self, latency_s=0.0, reply_tokens=40, chunk_chars=16, chunk_latency_s=0.0):
+        self.latency_s = latency_s
+        self.reply_tokens = reply_tokens
+        self.chunk_chars = chunk_chars
+        self.chunk_latency_s = chunk_latency_s
+
+    def generate_content(self, prompt, stream=False):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        prompt_tokens = max(1, len(str(prompt)) // 4)
+        text = "stub reply " * (self.reply_tokens // 2)
+        if stream:
+            return _StubStream(text, prompt_tokens + self.reply_tokens,
+                               self.chunk_chars, self.chunk_latency_s)
+        return _StubResponse(text, prompt_tokens + self.reply_tokens)
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * (pct / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def latency_summary(latencies_s):
+    values = sorted(latencies_s)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "count": len(values),
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class DBWriteCounter:
+    """Counts INSERT/UPDATE/DELETE statements issued through an engine."""
+
+    WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.writes = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in self.WRITE_PREFIXES:
+            self.writes += len(parameters) if executemany else 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def snapshot(self):
+        return self.writes, self.commits
+
+
+# =====================================================
+# RESULTS
+# =====================================================
+
+def write_results(name, config, results, out=None):
+    payload = {
+        "benchmark": name,
+        "git_commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    if out is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        out = RESULTS_DIR / f"{name}-{payload['git_commit']}.json"
+    out = Path(out)
+    out.write_text(json.dumps(payload, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"\nwrote {out}")
+    return out
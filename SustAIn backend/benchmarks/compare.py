@@ -0,0 +1,44 @@
+"""
+Compare two benchmark result files, e.g. from two commits:
+
+    python benchmarks/compare.py results/load-abc123.json results/load-def456.json
+
+Prints every numeric metric present in both files with its relative change.
+"""
+
+import json
+import sys
+
+
+def flatten(obj, prefix=""):
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from flatten(value, f"{prefix}{key}.")
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        yield prefix[:-1], obj
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__.strip())
+
+    with open(sys.argv[1]) as fh:
+        old = json.load(fh)
+    with open(sys.argv[2]) as fh:
+        new = json.load(fh)
+
+    print(f"{old['benchmark']}: {old['git_commit']} -> {new['git_commit']}\n")
+    old_metrics = dict(flatten(old["results"]))
+    new_metrics = dict(flatten(new["results"]))
+
+    width = max((len(k) for k in old_metrics), default=10)
+    for key, before in old_metrics.items():
+        if key not in new_metrics:
+            continue
+        after = new_metrics[key]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        print(f"{key:<{width}}  {before:>14}  {after:>14}  {change:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Local RSS / Atom feed server for exercising the news ingestion.
+
+    python benchmarks/news_fixture.py --feeds 300 --port 8800 --list feeds.txt
+    NEWS_FEEDS_FILE=feeds.txt NEWS_POLL_INTERVAL_S=30 uvicorn main:app
+
+Serves /feed/<n>.xml (even n RSS 2.0, odd n Atom) with ETag and
+Last-Modified, answering 304 to matching conditional requests and
+gzip-compressing for clients that accept it. Every feed also carries the
+same few "wire" stories, as syndicated news does, so deduplication has
+something to do. A fraction of the feeds can be set to ignore the
+validators, like many real servers.
+
+`FeedFixture.advance(fraction)` publishes one new story on that fraction
+of the feeds; `requests` counts what was served.
+"""
+
+import argparse
+import gzip
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WIRE_STORIES = 3
+SUMMARY = ("Operators report that closed-loop cooling and smarter scheduling cut the water "
+           "and energy used per AI request, while recycling programs expand to cover more "
+           "electronics. Analysts expect efficiency incentives to follow. ")
+
+
+class FeedFixture:
+    def __init__(self, feeds, items_per_feed=20, ignore_validators=0.0, port=0, seed=0):
+        rng = random.Random(seed)
+        self.feeds = feeds
+        self.items_per_feed = items_per_feed
+        self.requests = {"200": 0, "304": 0}
+        self._lock = threading.Lock()
+        self._no_validators = {n for n in range(feeds) if rng.random() < ignore_validators}
+        self._stories = {n: [self._story(n, i) for i in range(items_per_feed - WIRE_STORIES)]
+                         for n in range(feeds)}
+        self._version = dict.fromkeys(range(feeds), 1)
+        self._modified = dict.fromkeys(range(feeds), time.time() - 3600)
+        self._rendered = {}
+        self._rng = rng
+
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                fixture._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def urls(self):
+        host, port = self.server.server_address
+        return [f"http://{host}:{port}/feed/{n}.xml" for n in range(self.feeds)]
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def _story(feed, i):
+        return {
+            "title": f"Feed {feed} story {i}: data centre efficiency update",
+            "summary": f"Story {i} from feed {feed}. " + SUMMARY,
+            "link": f"https://example.org/{feed}/{i}",
+            "published": time.time() - 86400 + i * 60,
+        }
+
+    def advance(self, fraction):
+        """Publish one new story on `fraction` of the feeds; returns how many changed."""
+        changed = [n for n in range(self.feeds) if self._rng.random() < fraction]
+        with self._lock:
+            for n in changed:
+                stories = self._stories[n]
+                stories.append(self._story(n, len(stories) + WIRE_STORIES))
+                self._version[n] += 1
+                self._modified[n] = time.time()
+                self._rendered.pop(n, None)
+        return len(changed)
+
+    def _render(self, n):
+        stories = self._stories[n][-(self.items_per_feed - WIRE_STORIES):][::-1]
+        stories += [{"title": f"Wire story {w}: recycling rules tightened",
+                     "summary": f"Wire {w}. " + SUMMARY,
+                     "link": f"https://wire.example.org/{w}",
+                     "published": time.time() - 7200} for w in range(WIRE_STORIES)]
+        if n % 2 == 0:
+            items = "".join(
+                f"<item><title>{s['title']}</title><link>{s['link']}</link>"
+                f"<description>&lt;p&gt;{s['summary']}&lt;/p&gt;</description>"
+                f"<pubDate>{formatdate(s['published'], usegmt=True)}</pubDate></item>"
+                for s in stories
+            )
+            doc = (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                   f"<title>Fixture feed {n}</title><link>https://example.org/{n}</link>"
+                   f"<description>Sustainability news</description>{items}</channel></rss>")
+        else:
+            entries = "".join(
+                f"<entry><title>{s['title']}</title><link href=\"{s['link']}\"/>"
+                f"<id>{s['link']}</id><summary>{s['summary']}</summary>"
+                f"<updated>{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(s['published']))}</updated></entry>"
+                for s in stories
+            )
+            doc = (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+                   f"<title>Fixture feed {n}</title><id>urn:fixture:{n}</id>{entries}</feed>")
+        body = doc.encode()
+        return body, gzip.compress(body, 6)
+
+    def _serve(self, handler):
+        try:
+            n = int(handler.path.rsplit("/", 1)[-1].split(".")[0])
+            if not 0 <= n < self.feeds:
+                raise ValueError
+        except ValueError:
+            handler.send_error(404)
+            return
+        with self._lock:
+            etag = f'"{n}-{self._version[n]}"'
+            last_modified = formatdate(self._modified[n], usegmt=True)
+            if n not in self._rendered:
+                self._rendered[n] = self._render(n)
+            plain, compressed = self._rendered[n]
+
+        validators = n not in self._no_validators
+        if validators and (handler.headers.get("If-None-Match") == etag
+                           or handler.headers.get("If-Modified-Since") == last_modified):
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.end_headers()
+            self._count("304")
+            return
+
+        use_gzip = "gzip" in handler.headers.get("Accept-Encoding", "")
+        body = compressed if use_gzip else plain
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/rss+xml" if n % 2 == 0 else "application/atom+xml")
+        handler.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            handler.send_header("Content-Encoding", "gzip")
+        if validators:
+            handler.send_header("ETag", etag)
+            handler.send_header("Last-Modified", last_modified)
+        handler.end_headers()
+        try:
+            handler.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        self._count("200")
+
+    def _count(self, key):
+        with self._lock:
+            self.requests[key] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--feeds", type=int, default=300)
+    parser.add_argument("--items", type=int, default=20, help="items per feed")
+    parser.add_argument("--ignore-validators", type=float, default=0.1,
+                        help="fraction of feeds that never answer 304")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--publish-every", type=float, default=60.0,
+                        help="seconds between rounds of new stories (0 = never)")
+    parser.add_argument("--list", help="write the feed URLs to this file (for NEWS_FEEDS_FILE)")
+    args = parser.parse_args()
+
+    fixture = FeedFixture(args.feeds, args.items, args.ignore_validators, port=args.port)
+    if args.list:
+        with open(args.list, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(fixture.urls) + "\n")
+    print(f"serving {args.feeds} feeds on {fixture.urls[0].rsplit('/', 2)[0]}/feed/<n>.xml")
+    try:
+        while True:
+            time.sleep(args.publish_every or 3600)
+            if args.publish_every:
+                print(f"published on {fixture.advance(0.1)} feeds")
+    except KeyboardInterrupt:
+        fixture.shutdown()
+
+
+if __name__ == "__main__":
+    main()
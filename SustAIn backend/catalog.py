@@ -0,0 +1,531 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+
+from gradcam_model import placeholder_score
+
+# =====================================================
+# CATALOG SCORING JOBS
+# =====================================================
+# Scores a whole product catalog (a directory or a .zip of images, plus
+# an optional descriptions.csv with `image,description` rows) outside
+# the per-request Grad-CAM quota. The images flow through a pipeline of
+# stages, each with its own worker pool, joined by bounded queues:
+#
+#   read + decode (CATALOG_DECODE_WORKERS threads)
+#     -> batched Grad-CAM (one thread, CATALOG_BATCH_SIZE images a pass)
+#     -> material score + calculate_psi (CATALOG_PSI_WORKERS threads)
+#     -> results writer (one thread)
+#
+# Decoding is the CPU-heavy part and runs in parallel outside the model
+# lock; the model sees full batches, interleaved with interactive
+# /gradcam calls between passes. Bounded queues keep at most a few
+# batches of decoded images in memory whatever the catalog size.
+#
+# Results go to results.jsonl in the job's output directory, one line
+# per image: that file is the checkpoint. It is flushed, and
+# progress.json rewritten, every CATALOG_PROGRESS_EVERY_S. A job that is
+# stopped (shutdown, Ctrl-C) or crashes is resumed by running it again
+# with the same output directory; images already in results.jsonl are
+# skipped, so a crash costs at most the last few seconds of work.
+#
+# Without Grad-CAM weights the visual score is a placeholder derived from
+# the image hash, like the endpoint's placeholder but stable across runs.
+#
+#     python catalog.py score <dir-or-zip> <out-dir>
+
+CATALOG_DIR = os.getenv("CATALOG_DIR", "./catalog_jobs")
+CATALOG_DECODE_WORKERS = int(os.getenv("CATALOG_DECODE_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+CATALOG_BATCH_SIZE = int(os.getenv("CATALOG_BATCH_SIZE", "16"))
+CATALOG_PSI_WORKERS = int(os.getenv("CATALOG_PSI_WORKERS", "2"))
+CATALOG_MAX_IMAGES = int(os.getenv("CATALOG_MAX_IMAGES", "20000"))
+CATALOG_PROGRESS_EVERY_S = 2.0
+MAX_IMAGE_BYTES = 20 * 2 ** 20
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+DESCRIPTIONS_FILE = "descriptions.csv"
+RESULTS_FILE = "results.jsonl"
+PROGRESS_FILE = "progress.json"
+JOB_FILE = "job.json"
+ARCHIVE_FILE = "catalog.zip"
+
+_DONE = object()  # end-of-stream marker between stages
+_JOB_ID_RE = re.compile(r"[0-9a-f]{16}")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def score_psi(gradcam_score, description):
+    """
+    (PSI, material match or None): the material lifecycle score is
+    blended in when the description names known materials, otherwise the
+    PSI is the visual score alone. Shared with /gradcam.
+    """
+    import materials
+    from utils import calculate_psi
+
+    found = materials.score_description(description) if description else None
+    if found and found["material_score"] is not None:
+        return calculate_psi(found["material_score"], gradcam_score), found
+    return round(gradcam_score * 100, 2), found
+
+
+# =====================================================
+# SOURCES
+# =====================================================
+
+class CatalogSource:
+    """Image names, bytes and descriptions of a directory or a zip file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+        if self._zip is None and not os.path.isdir(path):
+            raise ValueError(f"not a directory or zip file: {path}")
+
+    def names(self):
+        if self._zip is not None:
+            names = [i.filename for i in self._zip.infolist() if not i.is_dir()]
+        else:
+            names = [
+                os.path.relpath(os.path.join(root, f), self.path).replace(os.sep, "/")
+                for root, _, files in os.walk(self.path) for f in files
+            ]
+        return sorted(n for n in names if n.lower().endswith(IMAGE_EXTENSIONS))
+
+    def read(self, name):
+        # ZipFile serializes reads of the shared file itself: safe from many threads
+        if self._zip is not None:
+            if self._zip.getinfo(name).file_size > MAX_IMAGE_BYTES:
+                raise ValueError("image too large")
+            return self._zip.read(name)
+        path = os.path.join(self.path, name)
+        if os.path.getsize(path) > MAX_IMAGE_BYTES:
+            raise ValueError("image too large")
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def descriptions(self):
+        """image name -> description, from descriptions.csv if present."""
+        if self._zip is not None:
+            if DESCRIPTIONS_FILE not in self._zip.namelist():
+                return {}
+            text = self._zip.read(DESCRIPTIONS_FILE).decode("utf-8-sig")
+        else:
+            path = os.path.join(self.path, DESCRIPTIONS_FILE)
+            if not os.path.exists(path):
+                return {}
+            with open(path, encoding="utf-8-sig") as fh:
+                text = fh.read()
+        return {
+            row["image"].strip(): row.get("description") or ""
+            for row in csv.DictReader(io.StringIO(text)) if row.get("image")
+        }
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+# =====================================================
+# PIPELINE
+# =====================================================
+
+def _load_checkpoint(results_path):
+    """(names already in results.jsonl, how many failed); a torn last line is cut off."""
+    done, failed = set(), 0
+    if not os.path.exists(results_path):
+        return done, failed
+    with open(results_path, "rb+") as fh:
+        data = fh.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            fh.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            row = json.loads(line)
+            done.add(row["image"])
+        except (ValueError, KeyError):
+            continue
+        failed += "error" in row
+    return done, failed
+
+
+class CatalogJob:
+    def __init__(self, source_path, out_dir, model=None, decode_workers=CATALOG_DECODE_WORKERS,
+                 batch_size=CATALOG_BATCH_SIZE, psi_workers=CATALOG_PSI_WORKERS, on_progress=None):
+        self.source_path = source_path
+        self.out_dir = out_dir
+        self.model = model
+        self.decode_workers = decode_workers
+        self.batch_size = batch_size
+        self.psi_workers = psi_workers
+        self.on_progress = on_progress
+        self._stop = threading.Event()
+        self._progress = {"state": "queued", "total": None, "done": 0, "failed": 0}
+
+    def stop(self):
+        """Finish the images in flight, then return from run(); resumable."""
+        self._stop.set()
+
+    def progress(self):
+        return dict(self._progress)
+
+    def run(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        results_path = os.path.join(self.out_dir, RESULTS_FILE)
+        source = CatalogSource(self.source_path)
+        try:
+            names = source.names()
+            descriptions = source.descriptions()
+            done, failed = _load_checkpoint(results_path)
+            todo = [n for n in names if n not in done]
+            self._progress.update(
+                state="running", total=len(names), done=len(names) - len(todo), failed=failed,
+                started_at=_now(), images_per_s=None, eta_s=None, error=None,
+            )
+            self._write_progress()
+            self._run_pipeline(source, todo, descriptions, results_path)
+        except Exception as exc:
+            self._progress.update(state="failed", error=f"{type(exc).__name__}: {exc}"[:200])
+            raise
+        finally:
+            source.close()
+            if self._progress["state"] == "running":
+                self._progress["state"] = "paused" if self._stop.is_set() else "done"
+            self._write_progress()
+        return self.progress()
+
+    def _run_pipeline(self, source, todo, descriptions, results_path):
+        depth = max(2, 2 * self.batch_size)
+        decoded, scored, finished = queue.Queue(depth), queue.Queue(depth), queue.Queue(depth)
+        names = iter(todo)
+        names_lock = threading.Lock()
+        model = self.model
+
+        def decode_worker():
+            while not self._stop.is_set():
+                with names_lock:
+                    name = next(names, None)
+                if name is None:
+                    break
+                sha256 = None
+                try:
+                    data = source.read(name)
+                    sha256 = hashlib.sha256(data).hexdigest()
+                    tensor = model.preprocess(data) if model is not None else None
+                    decoded.put((name, sha256, tensor, None))
+                except Exception as exc:  # one bad file does not stop the job
+                    decoded.put((name, sha256, None, f"{type(exc).__name__}: {exc}"[:200]))
+            decoded.put(_DONE)
+
+        def inference_worker():
+            remaining = self.decode_workers
+            while remaining:
+                batch = []
+                item = decoded.get()
+                while True:
+                    if item is _DONE:
+                        remaining -= 1
+                    else:
+                        batch.append(item)
+                    if len(batch) >= self.batch_size or not remaining:
+                        break
+                    try:
+                        item = decoded.get_nowait() if batch else decoded.get()
+                    except queue.Empty:
+                        break  # score what is ready rather than wait for a full batch
+                self._score_batch(batch, scored)
+            for _ in range(self.psi_workers):
+                scored.put(_DONE)
+
+        def psi_worker():
+            while True:
+                item = scored.get()
+                if item is _DONE:
+                    break
+                name, sha256, gradcam, error = item
+                row = {"image": name, "sha256": sha256}
+                if error is None:
+                    psi, found = score_psi(gradcam, descriptions.get(name))
+                    row.update(gradcam=gradcam, PSI=psi)
+                    if found is not None:
+                        row.update(found)
+                else:
+                    row["error"] = error
+                finished.put(row)
+            finished.put(_DONE)
+
+        stages = (
+            [threading.Thread(target=decode_worker, name=f"catalog-decode-{i}") for i in range(self.decode_workers)]
+            + [threading.Thread(target=inference_worker, name="catalog-infer")]
+            + [threading.Thread(target=psi_worker, name=f"catalog-psi-{i}") for i in range(self.psi_workers)]
+        )
+        for t in stages:
+            t.start()
+        try:
+            self._write_results(finished, results_path)
+        except BaseException:
+            # a writer error or Ctrl-C: stop reading images and let the
+            # stages run dry, none may stay blocked on a full queue
+            self._stop.set()
+            raise
+        finally:
+            while any(t.is_alive() for t in stages):
+                try:
+                    finished.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            for t in stages:
+                t.join()
+
+    def _score_batch(self, batch, out):
+        ok = [item for item in batch if item[3] is None]
+        for name, sha256, _, error in batch:
+            if error is not None:
+                out.put((name, sha256, None, error))
+        if not ok:
+            return
+        try:
+            if self.model is not None:
+                scores = self.model.score_preprocessed([tensor for _, _, tensor, _ in ok])
+            else:
+                scores = [placeholder_score(sha256) for _, sha256, _, _ in ok]
+        except Exception as exc:
+            scores = [None] * len(ok)
+            error = f"Grad-CAM failed: {type(exc).__name__}"
+        for (name, sha256, _, _), score in zip(ok, scores):
+            if score is None:
+                out.put((name, sha256, None, error))
+            else:
+                out.put((name, sha256, round(score, 2), None))
+
+    def _write_results(self, finished, results_path):
+        remaining = self.psi_workers
+        t0 = last_report = time.monotonic()
+        processed = 0
+        with open(results_path, "a", encoding="utf-8") as fh:
+            while remaining:
+                row = finished.get()
+                if row is _DONE:
+                    remaining -= 1
+                    continue
+                fh.write(json.dumps(row, separators=(",", ":")) + "\n")
+                processed += 1
+                self._progress["done"] += 1
+                if "error" in row:
+                    self._progress["failed"] += 1
+                now = time.monotonic()
+                if now - last_report >= CATALOG_PROGRESS_EVERY_S:
+                    fh.flush()
+                    last_report = now
+                    self._update_rate(processed, now - t0)
+                    self._write_progress()
+        self._update_rate(processed, time.monotonic() - t0)
+
+    def _update_rate(self, processed, elapsed):
+        rate = processed / elapsed if elapsed > 0 else None
+        left = self._progress["total"] - self._progress["done"]
+        self._progress.update(
+            images_per_s=round(rate, 1) if rate else None,
+            eta_s=round(left / rate) if rate else None,
+        )
+
+    def _write_progress(self):
+        self._progress["updated_at"] = _now()
+        path = os.path.join(self.out_dir, PROGRESS_FILE)
+        with open(path + ".tmp", "w") as fh:
+            json.dump(self._progress, fh)
+        os.replace(path + ".tmp", path)
+        if self.on_progress is not None:
+            self.on_progress(self.progress())
+
+
+# =====================================================
+# JOB RUNNER (API)
+# =====================================================
+# Uploaded catalogs are stored under CATALOG_DIR/<job_id>/ and run one at
+# a time on a background thread, so a job never competes with another
+# for the CPU. Jobs left unfinished by a restart are queued again on
+# start and resume from their results.jsonl.
+
+def _load_model():
+    import gradcam_model
+
+    return gradcam_model.load() if gradcam_model.WEIGHTS_PATH else None
+
+
+class JobRunner:
+    def __init__(self, root=CATALOG_DIR):
+        self.root = root
+        self._queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._current = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        os.makedirs(self.root, exist_ok=True)
+        job_ids = [j for j in os.listdir(self.root) if _JOB_ID_RE.fullmatch(j)]
+        for job_id in sorted(job_ids, key=lambda j: os.path.getmtime(self._job_dir(j))):
+            state = (self.status(job_id) or {}).get("state")
+            if state in ("queued", "running", "paused"):
+                self._queue.put(job_id)
+        self._thread = threading.Thread(target=self._run, name="catalog-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Pause the running job (it resumes on the next start)."""
+        self._stopping.set()
+        self._queue.put(None)
+        with self._lock:
+            if self._current is not None:
+                self._current.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, user_id, upload):
+        """Store an uploaded zip (file object) as a new job; returns its status."""
+        job_id = uuid.uuid4().hex[:16]
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        archive = os.path.join(job_dir, ARCHIVE_FILE)
+        try:
+            with open(archive, "wb") as fh:
+                shutil.copyfileobj(upload, fh, 2 ** 20)
+            source = CatalogSource(archive)
+            try:
+                total = len(source.names())
+            finally:
+                source.close()
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        if not 1 <= total <= CATALOG_MAX_IMAGES:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise ValueError(f"A catalog holds between 1 and {CATALOG_MAX_IMAGES} images, this one {total}")
+
+        with open(os.path.join(job_dir, JOB_FILE), "w") as fh:
+            json.dump({"job_id": job_id, "user_id": user_id, "created_at": _now()}, fh)
+        progress = {"state": "queued", "total": total, "done": 0, "failed": 0, "updated_at": _now()}
+        with open(os.path.join(job_dir, PROGRESS_FILE), "w") as fh:
+            json.dump(progress, fh)
+        self._queue.put(job_id)
+        return {"job_id": job_id, **progress}
+
+    def job(self, job_id):
+        if not _JOB_ID_RE.fullmatch(job_id):
+            return None
+        try:
+            with open(os.path.join(self._job_dir(job_id), JOB_FILE)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def status(self, job_id):
+        if not _JOB_ID_RE.fullmatch(job_id):
+            return None  # never a path outside CATALOG_DIR
+        with self._lock:
+            current = self._current
+        if current is not None and current.out_dir == self._job_dir(job_id):
+            return {"job_id": job_id, **current.progress()}
+        try:
+            with open(os.path.join(self._job_dir(job_id), PROGRESS_FILE)) as fh:
+                return {"job_id": job_id, **json.load(fh)}
+        except (OSError, ValueError):
+            return None
+
+    def active_job_of(self, user_id):
+        for job_id in os.listdir(self.root):
+            job = self.job(job_id)
+            if job and job["user_id"] == user_id:
+                if (self.status(job_id) or {}).get("state") in ("queued", "running", "paused"):
+                    return job_id
+        return None
+
+    def results(self, job_id):
+        """The complete result lines written so far (bytes)."""
+        try:
+            with open(os.path.join(self._job_dir(job_id), RESULTS_FILE), "rb") as fh:
+                data = fh.read()
+        except FileNotFoundError:
+            return b""
+        return data[:data.rfind(b"\n") + 1]  # the writer may be mid-line
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None or self._stopping.is_set():
+                return
+            job_dir = self._job_dir(job_id)
+            job = CatalogJob(os.path.join(job_dir, ARCHIVE_FILE), job_dir, model=None)
+            with self._lock:
+                self._current = job
+            try:
+                job.model = _load_model()
+                job.run()
+            except Exception:
+                pass  # recorded in the job's progress.json
+            finally:
+                with self._lock:
+                    self._current = None
+
+
+runner = JobRunner()
+
+
+# =====================================================
+# CLI
+# =====================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a product catalog (PSI per image).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    score = sub.add_parser("score", help="score a directory or zip of images; rerun to resume")
+    score.add_argument("source", help="directory or .zip of images (+ optional descriptions.csv)")
+    score.add_argument("out_dir", help="results.jsonl and progress.json go here")
+    score.add_argument("--decode-workers", type=int, default=CATALOG_DECODE_WORKERS)
+    score.add_argument("--batch-size", type=int, default=CATALOG_BATCH_SIZE)
+    score.add_argument("--psi-workers", type=int, default=CATALOG_PSI_WORKERS)
+    args = parser.parse_args(argv)
+
+    def report(p):
+        rate = f"{p['images_per_s']} img/s" if p.get("images_per_s") else "-"
+        print(f"\r{p['state']}: {p['done']}/{p['total']} ({p['failed']} failed) {rate}   ",
+              end="", file=sys.stderr, flush=True)
+
+    job = CatalogJob(args.source, args.out_dir, model=_load_model(), decode_workers=args.decode_workers,
+                     batch_size=args.batch_size, psi_workers=args.psi_workers, on_progress=report)
+    try:
+        progress = job.run()
+    except KeyboardInterrupt:
+        job.stop()
+        progress = job.progress()
+    print(file=sys.stderr)
+    print(json.dumps(progress))
+    return 0 if progress["state"] == "done" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
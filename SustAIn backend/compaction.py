@@ -0,0 +1,123 @@
+import re
+
+from sessions import estimate_tokens
+
+# =====================================================
+# PROMPT COMPACTION
+# =====================================================
+# Runs on every chat message before the context is built, so pasted
+# bloat is neither sent upstream nor charged to the user:
+#
+# 1. whitespace: trailing spaces dropped, blank-line runs cut to one.
+#    Spaces inside a line are kept: pasted code, aligned tables and
+#    indented blocks must reach the model as they were written
+# 2. repeated blocks: a run of lines that already appeared earlier in the
+#    message (a paragraph or log pasted twice) is replaced by a short
+#    marker. Runs are found with a rolling hash over per-line hashes, so
+#    the whole pass is linear in the message length.
+# 3. optional truncation: with a token budget, an oversized message keeps
+#    its head and tail and the middle is replaced by a marker
+#
+# Short repeats (closing braces, "Thanks!") are left alone: a run is only
+# removed when it is at least DEDUP_MIN_CHARS long.
+
+DEDUP_MIN_LINES = 3      # window of the rolling hash
+DEDUP_MIN_CHARS = 120    # shortest run worth removing
+TRUNCATE_HEAD_FRACTION = 0.7
+
+REPEAT_MARKER = "[repeated text omitted]"
+TRUNCATE_MARKER = "[... {} tokens of pasted text truncated ...]"
+
+_HASH_BASE = 1000003
+_HASH_MOD = (1 << 61) - 1
+
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _squeeze_whitespace(text):
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _TRAILING_SPACE_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def _drop_repeats(lines):
+    """
+    Lines with every repeated run of >= DEDUP_MIN_LINES lines (and
+    >= DEDUP_MIN_CHARS) after its first occurrence replaced by a marker.
+    A long single line repeated verbatim counts as a run as well.
+    """
+    k = DEDUP_MIN_LINES
+    hashes = [hash(line) & 0xFFFFFFFF for line in lines]
+    top = pow(_HASH_BASE, k - 1, _HASH_MOD)
+    seen_windows = {}   # rolling hash of k lines -> first start index
+    seen_long = {}      # long line -> first index
+    out = []
+    i, n = 0, len(lines)
+    window_hash, window_chars, window_start = 0, 0, 0
+
+    while i < n:
+        line = lines[i]
+        # a long line seen before: drop it on its own
+        if len(line) >= DEDUP_MIN_CHARS:
+            first = seen_long.setdefault(line, i)
+            if first != i:
+                if not out or out[-1] != REPEAT_MARKER:
+                    out.append(REPEAT_MARKER)
+                i += 1
+                window_hash, window_chars, window_start = 0, 0, i
+                continue
+
+        # slide the window [window_start, i] to end at i
+        window_hash = (window_hash * _HASH_BASE + hashes[i]) % _HASH_MOD
+        window_chars += len(line)
+        if i - window_start + 1 > k:
+            old = window_start
+            window_hash = (window_hash - hashes[old] * top * _HASH_BASE) % _HASH_MOD
+            window_chars -= len(lines[old])
+            window_start += 1
+        out.append(line)
+        i += 1
+        if i - window_start < k:
+            continue
+
+        start = window_start
+        first = seen_windows.setdefault(window_hash, start)
+        if first == start or first + k > start or window_chars < DEDUP_MIN_CHARS \
+                or lines[first:first + k] != lines[start:start + k]:
+            continue
+
+        # lines[start:i] repeat lines[first:first+k]: extend the run as far as it goes
+        end = i
+        while end < n and first + (end - start) < start and lines[end] == lines[first + (end - start)]:
+            end += 1
+        del out[len(out) - k:]
+        if not out or out[-1] != REPEAT_MARKER:
+            out.append(REPEAT_MARKER)
+        i = end
+        window_hash, window_chars, window_start = 0, 0, i
+    return out
+
+
+def _truncate(text, max_tokens):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    marker_tokens = estimate_tokens(TRUNCATE_MARKER.format(10 ** 6))
+    keep_chars = max(0, max_tokens - marker_tokens) * 4
+    head = int(keep_chars * TRUNCATE_HEAD_FRACTION)
+    tail = keep_chars - head
+    cut = text[head:len(text) - tail]
+    marker = TRUNCATE_MARKER.format(estimate_tokens(cut))
+    return text[:head].rstrip() + "\n" + marker + "\n" + text[len(text) - tail:].lstrip()
+
+
+def compact(message, max_tokens=None):
+    """
+    Compact a chat message. Returns (text, tokens_saved); `max_tokens`
+    opts in to truncating what is still larger than that.
+    """
+    text = _squeeze_whitespace(message)
+    text = "\n".join(_drop_repeats(text.split("\n")))
+    if max_tokens is not None:
+        text = _truncate(text, max_tokens)
+    return text, max(0, estimate_tokens(message) - estimate_tokens(text))
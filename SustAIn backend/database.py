@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./sustain.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sustain.db")
 
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}
@@ -9,3 +11,41 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
+
+
+def get_db():
+    """FastAPI dependency: one session per request."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def init_db():
+    """Create missing tables. Called from the app lifespan, not at import."""
+    import models  # noqa: F401  (registers the tables on Base)
+
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns():
+    """
+    Add nullable columns introduced after a table was created. There are
+    no migrations; create_all only creates whole tables.
+    """
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            present = {c["name"] for c in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                type_sql = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {type_sql}'))
+                if column.index:
+                    unique = "UNIQUE " if column.unique else ""
+                    conn.execute(text(
+                        f'CREATE {unique}INDEX IF NOT EXISTS ix_{table.name}_{column.name} '
+                        f'ON {table.name} ("{column.name}")'
+                    ))
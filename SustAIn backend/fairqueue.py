@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# =====================================================
+# FAIR QUEUE FOR UPSTREAM MODEL CALLS
+# =====================================================
+# The upstream model serves MODEL_CONCURRENCY calls at a time. Without a
+# gate in front of it, a company that floods /chat takes every slot and
+# everyone else's requests wait behind its backlog. Every model call
+# (/chat, /chat/stream, each /chat/batch item) first takes a slot here:
+#
+# - requests queue per tenant: the user's company and role (each role
+#   has its own limit policy, so its own weight and cap), or the user
+#   alone when they have no company;
+# - free slots go to the queued tenants by deficit round robin: each
+#   turn a tenant earns its policy's model_weight in credit and spends
+#   one credit per call, so over time the calls divide in proportion to
+#   the weights, however deep one tenant's queue is;
+# - a tenant never has more than its policy's max_concurrent_model_calls
+#   in flight, even when slots are free;
+# - at most MODEL_MAX_QUEUED_PER_TENANT wait per tenant; more are turned
+#   away at once, and a request still waiting after
+#   MODEL_QUEUE_DEADLINE_S gives up. Both surface as 503: nothing was
+#   charged, the client can retry.
+#
+# Waiting requests hold a worker thread, so keep the threadpool larger
+# than a few tenants' caps plus queues; the queue bound keeps one tenant
+# from taking all of them.
+
+MODEL_CONCURRENCY = int(os.getenv("MODEL_CONCURRENCY", "16"))
+MODEL_QUEUE_DEADLINE_S = float(os.getenv("MODEL_QUEUE_DEADLINE_S", "20"))
+MODEL_MAX_QUEUED_PER_TENANT = int(os.getenv("MODEL_MAX_QUEUED_PER_TENANT", "16"))
+MAX_TENANTS = 10000  # idle tenants beyond this are forgotten, oldest first
+WAIT_SAMPLES = 1000  # per tenant, for the wait percentiles
+STATS_TENANTS = 100  # busiest tenants listed by stats()
+MIN_WEIGHT = 0.01
+
+
+class QueueRejected(Exception):
+    """The call was not admitted (queue full or deadline passed)."""
+
+
+class _Waiter:
+    __slots__ = ("granted", "enqueued_at")
+
+    def __init__(self, now):
+        self.granted = threading.Event()
+        self.enqueued_at = now
+
+
+class _Tenant:
+    __slots__ = ("name", "weight", "cap", "queue", "active", "deficit", "has_turn", "in_ring",
+                 "granted", "rejected", "expired", "waits")
+
+    def __init__(self, name):
+        self.name = name
+        self.weight = 1.0
+        self.cap = 1
+        self.queue = deque()
+        self.active = 0
+        self.deficit = 0.0
+        self.has_turn = False
+        self.in_ring = False
+        self.granted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+
+
+def _percentile_ms(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000, 2)
+
+
+class FairQueue:
+    def __init__(self, concurrency=MODEL_CONCURRENCY, deadline_s=MODEL_QUEUE_DEADLINE_S,
+                 max_queued=MODEL_MAX_QUEUED_PER_TENANT):
+        self.concurrency = concurrency
+        self.deadline_s = deadline_s
+        self.max_queued = max_queued
+        self._tenants = OrderedDict()  # least recently used first
+        self._ring = deque()           # tenants with queued calls, in turn order
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tenant, weight=1.0, cap=1):
+        """
+        Wait for a model slot; returns the tenant to pass to release().
+        Raises QueueRejected if the tenant's queue is full or the
+        deadline passes first.
+        """
+        now = time.monotonic()
+        waiter = _Waiter(now)
+        with self._lock:
+            t = self._tenant(tenant)
+            t.weight, t.cap = max(weight, MIN_WEIGHT), max(cap, 1)
+            if len(t.queue) >= self.max_queued:
+                t.rejected += 1
+                raise QueueRejected(f"Too many queued model calls for {tenant}")
+            t.queue.append(waiter)
+            if not t.in_ring:
+                t.in_ring = True
+                self._ring.append(t)
+            self._dispatch()
+        if not waiter.granted.wait(self.deadline_s):
+            with self._lock:
+                if not waiter.granted.is_set():
+                    t.queue.remove(waiter)
+                    t.expired += 1
+                    if not t.queue and t.in_ring:
+                        self._leave_ring(t)
+                    raise QueueRejected("Timed out waiting for the model")
+        return t
+
+    def release(self, t):
+        with self._lock:
+            t.active -= 1
+            self._in_flight -= 1
+            self._dispatch()
+
+    def _tenant(self, name):
+        t = self._tenants.get(name)
+        if t is None:
+            t = self._tenants[name] = _Tenant(name)
+            if len(self._tenants) > MAX_TENANTS:
+                for old in list(self._tenants.values()):
+                    if len(self._tenants) <= MAX_TENANTS:
+                        break
+                    if not old.queue and not old.active:
+                        del self._tenants[old.name]
+        else:
+            self._tenants.move_to_end(name)
+        return t
+
+    def _leave_ring(self, t):
+        self._ring.remove(t)
+        t.in_ring = False
+        t.deficit = 0.0
+        t.has_turn = False
+
+    def _dispatch(self):
+        # deficit round robin over the tenants with queued calls; a tenant
+        # at its cap is passed over without losing its credit
+        ring, blocked = self._ring, 0
+        while self._in_flight < self.concurrency and ring and blocked < len(ring):
+            t = ring[0]
+            if t.active >= t.cap:
+                t.has_turn = False
+                ring.rotate(-1)
+                blocked += 1
+                continue
+            if not t.has_turn:
+                t.has_turn = True
+                t.deficit += t.weight
+            if t.deficit < 1:  # weight below 1: credit builds over several turns
+                t.has_turn = False
+                ring.rotate(-1)
+                blocked = 0
+                continue
+            t.deficit -= 1
+            waiter = t.queue.popleft()
+            t.active += 1
+            t.granted += 1
+            self._in_flight += 1
+            t.waits.append(time.monotonic() - waiter.enqueued_at)
+            waiter.granted.set()
+            blocked = 0
+            if not t.queue:
+                ring.popleft()
+                t.in_ring = False
+                t.deficit = 0.0
+                t.has_turn = False
+
+    def _tenant_stats(self, t):
+        return {
+            "queued": len(t.queue),
+            "active": t.active,
+            "weight": t.weight,
+            "cap": t.cap,
+            "granted": t.granted,
+            "rejected": t.rejected,
+            "expired": t.expired,
+            "wait_p50_ms": _percentile_ms(t.waits, 50),
+            "wait_p99_ms": _percentile_ms(t.waits, 99),
+        }
+
+    def stats(self, tenant=None):
+        """Totals and the STATS_TENANTS busiest tenants, or only `tenant`."""
+        with self._lock:
+            if tenant is not None:
+                t = self._tenants.get(tenant)
+                chosen = [t] if t is not None else []
+            else:
+                chosen = sorted(self._tenants.values(), key=lambda t: (-len(t.queue), -t.active, -t.granted))
+            return {
+                "concurrency": self.concurrency,
+                "in_flight": self._in_flight,
+                "queued": sum(len(t.queue) for t in self._ring),
+                "tenants_total": len(self._tenants),
+                "tenants": {t.name: self._tenant_stats(t) for t in chosen[:STATS_TENANTS]},
+            }
+
+
+model_queue = FairQueue()
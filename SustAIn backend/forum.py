@@ -0,0 +1,217 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import get_db
+from idempotency import MAX_KEY_LENGTH, REPLAYED_HEADER
+from models import ForumPost, ForumThread
+
+# =====================================================
+# FORUM API
+# =====================================================
+# Lists are newest first (threads) or oldest first (posts) and paginated
+# by keyset: each page returns `next_cursor`, the id to pass as `before`
+# (threads, search) or `after` (posts) for the following page. Unlike
+# OFFSET, the cost of a page does not grow with how deep it is.
+#
+# GET responses carry an ETag over the body; a client that sends it back
+# in If-None-Match gets an empty 304 while the page is unchanged.
+#
+# POST /threads honours Idempotency-Key, stored with the thread (unique)
+# rather than in the in-memory idempotency store: the desktop outbox may
+# resend a thread days later, across backend restarts. A replay returns
+# the existing thread with `Idempotent-Replayed: true`.
+
+router = APIRouter(prefix="/forum", tags=["forum"])
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ThreadCreate(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    author: str = Field(..., min_length=1, max_length=100)
+    body: str = Field(..., min_length=1, max_length=10000)
+
+
+class PostCreate(BaseModel):
+    author: str = Field(..., min_length=1, max_length=100)
+    body: str = Field(..., min_length=1, max_length=10000)
+
+
+def _iso(value: Optional[datetime]):
+    return value.isoformat() + "Z" if value is not None else None
+
+
+def _thread_dict(t: ForumThread):
+    return {
+        "id": t.id,
+        "title": t.title,
+        "author": t.author,
+        "body": t.body,
+        "created_at": _iso(t.created_at),
+        "post_count": t.post_count,
+        "last_post_at": _iso(t.last_post_at),
+    }
+
+
+def _post_dict(p: ForumPost):
+    return {
+        "id": p.id,
+        "thread_id": p.thread_id,
+        "author": p.author,
+        "body": p.body,
+        "created_at": _iso(p.created_at),
+    }
+
+
+def _page(items, limit):
+    return {"items": items, "next_cursor": items[-1]["id"] if len(items) == limit else None}
+
+
+def _cached_json(request: Request, payload):
+    """JSON response with a content ETag; 304 if the client already has it."""
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _fts_query(q: str):
+    # every word must match; quoting keeps FTS5 operators out of user input
+    words = [w.replace('"', '""') for w in q.split()]
+    return " ".join(f'"{w}"' for w in words)
+
+
+# ---------- Threads ----------
+@router.get("/threads")
+def list_threads(
+    request: Request,
+    before: Optional[int] = Query(None, ge=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    query = db.query(ForumThread)
+    if before is not None:
+        query = query.filter(ForumThread.id < before)
+    threads = query.order_by(ForumThread.id.desc()).limit(limit).all()
+    return _cached_json(request, _page([_thread_dict(t) for t in threads], limit))
+
+
+def _replayed_thread(db: Session, response: Response, req: ThreadCreate, client_id: str):
+    thread = db.query(ForumThread).filter(ForumThread.client_id == client_id).first()
+    if thread is None:
+        return None
+    if (thread.title, thread.author, thread.body) != (req.title, req.author, req.body):
+        raise HTTPException(422, "Idempotency-Key was already used for a different thread")
+    response.headers[REPLAYED_HEADER] = "true"
+    return _thread_dict(thread)
+
+
+@router.post("/threads", status_code=201)
+def create_thread(
+    req: ThreadCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=MAX_KEY_LENGTH),
+):
+    if idempotency_key is not None:
+        replayed = _replayed_thread(db, response, req, idempotency_key)
+        if replayed is not None:
+            return replayed
+    thread = ForumThread(title=req.title, author=req.author, body=req.body, client_id=idempotency_key)
+    db.add(thread)
+    try:
+        db.commit()
+    except IntegrityError:
+        # a concurrent replay with the same key committed first
+        db.rollback()
+        if idempotency_key is None:
+            raise
+        replayed = _replayed_thread(db, response, req, idempotency_key)
+        if replayed is None:
+            # the conflicting row is gone again; the client may retry
+            raise HTTPException(409, "A thread with this Idempotency-Key is being created or was removed")
+        return replayed
+    db.refresh(thread)
+    return _thread_dict(thread)
+
+
+@router.get("/threads/{thread_id}")
+def get_thread(request: Request, thread_id: int, db: Session = Depends(get_db)):
+    thread = db.get(ForumThread, thread_id)
+    if thread is None:
+        raise HTTPException(404, "Thread not found")
+    return _cached_json(request, _thread_dict(thread))
+
+
+# ---------- Posts ----------
+@router.get("/threads/{thread_id}/posts")
+def list_posts(
+    request: Request,
+    thread_id: int,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    query = db.query(ForumPost).filter(ForumPost.thread_id == thread_id)
+    if after is not None:
+        query = query.filter(ForumPost.id > after)
+    posts = query.order_by(ForumPost.id).limit(limit).all()
+    if not posts and db.get(ForumThread, thread_id) is None:
+        raise HTTPException(404, "Thread not found")
+    return _cached_json(request, _page([_post_dict(p) for p in posts], limit))
+
+
+@router.post("/threads/{thread_id}/posts", status_code=201)
+def create_post(thread_id: int, req: PostCreate, db: Session = Depends(get_db)):
+    thread = db.get(ForumThread, thread_id)
+    if thread is None:
+        raise HTTPException(404, "Thread not found")
+    post = ForumPost(thread_id=thread_id, author=req.author, body=req.body)
+    db.add(post)
+    db.flush()
+    thread.post_count += 1
+    thread.last_post_at = post.created_at
+    db.commit()
+    db.refresh(post)
+    return _post_dict(post)
+
+
+# ---------- Search ----------
+@router.get("/search")
+def search_threads(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    before: Optional[int] = Query(None, ge=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Threads whose title or body contain every word of `q`, newest first."""
+    match = _fts_query(q)
+    if not match:
+        raise HTTPException(422, "Empty search query")
+    # FTS5 walks its index in rowid order, so this is keyset pagination too
+    ids = [
+        row[0]
+        for row in db.execute(
+            text(
+                "SELECT rowid FROM forum_threads_fts WHERE forum_threads_fts MATCH :match "
+                "AND rowid < :before ORDER BY rowid DESC LIMIT :limit"
+            ),
+            {"match": match, "before": before or 2 ** 63 - 1, "limit": limit},
+        )
+    ]
+    threads = {t.id: t for t in db.query(ForumThread).filter(ForumThread.id.in_(ids))} if ids else {}
+    items = [_thread_dict(threads[i]) for i in ids if i in threads]
+    return _cached_json(request, {"items": items, "next_cursor": ids[-1] if len(ids) == limit else None})
@@ -1,4 +1,271 @@
-import numpy as np
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import warnings
+from collections import OrderedDict
 
-def get_gradcam_score():
-    return round(np.random.uniform(0.6, 0.9), 2)
+# =====================================================
+# CONFIG
+# =====================================================
+
+# Weights for the ResNet-18 sustainability head (single logit): either a
+# torch state dict (.pt) or a .safetensors file written by `export_weights`,
+# which is mapped read-only so every worker shares the same physical pages.
+# Without weights the endpoint keeps returning the placeholder score.
+WEIGHTS_PATH = os.getenv("GRADCAM_WEIGHTS", "")
+INPUT_SIZE = 224
+# Batch sizes the warm-up runs and keeps input buffers for
+WARMUP_BATCH_SIZES = tuple(
+    int(b) for b in os.getenv("GRADCAM_WARMUP_BATCH_SIZES", "1,4,8").split(",") if b
+)
+
+# Scores of recently seen images by sha256 of their bytes, so a client can
+# send just the hash for an image it has uploaded before
+SCORE_CACHE_SIZE = int(os.getenv("GRADCAM_SCORE_CACHE_SIZE", 4096))
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+_np = None
+_model = None
+_load_lock = threading.Lock()
+_scores = OrderedDict()
+_scores_lock = threading.Lock()
+
+
+# =====================================================
+# SHARED WEIGHT FILES (safetensors layout)
+# =====================================================
+# 8-byte little-endian header length, JSON header, raw tensor bytes.
+# Written without the safetensors package; files load with it as well.
+
+_DTYPES = {"F32": "float32", "F16": "float16", "I64": "int64", "I32": "int32"}
+_ALIGN = 64
+
+
+def export_weights(state_dict, path):
+    """Write a torch state dict as a mmap-friendly .safetensors file."""
+    items = sorted(
+        ((name, t.detach().cpu().contiguous()) for name, t in state_dict.items()),
+        key=lambda kv: -kv[1].element_size(),  # keeps every tensor naturally aligned
+    )
+    header, offset = {}, 0
+    for name, t in items:
+        code = next(k for k, v in _DTYPES.items() if str(t.dtype) == f"torch.{v}")
+        size = t.numel() * t.element_size()
+        header[name] = {"dtype": code, "shape": list(t.shape), "data_offsets": [offset, offset + size]}
+        offset += size
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    # pad so the data section starts on a 64-byte boundary
+    header_bytes += b" " * (-(8 + len(header_bytes)) % _ALIGN)
+    with open(path, "wb") as fh:
+        fh.write(struct.pack("<Q", len(header_bytes)))
+        fh.write(header_bytes)
+        for _, t in items:
+            fh.write(t.numpy().tobytes())
+
+
+def load_mapped_weights(path):
+    """
+    Map a .safetensors file read-only and return tensors viewing it.
+    The pages live in the page cache and are shared by every process that
+    maps the file; nothing is copied onto the heap.
+    """
+    import numpy as np
+    import torch
+
+    with open(path, "rb") as fh:
+        (header_len,) = struct.unpack("<Q", fh.read(8))
+        header = json.loads(fh.read(header_len))
+    header.pop("__metadata__", None)
+
+    data = np.memmap(path, dtype=np.uint8, mode="r", offset=8 + header_len)
+    state = {}
+    with warnings.catch_warnings():
+        # the arrays are read-only by design; torch warns about that
+        warnings.simplefilter("ignore", UserWarning)
+        for name, info in header.items():
+            begin, end = info["data_offsets"]
+            arr = data[begin:end].view(_DTYPES[info["dtype"]]).reshape(info["shape"])
+            state[name] = torch.from_numpy(arr)
+    return state
+
+
+# =====================================================
+# GRAD-CAM MODEL
+# =====================================================
+
+class GradCamModel:
+    """
+    ResNet-18 with a one-logit head and Grad-CAM over `layer4`.
+    Not thread-safe on its own; `score` serializes on an internal lock
+    because the hooks and input buffers are shared.
+    """
+
+    def __init__(self, weights_path, batch_sizes=WARMUP_BATCH_SIZES):
+        import torch
+        import torchvision
+
+        self.torch = torch
+        # built on the meta device: no random init that is thrown away
+        with torch.device("meta"):
+            net = torchvision.models.resnet18(weights=None, num_classes=1)
+        # Both paths keep the weights in the page cache instead of copying
+        # them onto the heap; assign=True makes the parameters use that
+        # storage. The parameters are frozen and never written, which the
+        # read-only mapping relies on.
+        if weights_path.endswith(".safetensors"):
+            state = load_mapped_weights(weights_path)
+        else:
+            state = torch.load(weights_path, map_location="cpu", mmap=True, weights_only=True)
+        net.load_state_dict(state, assign=True)
+        net.eval()
+        for p in net.parameters():
+            p.requires_grad_(False)
+
+        self.net = net
+        self._activations = None
+        net.layer4.register_forward_hook(self._capture_activations)
+
+        self._mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+        self._std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+        self._buffers = {
+            b: torch.empty(b, 3, INPUT_SIZE, INPUT_SIZE) for b in sorted(batch_sizes)
+        }
+        self._lock = threading.Lock()
+
+    def _capture_activations(self, module, inputs, output):
+        # Weights are frozen, so make the activations the leaf we differentiate
+        self._activations = output.detach().requires_grad_(True)
+        return self._activations
+
+    def _buffer(self, n):
+        for size, buf in self._buffers.items():
+            if size >= n:
+                return buf[:n]
+        return self.torch.empty(n, 3, INPUT_SIZE, INPUT_SIZE)
+
+    def _forward_backward(self, batch):
+        torch = self.torch
+        with torch.enable_grad():
+            logits = self.net(batch).squeeze(1)
+            logits.sum().backward()
+
+        acts = self._activations
+        weights = acts.grad.mean(dim=(2, 3), keepdim=True)
+        cam = torch.relu((weights * acts).sum(dim=1))
+        cam = cam / cam.amax(dim=(1, 2), keepdim=True).clamp_min(1e-8)
+        self._activations = None
+        return torch.sigmoid(logits.detach()), cam.detach()
+
+    def preprocess(self, image_bytes):
+        """
+        Decoded, resized and normalized (3, INPUT_SIZE, INPUT_SIZE) input.
+        Touches no shared state: safe to call from many threads at once.
+        """
+        from torchvision.io import ImageReadMode, decode_image
+
+        torch = self.torch
+        raw = torch.frombuffer(bytearray(image_bytes), dtype=torch.uint8)
+        img = decode_image(raw, mode=ImageReadMode.RGB).unsqueeze(0).float().div_(255)
+        img = torch.nn.functional.interpolate(
+            img, size=(INPUT_SIZE, INPUT_SIZE), mode="bilinear", antialias=True, align_corners=False
+        )
+        return ((img - self._mean) / self._std)[0]
+
+    def _decode_into(self, image_bytes, out):
+        out.copy_(self.preprocess(image_bytes))
+
+    def warmup(self):
+        """Forward/backward once per preallocated batch size."""
+        with self._lock:
+            for buf in self._buffers.values():
+                buf.normal_()
+                self._forward_backward(buf)
+
+    def score(self, images):
+        """Sustainability probability (0–1) for each encoded image."""
+        with self._lock:
+            batch = self._buffer(len(images))
+            for i, data in enumerate(images):
+                self._decode_into(data, batch[i])
+            probs, _cams = self._forward_backward(batch)
+        return probs.tolist()
+
+    def score_preprocessed(self, inputs):
+        """`score` for inputs already through `preprocess` (decoded elsewhere)."""
+        with self._lock:
+            batch = self._buffer(len(inputs))
+            for i, tensor in enumerate(inputs):
+                batch[i].copy_(tensor)
+            probs, _cams = self._forward_backward(batch)
+        return probs.tolist()
+
+
+# =====================================================
+# MODULE API
+# =====================================================
+
+def load():
+    # numpy/torch are only imported when the model is first needed, not at app import
+    global _np, _model
+    if _np is None:
+        import numpy as np
+        _np = np
+    if WEIGHTS_PATH and _model is None:
+        with _load_lock:
+            if _model is None:
+                _model = GradCamModel(WEIGHTS_PATH)
+    return _model
+
+
+def warmup():
+    model = load()
+    if model is not None:
+        model.warmup()
+
+
+def placeholder_score(sha256):
+    """Stand-in visual score (0.6-0.9) while no weights are configured."""
+    return round(0.6 + 0.3 * int(sha256[:8], 16) / 0xFFFFFFFF, 2)
+
+
+def cached_score(sha256):
+    """Score of a previously uploaded image, or None if it is not cached."""
+    with _scores_lock:
+        score = _scores.get(sha256)
+        if score is not None:
+            _scores.move_to_end(sha256)
+        return score
+
+
+def get_gradcam_score(image_bytes=None):
+    model = load()
+    if image_bytes is None:
+        return round(_np.random.uniform(0.6, 0.9), 2)
+
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    score = cached_score(digest)
+    if score is None:
+        if model is not None:
+            score = round(model.score([image_bytes])[0], 2)
+        else:
+            score = placeholder_score(digest)  # same image, same score, cached or not
+        with _scores_lock:
+            _scores[digest] = score
+            while len(_scores) > SCORE_CACHE_SIZE:
+                _scores.popitem(last=False)
+    return score
+
+
+if __name__ == "__main__":
+    # python gradcam_model.py export gradcam.pt gradcam.safetensors
+    if len(sys.argv) != 4 or sys.argv[1] != "export":
+        sys.exit("usage: python gradcam_model.py export <state_dict.pt> <out.safetensors>")
+    import torch
+
+    export_weights(torch.load(sys.argv[2], map_location="cpu", weights_only=True), sys.argv[3])
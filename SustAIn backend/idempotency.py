@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException
+
+from responses import fast_response
+
+# =====================================================
+# IDEMPOTENCY KEYS
+# =====================================================
+# Clients retry a POST that timed out, and without a key the retry is a
+# second model call and a second charge. A request carrying an
+# `Idempotency-Key` header runs at most once per (endpoint, user, key):
+#
+# - the first request runs and its response payload is kept for
+#   IDEMPOTENCY_TTL_S;
+# - a retry while it is still running waits for it (up to
+#   IDEMPOTENCY_WAIT_S, then 409) and gets the same response;
+# - a retry after it finished gets the stored response replayed, with
+#   `Idempotent-Replayed: true`, without touching the model or the quota;
+# - the same key with a different request body is a client bug: 422.
+#
+# Only successful responses are kept. An attempt that failed (429, a
+# model error) charged nothing, so its key is released and the retry
+# runs again. The payload is stored rather than the encoded bytes: a
+# retry may negotiate another encoding.
+#
+# The store is per process, like the conversation sessions: with several
+# workers, a retry routed to another worker than the first attempt runs
+# again.
+
+IDEMPOTENCY_TTL_S = float(os.getenv("IDEMPOTENCY_TTL_S", str(24 * 3600)))
+IDEMPOTENCY_WAIT_S = float(os.getenv("IDEMPOTENCY_WAIT_S", "30"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+MAX_KEY_LENGTH = 200
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(*parts):
+    """Hash of the request fields that must match on a retry."""
+    return hashlib.sha256(json.dumps(parts, separators=(",", ":")).encode()).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "payload", "expires_at")
+
+    def __init__(self, fingerprint, expires_at):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.payload = None  # set on success; None once done means released
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_s=IDEMPOTENCY_TTL_S, wait_s=IDEMPOTENCY_WAIT_S, max_keys=IDEMPOTENCY_MAX_KEYS):
+        self.ttl_s = ttl_s
+        self.wait_s = wait_s
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # oldest first
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+
+    def _evict(self, now):
+        # entries expire in insertion order, so stop at the first live one
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.expires_at > now and len(self._entries) < self.max_keys:
+                break
+            self._entries.popitem(last=False)
+
+    def run(self, key, scope, request_fingerprint, fn):
+        """
+        fn() -> response payload, called at most once per (scope, key)
+        while the key is kept. Returns the response to send.
+        """
+        if key is None:
+            return fast_response(fn())
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(422, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+        slot = (scope, key)
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                self._evict(now)
+                entry = self._entries.get(slot)
+                if entry is None:
+                    entry = self._entries[slot] = _Entry(request_fingerprint, now + self.ttl_s)
+                    owner = True
+                elif entry.fingerprint != request_fingerprint:
+                    self.conflicts += 1
+                    raise HTTPException(422, "Idempotency-Key was already used for a different request")
+                else:
+                    owner = False
+            if owner:
+                return self._execute(slot, entry, fn)
+
+            if not entry.done.is_set():
+                self.waited += 1
+                if not entry.done.wait(self.wait_s):
+                    raise HTTPException(409, "A request with this Idempotency-Key is still in progress")
+            if entry.payload is not None:
+                self.replayed += 1
+                response = fast_response(entry.payload)
+                response.headers[REPLAYED_HEADER] = "true"
+                return response
+            # the first attempt failed and released the key: run it here
+
+    def _execute(self, slot, entry, fn):
+        try:
+            payload = fn()
+        except BaseException:
+            with self._lock:
+                if self._entries.get(slot) is entry:
+                    del self._entries[slot]
+            entry.done.set()
+            raise
+        entry.payload = payload
+        entry.done.set()
+        return fast_response(payload)
+
+    def stats(self):
+        with self._lock:
+            in_flight = sum(not e.done.is_set() for e in self._entries.values())
+            return {
+                "keys": len(self._entries),
+                "in_flight": in_flight,
+                "replayed": self.replayed,
+                "waited": self.waited,
+                "conflicts": self.conflicts,
+            }
+
+
+store = IdempotencyStore()
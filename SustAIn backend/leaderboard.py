@@ -0,0 +1,364 @@
+import math
+import random
+import threading
+
+from fastapi import APIRouter, HTTPException, Query
+
+# =====================================================
+# ASI LEADERBOARD
+# =====================================================
+# Companies ranked by the mean ASI of their users, and users ranked by
+# their own ASI, kept in memory in two indexable skip lists. Each link
+# stores how many entries it skips, so an entry's rank and the entry at
+# a given rank are both found in O(log n), like an insert or a removal.
+#
+# The score is persisted as user_usage.asi, written by the same commit
+# that charges the quota. The endpoints call `board.update_user` after
+# that commit. The move costs two O(log n) removals and inserts, one in
+# each list, and a company's mean is kept as a running sum and count.
+# The board is rebuilt from user_usage in one pass: sort once, then link
+# the lists bottom-up in O(n). That runs on the warm-up thread, or in the
+# first leaderboard request when warm-up is off. Updates that arrive
+# while it loads are held back and applied right after; if the load
+# fails they are dropped (they are in user_usage already), the endpoints
+# answer 503 and the next request tries again.
+
+DEFAULT_TOP = 10
+MAX_TOP = 100
+
+_MAX_LEVEL = 24  # fine for up to ~16M entries at p = 1/2
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [0] * level
+
+
+# sorts after every real key: real keys are (-score, id)
+_NIL = _Node((math.inf, ""), 0)
+
+
+class RankedIndex:
+    """Sorted keys with O(log n) insert, remove, rank and select."""
+
+    def __init__(self, rng=None):
+        self._random = (rng or random.Random()).random
+        self.head = _Node(None, _MAX_LEVEL)
+        self.head.next = [_NIL] * _MAX_LEVEL
+        self.head.width = [1] * _MAX_LEVEL
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _level(self):
+        level, random = 1, self._random
+        while level < _MAX_LEVEL and random() < 0.5:
+            level += 1
+        return level
+
+    @classmethod
+    def from_sorted(cls, keys, rng=None):
+        """Build from keys already in order, in O(n)."""
+        index = cls(rng)
+        last = [index.head] * _MAX_LEVEL
+        last_pos = [0] * _MAX_LEVEL
+        pos = 0
+        for pos, key in enumerate(keys, 1):
+            node = _Node(key, index._level())
+            for level in range(len(node.next)):
+                prev = last[level]
+                prev.next[level] = node
+                prev.width[level] = pos - last_pos[level]
+                node.next[level] = _NIL
+                last[level] = node
+                last_pos[level] = pos
+        for level in range(_MAX_LEVEL):
+            last[level].width[level] = pos + 1 - last_pos[level]
+        index.size = pos
+        return index
+
+    def insert(self, key):
+        chain = [None] * _MAX_LEVEL
+        steps = [0] * _MAX_LEVEL
+        node = self.head
+        for level in range(_MAX_LEVEL - 1, -1, -1):
+            nxt = node.next[level]
+            while nxt.key < key:
+                steps[level] += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+            chain[level] = node
+
+        new = _Node(key, self._level())
+        steps_so_far = 0
+        for level in range(len(new.next)):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps_so_far
+            prev.width[level] = steps_so_far + 1
+            steps_so_far += steps[level]
+        for level in range(len(new.next), _MAX_LEVEL):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain = [None] * _MAX_LEVEL
+        node = self.head
+        for level in range(_MAX_LEVEL - 1, -1, -1):
+            nxt = node.next[level]
+            while nxt.key < key:
+                node = nxt
+                nxt = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target.key != key:
+            raise KeyError(key)
+
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), _MAX_LEVEL):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """1-based position of `key`; KeyError if absent."""
+        node, pos = self.head, 0
+        for level in range(_MAX_LEVEL - 1, -1, -1):
+            nxt = node.next[level]
+            while nxt.key < key:
+                pos += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+        if node.next[0].key != key:
+            raise KeyError(key)
+        return pos + 1
+
+    def slice(self, start, count):
+        """Up to `count` keys from 0-based position `start`."""
+        if start >= self.size or count <= 0:
+            return []
+        node, remaining = self.head, start + 1
+        for level in range(_MAX_LEVEL - 1, -1, -1):
+            while node.width[level] <= remaining and node.next[level] is not _NIL:
+                remaining -= node.width[level]
+                node = node.next[level]
+        out = []
+        while node is not _NIL and len(out) < count:
+            out.append(node.key)
+            node = node.next[0]
+        return out
+
+
+def _score(value):
+    return round(value, 2)
+
+
+class Leaderboard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = RankedIndex()
+        self._user_entries = {}    # user_id -> (asi, company)
+        self._companies = RankedIndex()
+        self._company_totals = {}  # company -> [asi sum, members]
+        self._loading = False
+        self._pending = {}
+        self._load_lock = threading.Lock()  # one load at a time
+        self.loaded = False
+
+    # --- updates ---
+
+    def update_user(self, user_id, company, asi):
+        """Put `user_id` at `asi` (and in `company`, or none). O(log n)."""
+        with self._lock:
+            if self._loading:
+                self._pending[user_id] = (company or None, asi)
+                return
+            self._apply(user_id, company or None, asi)
+
+    def _apply(self, user_id, company, asi):
+        old = self._user_entries.get(user_id)
+        if old == (asi, company):
+            return
+        if old is not None:
+            self._users.remove((-old[0], user_id))
+            if old[1] is not None:
+                self._add_to_company(old[1], -old[0], -1)
+        self._users.insert((-asi, user_id))
+        self._user_entries[user_id] = (asi, company)
+        if company is not None:
+            self._add_to_company(company, asi, 1)
+
+    def _add_to_company(self, company, asi_delta, members_delta):
+        totals = self._company_totals.get(company)
+        if totals is not None:
+            self._companies.remove((-_score(totals[0] / totals[1]), company))
+        else:
+            totals = self._company_totals[company] = [0.0, 0]
+        totals[0] += asi_delta
+        totals[1] += members_delta
+        if totals[1] == 0:
+            del self._company_totals[company]
+        else:
+            self._companies.insert((-_score(totals[0] / totals[1]), company))
+
+    # --- loading ---
+
+    def build(self, rows):
+        """Replace the board with (user_id, company, asi) rows."""
+        user_entries, company_totals = {}, {}
+        for user_id, company, asi in rows:
+            company = company or None
+            user_entries[user_id] = (asi, company)
+            if company is not None:
+                totals = company_totals.setdefault(company, [0.0, 0])
+                totals[0] += asi
+                totals[1] += 1
+        users = RankedIndex.from_sorted(sorted((-asi, uid) for uid, (asi, _) in user_entries.items()))
+        companies = RankedIndex.from_sorted(sorted(
+            (-_score(total / members), company) for company, (total, members) in company_totals.items()
+        ))
+        with self._lock:
+            self._users, self._user_entries = users, user_entries
+            self._companies, self._company_totals = companies, company_totals
+            for user_id, (company, asi) in self._pending.items():
+                self._apply(user_id, company, asi)
+            self._pending = {}
+            self._loading = False
+            self.loaded = True
+
+    def load(self):
+        """Rebuild from user_usage; runs on the warm-up thread."""
+        with self._load_lock:
+            self._load()
+
+    def ensure_loaded(self):
+        """Load the board unless it is loaded; waits for a load in progress."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self._load()
+
+    def _load(self):
+        with self._lock:
+            self._loading = True
+            self._pending = {}
+        try:
+            self.build(self._read_rows())
+        except BaseException:
+            with self._lock:
+                self._loading = False
+                self._pending = {}
+            raise
+
+    @staticmethod
+    def _read_rows():
+        """(user_id, company, asi) of every user in user_usage."""
+        from database import SessionLocal
+        from models import UserUsage
+        from policies import engine as policy_engine
+        from utils import calculate_asi
+
+        db = SessionLocal()
+        try:
+            query = db.query(
+                UserUsage.user_id, UserUsage.company, UserUsage.role, UserUsage.asi,
+                UserUsage.tokens_used, UserUsage.prompts_used,
+            ).yield_per(10000)
+            return [
+                (user_id, company,
+                 asi if asi is not None else calculate_asi(
+                     tokens or 0, prompts or 0, policy=policy_engine.lookup(company, role)
+                 )["asi_score"])
+                for user_id, company, role, asi, tokens, prompts in query
+            ]
+        finally:
+            db.close()
+
+    # --- queries ---
+
+    def top_companies(self, limit=DEFAULT_TOP, offset=0):
+        with self._lock:
+            keys = self._companies.slice(offset, limit)
+            items = [
+                {"rank": offset + i + 1, "company": company, "asi": -neg,
+                 "members": self._company_totals[company][1]}
+                for i, (neg, company) in enumerate(keys)
+            ]
+            return {"total": len(self._companies), "items": items}
+
+    def rank_of(self, user_id):
+        """The user's rank among users and their company's among companies."""
+        with self._lock:
+            entry = self._user_entries.get(user_id)
+            if entry is None:
+                return None
+            asi, company = entry
+            result = {
+                "user": {"rank": self._users.rank((-asi, user_id)), "asi": asi, "total": len(self._users)},
+                "company": None,
+            }
+            if company is not None:
+                total, members = self._company_totals[company]
+                score = _score(total / members)
+                result["company"] = {
+                    "company": company,
+                    "rank": self._companies.rank((-score, company)),
+                    "asi": score,
+                    "members": members,
+                    "total": len(self._companies),
+                }
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {"loaded": self.loaded, "users": len(self._users), "companies": len(self._companies)}
+
+
+board = Leaderboard()
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+
+def _require_loaded():
+    """Load the board on first use (no warm-up); 503 if that fails."""
+    try:
+        board.ensure_loaded()
+    except Exception:
+        raise HTTPException(503, "Leaderboard is unavailable, try again")
+
+
+@router.get("/companies")
+def top_companies(
+    limit: int = Query(DEFAULT_TOP, ge=1, le=MAX_TOP),
+    offset: int = Query(0, ge=0),
+):
+    """Companies by mean user ASI, best first."""
+    _require_loaded()
+    return board.top_companies(limit, offset)
+
+
+@router.get("/rank")
+def my_rank(user_id: str = Query(..., min_length=1, max_length=100)):
+    """
+    {"user": {"rank", "asi", "total"}, "company": {"company", "rank",
+    "asi", "members", "total"} or null}; 404 for a user with no usage.
+    """
+    _require_loaded()
+    result = board.rank_of(user_id)
+    if result is None:
+        raise HTTPException(404, "Unknown user")
+    return result
+
+
+@router.get("/status")
+def leaderboard_status():
+    return board.stats()
@@ -1,104 +1,642 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from dotenv import load_dotenv
+import asyncio
+import hashlib
+import json
 import os
-import google.generativeai as genai
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Literal, Optional
 
-from database import SessionLocal, engine
-from models import UserUsage, Base
-from utils import calculate_asi
-from gradcam_model import get_gradcam_score
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Header, Query, UploadFile, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
 
 # ---------- Setup ----------
+# before the local imports: they read their config from the environment
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY missing")
+import catalog
+import fairqueue
+import gradcam_model
+import forum
+import idempotency
+import leaderboard
+import materials
+import news
+import policies
+import push
+import timeseries
+import usage_log
+from compaction import compact
+from database import SessionLocal, get_db, init_db
+from models import UserUsage
+from providers import GEMINI_MODEL_NAME, get_model
+from responses import FastResponse, NegotiationMiddleware, fast_response
+from sessions import SessionStore, build_context
+from utils import calculate_asi
+from warmup import WarmupScheduler
+
+# ---------- Startup / warm-up ----------
+# Heavy imports (google.generativeai, numpy, torch) are loaded lazily.
+# The lifespan creates the schema and hands the expensive first-use work
+# to the warm-up scheduler, so the worker accepts connections immediately
+# and /ready reports 503 until everything is warm.
+warmup = WarmupScheduler()
+warmup.add("provider", get_model)
+warmup.add("gradcam_weights", gradcam_model.load)
+warmup.add("gradcam_passes", gradcam_model.warmup)
+warmup.add("materials", materials.load)
+warmup.add("leaderboard", leaderboard.board.load)
+warmup.add("history", timeseries.store.prime)
+# history charts are fed from the usage log, after each stored batch
+usage_log.writer.add_sink(timeseries.store.add_events)
+
 
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-pro")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    policies.engine.start()
+    timeseries.store.begin_live()
+    usage_log.writer.start()
+    push.broker.bind(asyncio.get_running_loop())
+    warmup.start()
+    news.ingestor.start()
+    catalog.runner.start()
+    yield
+    news.ingestor.stop(timeout=5)
+    # the running catalog job pauses and resumes on the next start
+    catalog.runner.stop(timeout=30)
+    # flushes the buffered usage events
+    usage_log.writer.stop(timeout=10)
+    policies.engine.stop(timeout=5)
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastResponse)
+app.add_middleware(NegotiationMiddleware)
+app.include_router(forum.router)
+app.include_router(news.router)
+app.include_router(timeseries.router)
+app.include_router(leaderboard.router)
+app.include_router(policies.router)
+sessions = SessionStore()
 
 # ---------- Limits ----------
-MAX_PROMPTS_PER_DAY = 7
-MAX_TOKENS_PER_DAY = 8000
-MAX_GRADCAM_PER_DAY = 1
+# daily prompt, token and Grad-CAM limits come from the user's
+# policies.Policy (company and role); see policies.py
 
-# ---------- DB Dependency ----------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# /chat/batch: prompts per request, model calls in flight per batch, and
+# threads shared by all batches (the fair queue bounds the model calls)
+MAX_BATCH_MESSAGES = 50
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+CHAT_BATCH_THREADS = int(os.getenv("CHAT_BATCH_THREADS", "64"))
+_batch_pool = ThreadPoolExecutor(CHAT_BATCH_THREADS, thread_name_prefix="chat-batch")
 
 # ---------- Schemas ----------
 class ChatRequest(BaseModel):
     user_id: str
     message: str
+    # omit to start a new conversation; the response returns the id to reuse
+    session_id: Optional[str] = Field(None, max_length=64)
+    # opt-in: truncate a message still larger than this after compaction
+    max_message_tokens: Optional[int] = Field(None, ge=64)
+    # stored on the user when given; groups users for company history
+    company: Optional[str] = Field(None, max_length=100)
+    # stored on the user when given; with the company, selects the limits
+    role: Optional[Literal["business", "consumer"]] = None
+
+
+class ChatBatchRequest(BaseModel):
+    user_id: str
+    # independent single-turn prompts; no conversation session
+    messages: List[str]
+    max_message_tokens: Optional[int] = Field(None, ge=64)
+    company: Optional[str] = Field(None, max_length=100)
+    role: Optional[Literal["business", "consumer"]] = None
+
+
+# Response models document the hot endpoints; those endpoints return
+# fast_response(...), so the models are not validated against at runtime.
+class ChatResponse(BaseModel):
+    reply: str
+    tokens_used: int
+    prompts_left: int
+    tokens_left: int
+    ASI: float
+    energy_saved_kWh: float
+    water_saved_liters: float
+    session_id: str
+    tokens_saved_by_trimming: int
+    tokens_saved_by_compaction: int
+
+
+class ChatBatchItem(BaseModel):
+    reply: Optional[str] = None
+    tokens_used: Optional[int] = None
+    tokens_saved_by_compaction: Optional[int] = None
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatBatchItem]
+    tokens_used: int
+    prompts_left: int
+    tokens_left: int
+    ASI: float
+    energy_saved_kWh: float
+    water_saved_liters: float
+    tokens_saved_by_compaction: int
+
+
+class GradcamResponse(BaseModel):
+    PSI: float
+    uses_left: int
+    material_score: Optional[float] = None
+    materials: Optional[List[str]] = None
 
 # ---------- Routes ----------
-@app.post("/chat")
-def chat(req: ChatRequest, db: Session = Depends(get_db)):
-    user = db.query(UserUsage).filter(UserUsage.user_id == req.user_id).first()
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+# ---------- Chat ----------
+def _policy(user):
+    return policies.engine.lookup(user.company, user.role)
+
+
+def _quota_fields(user, asi=None, policy=None):
+    """The chat quota fields pushed to the user's connected clients."""
+    policy = policy or _policy(user)
+    asi = asi or calculate_asi(user.tokens_used, user.prompts_used, policy=policy)
+    return {
+        "prompts_left": policy.max_prompts_per_day - user.prompts_used,
+        "tokens_left": policy.max_tokens_per_day - user.tokens_used,
+        "ASI": asi["asi_score"],
+    }
+
+
+def _get_or_create_user(db: Session, user_id: str, company: Optional[str] = None,
+                        role: Optional[str] = None):
+    user = db.query(UserUsage).filter(UserUsage.user_id == user_id).first()
 
     if not user:
-        user = UserUsage(user_id=req.user_id)
+        user = UserUsage(user_id=user_id, company=company or None, role=role)
         db.add(user)
+        try:
+            db.commit()
+            db.refresh(user)
+            return user
+        except IntegrityError:
+            # a concurrent first request for this user created the row first
+            db.rollback()
+            user = db.query(UserUsage).filter(UserUsage.user_id == user_id).one()
+    if (company and user.company != company) or (role and user.role != role):
+        user.company = company or user.company
+        user.role = role or user.role
         db.commit()
-        db.refresh(user)
+    return user
+
+
+@contextmanager
+def _model_slot(user_id, company, role):
+    """
+    Hold a slot of the upstream model (fairqueue.py), queued with the
+    user's company and role under their policy's weight and cap; 503 if
+    the queue turns the call away.
+    """
+    policy = policies.engine.lookup(company, role)
+    if company:
+        name = f"{company}/{role}" if role else company
+    else:
+        name = f"user:{user_id}"
+    try:
+        tenant = fairqueue.model_queue.acquire(name, policy.model_weight, policy.max_concurrent_model_calls)
+    except fairqueue.QueueRejected as exc:
+        raise HTTPException(503, str(exc))
+    try:
+        yield
+    finally:
+        fairqueue.model_queue.release(tenant)
+
 
-    if user.prompts_used >= MAX_PROMPTS_PER_DAY:
+def _prepare_chat(req: ChatRequest, db: Session, endpoint="chat"):
+    """Quota checks and context assembly shared by /chat and /chat/stream."""
+    user = _get_or_create_user(db, req.user_id, req.company, req.role)
+    policy = _policy(user)
+
+    if user.prompts_used >= policy.max_prompts_per_day:
+        usage_log.record(req.user_id, endpoint, 429, company=user.company)
         raise HTTPException(429, "Daily prompt limit reached")
 
-    response = model.generate_content(req.message)
-    reply = response.text
-    tokens_used = response.usage_metadata.total_token_count
+    snapshot = sessions.snapshot(req.session_id, req.user_id)
+    if snapshot is None:
+        raise HTTPException(403, "Session belongs to another user")
+    session_id, history = snapshot
+    # the session history keeps the compacted text as well
+    req.message, compaction_saved = compact(req.message, req.max_message_tokens)
+    contents, trimming_saved = build_context(
+        history, req.message, policy.max_tokens_per_day - user.tokens_used
+    )
+    savings = {
+        "tokens_saved_by_trimming": trimming_saved,
+        "tokens_saved_by_compaction": compaction_saved,
+    }
+    return user, session_id, contents, savings
+
 
-    if user.tokens_used + tokens_used > MAX_TOKENS_PER_DAY:
+def _charge_chat(db: Session, user, req: ChatRequest, session_id, reply, tokens_used, savings,
+                 endpoint="chat", latency_ms=None):
+    """Charge a finished reply to the user's quota and return the usage fields."""
+    policy = _policy(user)
+    if user.tokens_used + tokens_used > policy.max_tokens_per_day:
+        usage_log.record(req.user_id, endpoint, 429, tokens_used, GEMINI_MODEL_NAME, latency_ms,
+                         company=user.company)
         raise HTTPException(429, "Daily token limit exceeded")
 
     user.prompts_used += 1
     user.tokens_used += tokens_used
+    user.tokens_compacted = (user.tokens_compacted or 0) + savings["tokens_saved_by_compaction"]
+    asi = calculate_asi(user.tokens_used, user.prompts_used, user.tokens_compacted, policy)
+    user.asi = asi["asi_score"]
     db.commit()
+    leaderboard.board.update_user(user.user_id, user.company, user.asi)
+    sessions.record(session_id, req.message, reply)
 
-    asi, energy_saved, water_saved = calculate_asi(
-        user.tokens_used, MAX_TOKENS_PER_DAY
-    )
+    quota = _quota_fields(user, asi, policy)
+    push.broker.publish(user.user_id, quota)
+    usage_log.record(user.user_id, endpoint, 200, tokens_used, GEMINI_MODEL_NAME, latency_ms,
+                     asi=quota["ASI"], company=user.company)
 
     return {
-        "reply": reply,
         "tokens_used": tokens_used,
-        "prompts_left": MAX_PROMPTS_PER_DAY - user.prompts_used,
-        "tokens_left": MAX_TOKENS_PER_DAY - user.tokens_used,
-        "ASI": asi,
-        "energy_saved_kWh": energy_saved,
-        "water_saved_liters": water_saved
+        **quota,
+        "energy_saved_kWh": asi["energy_saved_kwh"],
+        "water_saved_liters": asi["water_saved_liters"],
+        "session_id": session_id,
+        **savings,
     }
 
-@app.post("/gradcam/{user_id}")
-def gradcam(user_id: str, db: Session = Depends(get_db)):
-    user = db.query(UserUsage).filter(UserUsage.user_id == user_id).first()
 
-    if not user:
-        user = UserUsage(user_id=user_id)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+@app.post("/chat", response_model=ChatResponse)
+def chat(
+    req: ChatRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None),
+):
+    """
+    A retry with the same Idempotency-Key gets the first attempt's reply,
+    charged once; see idempotency.py.
+    """
+    request_fingerprint = idempotency.fingerprint(
+        req.message, req.session_id, req.max_message_tokens, req.company, req.role
+    )
+    return idempotency.store.run(
+        idempotency_key, ("chat", req.user_id), request_fingerprint, lambda: _chat(req, db)
+    )
+
+
+def _chat(req: ChatRequest, db: Session):
+    user, session_id, contents, savings = _prepare_chat(req, db)
+
+    with _model_slot(user.user_id, user.company, user.role):
+        t0 = time.perf_counter()
+        response = get_model().generate_content(contents)
+        reply = response.text
+        tokens_used = response.usage_metadata.total_token_count
+        latency_ms = (time.perf_counter() - t0) * 1000
 
-    if user.gradcam_used >= MAX_GRADCAM_PER_DAY:
+    usage = _charge_chat(db, user, req, session_id, reply, tokens_used, savings, latency_ms=latency_ms)
+    return {"reply": reply, **usage}
+
+
+def _ndjson(obj):
+    return json.dumps(obj, separators=(",", ":")).encode() + b"\n"
+
+
+def _stream_reply(req: ChatRequest, company, role, session_id, contents, savings):
+    # the model slot is taken inside the body: a response that is never
+    # iterated (client gone before it started) never holds one
+    parts = []
+    try:
+        with _model_slot(req.user_id, company, role):
+            t0 = time.perf_counter()
+            response = get_model().generate_content(contents, stream=True)
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield _ndjson({"delta": text})
+            tokens_used = response.usage_metadata.total_token_count
+            latency_ms = (time.perf_counter() - t0) * 1000
+    except HTTPException as exc:
+        yield _ndjson({"done": True, "status": exc.status_code, "error": exc.detail})
+        return
+    except Exception as exc:  # the headers are sent: report it in the trailer
+        yield _ndjson({"done": True, "status": 502, "error": f"Model call failed: {type(exc).__name__}"})
+        return
+    reply = "".join(parts)
+
+    # the request's session may already be closed once the body streams
+    db = SessionLocal()
+    try:
+        user = db.query(UserUsage).filter(UserUsage.user_id == req.user_id).first()
+        usage = _charge_chat(db, user, req, session_id, reply, tokens_used, savings,
+                             endpoint="chat/stream", latency_ms=latency_ms)
+        trailer = {"done": True, **usage}
+    except HTTPException as exc:
+        trailer = {"done": True, "status": exc.status_code, "error": exc.detail}
+    finally:
+        db.close()
+    yield _ndjson(trailer)
+
+
+@app.post("/chat/stream")
+def chat_stream(req: ChatRequest, db: Session = Depends(get_db)):
+    """
+    Same as /chat, streamed as newline-delimited JSON: {"delta": ...} lines
+    while the model writes, then one {"done": true, ...} line with the
+    usage fields of /chat (or "status"/"error" if the quota ran out, the
+    model queue turned the call away or the model call failed).
+    """
+    user, session_id, contents, savings = _prepare_chat(req, db, "chat/stream")
+    return StreamingResponse(
+        _stream_reply(req, user.company, user.role, session_id, contents, savings),
+        media_type="application/x-ndjson",
+    )
+
+def _complete_one(message, tokens_left, max_message_tokens, user_id, company, role):
+    """One /chat/batch prompt; runs on the batch pool."""
+    message, compaction_saved = compact(message, max_message_tokens)
+    contents, _ = build_context([], message, tokens_left)
+    # errors are reported on the item, the rest of the batch still counts
+    try:
+        with _model_slot(user_id, company, role):
+            t0 = time.perf_counter()
+            response = get_model().generate_content(contents)
+            latency_ms = (time.perf_counter() - t0) * 1000
+    except HTTPException as exc:
+        return {"status": exc.status_code, "error": exc.detail}, None
+    except Exception as exc:
+        return {"status": 502, "error": f"Model call failed: {type(exc).__name__}"}, None
+    item = {
+        "reply": response.text,
+        "tokens_used": response.usage_metadata.total_token_count,
+        "tokens_saved_by_compaction": compaction_saved,
+    }
+    return item, latency_ms
+
+
+def _map_batch(fn, items):
+    """fn over items on the shared batch pool, CHAT_BATCH_CONCURRENCY at a time; results in order."""
+    gate = threading.BoundedSemaphore(CHAT_BATCH_CONCURRENCY)
+
+    def run(item):
+        try:
+            return fn(item)
+        finally:
+            gate.release()
+
+    futures = []
+    for item in items:
+        gate.acquire()
+        futures.append(_batch_pool.submit(run, item))
+    return [f.result() for f in futures]
+
+
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+def chat_batch(req: ChatBatchRequest, db: Session = Depends(get_db)):
+    """
+    Up to MAX_BATCH_MESSAGES independent prompts in one request. Quota for
+    every prompt is reserved up front in one statement (429 if the batch
+    does not fit), the prompts of each batch run CHAT_BATCH_CONCURRENCY at
+    a time through the fair queue, and
+    usage is settled in one more commit. `results` follows the order of
+    `messages`: {"reply", "tokens_used", "tokens_saved_by_compaction"} or
+    {"status", "error"} per item; failed items are not charged.
+    """
+    n = len(req.messages)
+    if not 1 <= n <= MAX_BATCH_MESSAGES:
+        raise HTTPException(422, f"Send between 1 and {MAX_BATCH_MESSAGES} messages")
+
+    user = _get_or_create_user(db, req.user_id, req.company, req.role)
+    policy = _policy(user)
+    # conditional increment: concurrent requests cannot both take the last prompts
+    reserved = (
+        db.query(UserUsage)
+        .filter(UserUsage.user_id == req.user_id, UserUsage.prompts_used + n <= policy.max_prompts_per_day)
+        .update({UserUsage.prompts_used: UserUsage.prompts_used + n}, synchronize_session=False)
+    )
+    db.commit()
+    if not reserved:
+        usage_log.record(req.user_id, "chat/batch", 429, company=user.company)
+        raise HTTPException(429, "Daily prompt limit reached")
+    db.refresh(user)
+
+    tokens_left = policy.max_tokens_per_day - user.tokens_used
+    completed = _map_batch(
+        lambda message: _complete_one(message, tokens_left, req.max_message_tokens,
+                                      user.user_id, user.company, user.role),
+        req.messages,
+    )
+
+    results, events = [], []
+    refunded, tokens_used, compaction_saved = 0, 0, 0
+    for item, latency_ms in completed:
+        results.append(item)
+        if "error" in item:
+            refunded += 1
+        elif tokens_used + item["tokens_used"] > tokens_left:
+            events.append((429, item["tokens_used"], latency_ms))
+            item.clear()
+            item.update(status=429, error="Daily token limit exceeded")
+            refunded += 1
+        else:
+            tokens_used += item["tokens_used"]
+            compaction_saved += item["tokens_saved_by_compaction"]
+            events.append((200, item["tokens_used"], latency_ms))
+    # the stored ASI assumes no other request of this user settled since
+    # the reservation; the next charge corrects it if one did
+    settled = calculate_asi(user.tokens_used + tokens_used, user.prompts_used - refunded, policy=policy)
+    db.query(UserUsage).filter(UserUsage.user_id == req.user_id).update(
+        {
+            UserUsage.prompts_used: UserUsage.prompts_used - refunded,
+            UserUsage.tokens_used: UserUsage.tokens_used + tokens_used,
+            UserUsage.tokens_compacted: func.coalesce(UserUsage.tokens_compacted, 0) + compaction_saved,
+            UserUsage.asi: settled["asi_score"],
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    db.refresh(user)
+
+    asi = calculate_asi(user.tokens_used, user.prompts_used, user.tokens_compacted, policy)
+    leaderboard.board.update_user(user.user_id, user.company, asi["asi_score"])
+    quota = _quota_fields(user, asi, policy)
+    push.broker.publish(user.user_id, quota)
+    for status, item_tokens, latency_ms in events:
+        usage_log.record(req.user_id, "chat/batch", status, item_tokens, GEMINI_MODEL_NAME, latency_ms,
+                         asi=quota["ASI"] if status == 200 else None, company=user.company)
+    return fast_response({
+        "results": results,
+        "tokens_used": tokens_used,
+        **quota,
+        "energy_saved_kWh": asi["energy_saved_kwh"],
+        "water_saved_liters": asi["water_saved_liters"],
+        "tokens_saved_by_compaction": compaction_saved,
+    })
+
+
+@app.post("/gradcam/{user_id}", response_model=GradcamResponse)
+def gradcam(
+    user_id: str,
+    image: Optional[UploadFile] = File(None),
+    # sha256 of an image uploaded before; lets the client skip the upload
+    image_sha256: Optional[str] = Form(None, max_length=64),
+    # free-text product / waste description, scored against the material table
+    description: Optional[str] = Form(None, max_length=2000),
+    company: Optional[str] = Form(None, max_length=100),
+    role: Optional[Literal["business", "consumer"]] = Form(None),
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None),
+):
+    """
+    A retry with the same Idempotency-Key gets the first attempt's score
+    and uses the daily limit once; see idempotency.py.
+    """
+    image_bytes = image.file.read() if image is not None else None
+    request_fingerprint = idempotency.fingerprint(
+        hashlib.sha256(image_bytes).hexdigest() if image_bytes is not None else None,
+        image_sha256, description, company, role,
+    )
+    return idempotency.store.run(
+        idempotency_key, ("gradcam", user_id), request_fingerprint,
+        lambda: _gradcam(db, user_id, image_bytes, image_sha256, description, company, role),
+    )
+
+
+def _gradcam(db: Session, user_id, image_bytes, image_sha256, description, company, role):
+    user = _get_or_create_user(db, user_id, company, role)
+    max_gradcam = _policy(user).max_gradcam_per_day
+
+    if user.gradcam_used >= max_gradcam:
+        usage_log.record(user_id, "gradcam", 429, company=user.company)
         raise HTTPException(429, "Grad-CAM daily limit reached")
 
-    score = get_gradcam_score()
+    t0 = time.perf_counter()
+    cache_hit = image_bytes is None and bool(image_sha256)
+    if cache_hit:
+        score = gradcam_model.cached_score(image_sha256)
+        if score is None:
+            raise HTTPException(404, "Unknown image, upload it")
+    else:
+        score = gradcam_model.get_gradcam_score(image_bytes)
+    latency_ms = (time.perf_counter() - t0) * 1000
     user.gradcam_used += 1
     db.commit()
 
-    return {
-        "PSI": round(score * 100, 2),
-        "uses_left": MAX_GRADCAM_PER_DAY - user.gradcam_used
+    psi, found = catalog.score_psi(score, description)
+
+    result = {
+        "PSI": psi,
+        "uses_left": max_gradcam - user.gradcam_used
     }
+    push.broker.publish(user_id, result)
+    usage_log.record(user_id, "gradcam", 200, latency_ms=latency_ms, cache_hit=cache_hit, psi=psi,
+                     company=user.company)
+    if found is not None:
+        result.update(found)
+    return result
+
+
+# ---------- Catalog scoring ----------
+@app.post("/catalog/jobs/{user_id}", status_code=202)
+def submit_catalog_job(user_id: str, archive: UploadFile = File(...)):
+    """
+    Score a zip of product images (plus an optional descriptions.csv of
+    `image,description` rows) as a background job, outside the daily
+    Grad-CAM limit. One unfinished job per user; poll the returned job_id.
+    """
+    active = catalog.runner.active_job_of(user_id)
+    if active is not None:
+        raise HTTPException(409, f"Catalog job {active} is not finished yet")
+    try:
+        return catalog.runner.submit(user_id, archive.file)
+    except (ValueError, zipfile.BadZipFile) as exc:
+        raise HTTPException(422, str(exc))
+
+
+@app.get("/catalog/jobs/{job_id}")
+def catalog_job_status(job_id: str):
+    """state (queued, running, paused, done, failed), done / total, images_per_s, eta_s."""
+    status = catalog.runner.status(job_id)
+    if status is None:
+        raise HTTPException(404, "Unknown job")
+    return status
+
+
+@app.get("/catalog/jobs/{job_id}/results")
+def catalog_job_results(job_id: str):
+    """The scored images so far, one JSON object per line."""
+    if catalog.runner.status(job_id) is None:
+        raise HTTPException(404, "Unknown job")
+    return Response(catalog.runner.results(job_id), media_type="application/x-ndjson")
+
+
+# ---------- Push updates ----------
+def _usage_snapshot(user_id):
+    db = SessionLocal()
+    try:
+        user = db.query(UserUsage).filter(UserUsage.user_id == user_id).first()
+        if user is None:
+            user = UserUsage(user_id=user_id, prompts_used=0, tokens_used=0, gradcam_used=0)
+        policy = _policy(user)
+        return {**_quota_fields(user, policy=policy), "uses_left": policy.max_gradcam_per_day - user.gradcam_used}
+    finally:
+        db.close()
+
+
+@app.websocket("/ws")
+async def push_updates(websocket: WebSocket, user_id: str = Query(..., min_length=1, max_length=100)):
+    """
+    Live quota and score updates for one user: a snapshot of every field
+    on connect, then {"prompts_left", "tokens_left", "ASI"} after each
+    charged chat and {"PSI", "uses_left"} after each Grad-CAM score.
+    """
+    await websocket.accept()
+    await push.broker.serve(websocket, user_id, lambda: run_in_threadpool(_usage_snapshot, user_id))
+
+
+@app.get("/ws/status")
+def push_status():
+    return push.broker.stats()
+
+
+@app.get("/model/queue/status")
+def model_queue_status(tenant: Optional[str] = Query(None, max_length=200)):
+    """
+    Slots in use, and queue depth and wait percentiles per tenant:
+    "<company>/<role>", "<company>" (no role given) or "user:<id>".
+    """
+    return fairqueue.model_queue.stats(tenant)
+
+
+@app.get("/idempotency/status")
+def idempotency_status():
+    return idempotency.store.stats()
+
+
+@app.get("/usage/log/status")
+def usage_log_status():
+    return usage_log.writer.stats()
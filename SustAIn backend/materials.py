@@ -0,0 +1,323 @@
+import array
+import csv
+import hashlib
+import os
+import re
+import struct
+import sys
+import threading
+from collections import deque
+
+# =====================================================
+# MATERIAL LIFECYCLE SCORING
+# =====================================================
+# Turns a free-text product or waste description into the material score
+# that calculate_psi combines with Grad-CAM. Descriptions are split into
+# words and run through a word-level Aho-Corasick automaton compiled from
+# the lifecycle table (data/materials.csv), so every material name and
+# alias is found in a single pass over the words, however large the table.
+# Where matches overlap the longest wins ("lithium ion battery" over
+# "battery"); each material counts once, and the score is the weighted
+# mean of the matched materials' scores.
+#
+# The compiled automaton ships as data/materials.bin, flat little-endian
+# arrays that load without parsing the CSV or rebuilding the automaton.
+# `python materials.py build` regenerates it after the CSV changes; a .bin
+# built from another version of the CSV is ignored and the table is
+# compiled in memory instead.
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TABLE_PATH = os.getenv("MATERIALS_TABLE", os.path.join(_DATA_DIR, "materials.csv"))
+COMPILED_PATH = os.path.splitext(TABLE_PATH)[0] + ".bin"
+
+_MAGIC = b"SMAT"
+_VERSION = 1
+# magic, version, sha256 of the CSV, then counts: materials, vocabulary
+# words, states, edges, and the byte lengths of the two string blobs
+_HEADER = struct.Struct("<4sH2x32s6I")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def _variants(word):
+    """The word and its regular plural, so "bottles" matches "bottle"."""
+    if len(word) < 3 or not word.isalpha():
+        return (word,)
+    if word.endswith("y") and word[-2] not in "aeiou":
+        return word, word[:-1] + "ies"
+    if word.endswith(("s", "x", "ch", "sh")):
+        return word, word + "es"
+    return word, word + "s"
+
+
+def _file_sha256(path):
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).digest()
+
+
+def _le_array(typecode, values=()):
+    arr = array.array(typecode, values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def _read_array(typecode, data, offset, count):
+    arr = array.array(typecode)
+    end = offset + count * arr.itemsize
+    arr.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, end
+
+
+# =====================================================
+# INDEX
+# =====================================================
+
+class MaterialIndex:
+    """
+    The compiled table. `vocab` maps words to ids (plurals share their
+    singular's id), `goto[state]` maps word ids to next states, and
+    `best_material` / `best_length` give the longest pattern ending in a
+    state, following its fail links (-1 / 0 if none).
+    """
+
+    def __init__(self, names, scores, weights, vocab, goto, fail, best_material, best_length, source_sha256):
+        self.names = names
+        self.scores = scores
+        self.weights = weights
+        self.vocab = vocab
+        self.goto = goto
+        self.fail = fail
+        self.best_material = best_material
+        self.best_length = best_length
+        self.source_sha256 = source_sha256
+
+    @classmethod
+    def compile(cls, table_path=TABLE_PATH):
+        names, scores, weights, patterns = [], [], [], []
+        with open(table_path, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(line for line in fh if not line.startswith("#")):
+                material = len(names)
+                names.append(row["name"].strip())
+                scores.append(float(row["score"]))
+                weights.append(float(row["weight"]))
+                for phrase in [row["name"]] + (row["aliases"] or "").split("|"):
+                    words = _words(phrase)
+                    if words:
+                        patterns.append((words, material))
+
+        vocab = {}
+        for words, _ in patterns:
+            for word in words:
+                vocab.setdefault(word, len(vocab) + 1)
+        for word, word_id in list(vocab.items()):
+            for variant in _variants(word):
+                vocab.setdefault(variant, word_id)
+
+        # trie of word-id sequences
+        goto, best_material, best_length = [{}], [-1], [0]
+        for words, material in patterns:
+            state = 0
+            for word in words:
+                word_id = vocab[word]
+                nxt = goto[state].get(word_id)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][word_id] = nxt
+                    goto.append({})
+                    best_material.append(-1)
+                    best_length.append(0)
+                state = nxt
+            if best_material[state] < 0:  # an alias listed twice keeps its first material
+                best_material[state] = material
+                best_length[state] = len(words)
+
+        # fail links, breadth first so a state's fail target is final before it
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word_id, child in goto[state].items():
+                f = fail[state]
+                while f and word_id not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(word_id, 0)
+                if best_material[child] < 0:
+                    best_material[child] = best_material[fail[child]]
+                    best_length[child] = best_length[fail[child]]
+                queue.append(child)
+
+        return cls(names, scores, weights, vocab, goto, fail, best_material, best_length,
+                   _file_sha256(table_path))
+
+    # --- compact binary form ---
+
+    def to_bytes(self):
+        names_blob = "\0".join(self.names).encode()
+        vocab_words = list(self.vocab)
+        vocab_blob = "\0".join(vocab_words).encode()
+        edge_start, edge_word, edge_target = array.array("I", [0]), array.array("I"), array.array("I")
+        for transitions in self.goto:
+            edge_word.extend(transitions.keys())
+            edge_target.extend(transitions.values())
+            edge_start.append(len(edge_word))
+        if sys.byteorder == "big":
+            for arr in (edge_start, edge_word, edge_target):
+                arr.byteswap()
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, self.source_sha256, len(self.names), len(vocab_words),
+            len(self.goto), len(edge_word), len(names_blob), len(vocab_blob),
+        )
+        return b"".join([
+            header, names_blob, vocab_blob,
+            _le_array("f", self.scores).tobytes(),
+            _le_array("f", self.weights).tobytes(),
+            _le_array("I", (self.vocab[w] for w in vocab_words)).tobytes(),
+            edge_start.tobytes(), edge_word.tobytes(), edge_target.tobytes(),
+            _le_array("I", self.fail).tobytes(),
+            _le_array("i", self.best_material).tobytes(),
+            _le_array("I", self.best_length).tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data, source_sha256=None):
+        """Load a compiled index; ValueError if it is not one, or not of `source_sha256`."""
+        if len(data) < _HEADER.size:
+            raise ValueError("truncated material index")
+        magic, version, digest, n_materials, n_words, n_states, n_edges, names_len, vocab_len = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("not a material index of this version")
+        if source_sha256 is not None and digest != source_sha256:
+            raise ValueError("material index was built from another table")
+
+        data = memoryview(data)
+        offset = _HEADER.size
+        names = bytes(data[offset:offset + names_len]).decode().split("\0")
+        offset += names_len
+        vocab_words = bytes(data[offset:offset + vocab_len]).decode().split("\0")
+        offset += vocab_len
+        scores, offset = _read_array("f", data, offset, n_materials)
+        weights, offset = _read_array("f", data, offset, n_materials)
+        word_ids, offset = _read_array("I", data, offset, n_words)
+        edge_start, offset = _read_array("I", data, offset, n_states + 1)
+        edge_word, offset = _read_array("I", data, offset, n_edges)
+        edge_target, offset = _read_array("I", data, offset, n_edges)
+        fail, offset = _read_array("I", data, offset, n_states)
+        best_material, offset = _read_array("i", data, offset, n_states)
+        best_length, offset = _read_array("I", data, offset, n_states)
+        if offset != len(data) or len(names) != n_materials or len(vocab_words) != n_words:
+            raise ValueError("corrupt material index")
+
+        edge_word, edge_target = edge_word.tolist(), edge_target.tolist()
+        goto = [
+            dict(zip(edge_word[a:b], edge_target[a:b]))
+            for a, b in zip(edge_start, edge_start[1:])
+        ]
+        # round-trip through float32: keep the table's two-decimal values
+        return cls(
+            names, [round(s, 4) for s in scores], [round(w, 4) for w in weights],
+            dict(zip(vocab_words, word_ids.tolist())), goto, fail.tolist(),
+            best_material.tolist(), best_length.tolist(), digest,
+        )
+
+    # --- matching ---
+
+    def match(self, text):
+        """Materials named in `text` as (material, first word, end word) tuples, in order."""
+        vocab, goto, fail = self.vocab, self.goto, self.fail
+        best_material, best_length = self.best_material, self.best_length
+        matches = []
+        state = 0
+        for pos, word in enumerate(_words(text)):
+            word_id = vocab.get(word)
+            if word_id is None:
+                state = 0
+                continue
+            nxt = goto[state].get(word_id)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(word_id)
+            state = nxt or 0
+            material = best_material[state]
+            if material < 0:
+                continue
+            length = best_length[state]
+            start = pos + 1 - length
+            # a longer match replaces the shorter ones it overlaps
+            while matches and start < matches[-1][2] and length > matches[-1][2] - matches[-1][1]:
+                matches.pop()
+            if matches and start < matches[-1][2]:
+                continue
+            matches.append((material, start, pos + 1))
+        return matches
+
+    def score(self, text):
+        """
+        Weighted material score (0-1) of a description and the materials it
+        names; the score is None when no known material is mentioned.
+        """
+        seen = {}
+        for material, _, _ in self.match(text):
+            seen.setdefault(material, None)
+        if not seen:
+            return {"material_score": None, "materials": []}
+        total_weight = sum(self.weights[m] for m in seen)
+        weighted = sum(self.weights[m] * self.scores[m] for m in seen)
+        return {
+            "material_score": round(weighted / total_weight, 4),
+            "materials": [self.names[m] for m in seen],
+        }
+
+
+# =====================================================
+# LOADING
+# =====================================================
+
+def load(table_path=TABLE_PATH, compiled_path=COMPILED_PATH):
+    """Load (or compile) the shared index; cheap after the first call."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                digest = _file_sha256(table_path)
+                try:
+                    with open(compiled_path, "rb") as fh:
+                        _index = MaterialIndex.from_bytes(fh.read(), digest)
+                except (OSError, ValueError):
+                    _index = MaterialIndex.compile(table_path)
+    return _index
+
+
+def score_description(text):
+    return load().score(text)
+
+
+def build(table_path=TABLE_PATH, compiled_path=COMPILED_PATH):
+    """Compile the CSV table into its binary form."""
+    index = MaterialIndex.compile(table_path)
+    data = index.to_bytes()
+    with open(compiled_path, "wb") as fh:
+        fh.write(data)
+    return index, len(data)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["build"]:
+        index, size = build()
+        print(f"wrote {COMPILED_PATH}: {len(index.names)} materials, "
+              f"{len(index.goto)} states, {size} bytes")
+    elif sys.argv[1:2] == ["score"] and len(sys.argv) > 2:
+        print(score_description(" ".join(sys.argv[2:])))
+    else:
+        print("usage: python materials.py build | score <description>")
+        sys.exit(2)
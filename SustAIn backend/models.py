@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String
+from datetime import datetime
+
+from sqlalchemy import DDL, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, event
 from database import Base
 
 class UserUsage(Base):
@@ -7,4 +9,162 @@ class UserUsage(Base):
     user_id = Column(String, primary_key=True, index=True)
     prompts_used = Column(Integer, default=0)
     tokens_used = Column(Integer, default=0)
+    # tokens prompt compaction kept from the model, counted like tokens_used
+    tokens_compacted = Column(Integer, default=0)
     gradcam_used = Column(Integer, default=0)
+    # as given by the client; groups users for company history and rankings
+    company = Column(String(100), nullable=True, index=True)
+    # ASI after the last charge, for the leaderboard
+    asi = Column(Float, nullable=True)
+    # business or consumer, as given by the client; selects the limit policy
+    role = Column(String(20), nullable=True)
+
+
+# =====================================================
+# LIMIT POLICIES
+# =====================================================
+# Daily limits and ASI weights per company and role, compiled in memory
+# by policies.PolicyEngine. NULL company / role: the row applies to every
+# company / role; NULL limit or weight: inherited from a wider row.
+# policy_stamp holds one row whose version is bumped by every change;
+# the engine polls it to know when to recompile.
+
+class LimitPolicy(Base):
+    __tablename__ = "limit_policies"
+
+    id = Column(Integer, primary_key=True)
+    company = Column(String(100), nullable=True)
+    role = Column(String(20), nullable=True)
+    max_prompts_per_day = Column(Integer, nullable=True)
+    max_tokens_per_day = Column(Integer, nullable=True)
+    max_gradcam_per_day = Column(Integer, nullable=True)
+    asi_weight_energy = Column(Float, nullable=True)
+    asi_weight_water = Column(Float, nullable=True)
+    asi_weight_cost = Column(Float, nullable=True)
+    model_weight = Column(Float, nullable=True)
+    max_concurrent_model_calls = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_limit_policies_company_role", "company", "role"),)
+
+
+class PolicyStamp(Base):
+    __tablename__ = "policy_stamp"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# =====================================================
+# FORUM
+# =====================================================
+# Ids only ever grow, so "newest first" is `ORDER BY id DESC` on the
+# primary key and pages are cut with `id < cursor` (keyset pagination).
+
+class ForumThread(Base):
+    __tablename__ = "forum_threads"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(200), nullable=False)
+    author = Column(String(100), nullable=False)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    post_count = Column(Integer, default=0, nullable=False)
+    last_post_at = Column(DateTime, nullable=True)
+    # the Idempotency-Key the thread was created with, if any
+    client_id = Column(String(200), nullable=True, unique=True, index=True)
+
+
+class ForumPost(Base):
+    __tablename__ = "forum_posts"
+
+    id = Column(Integer, primary_key=True)
+    thread_id = Column(Integer, ForeignKey("forum_threads.id"), nullable=False)
+    author = Column(String(100), nullable=False)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_forum_posts_thread_id_id", "thread_id", "id"),)
+
+
+# Full-text index over thread titles and bodies (SQLite FTS5). External
+# content: the text lives in forum_threads only, triggers keep the index
+# in step with inserts, updates and deletes.
+for _statement in (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS forum_threads_fts USING fts5(
+        title, body, content='forum_threads', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS forum_threads_ai AFTER INSERT ON forum_threads BEGIN
+        INSERT INTO forum_threads_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS forum_threads_ad AFTER DELETE ON forum_threads BEGIN
+        INSERT INTO forum_threads_fts (forum_threads_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS forum_threads_au AFTER UPDATE OF title, body ON forum_threads BEGIN
+        INSERT INTO forum_threads_fts (forum_threads_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO forum_threads_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+):
+    event.listen(ForumThread.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+# =====================================================
+# NEWS
+# =====================================================
+# One row per configured feed with the validators of its last response
+# (for conditional GETs) and a hash of its last body; items are unique by
+# a hash of their normalized title and summary, so a story syndicated to
+# several feeds is stored once.
+
+class NewsFeed(Base):
+    __tablename__ = "news_feeds"
+
+    url = Column(String(2000), primary_key=True)
+    etag = Column(String(200), nullable=True)
+    last_modified = Column(String(100), nullable=True)
+    body_hash = Column(String(64), nullable=True)
+    last_polled_at = Column(DateTime, nullable=True)
+    last_status = Column(Integer, nullable=True)
+    last_error = Column(String(200), nullable=True)
+
+
+class NewsItem(Base):
+    __tablename__ = "news_items"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)
+    title = Column(String(300), nullable=False)
+    summary = Column(Text, nullable=False, default="")
+    link = Column(String(2000), nullable=True)
+    source = Column(String(200), nullable=False)
+    feed_url = Column(String(2000), nullable=False)
+    published = Column(DateTime, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# =====================================================
+# USAGE EVENTS
+# =====================================================
+# Append-only: one row per /chat or /gradcam outcome, written in batches
+# by usage_log.UsageLogWriter. Never updated, so it can be audited or
+# replayed to rebuild the counters in user_usage.
+
+class UsageEvent(Base):
+    __tablename__ = "usage_events"
+
+    id = Column(Integer, primary_key=True)
+    ts = Column(DateTime, nullable=False)
+    user_id = Column(String(100), nullable=False)
+    endpoint = Column(String(20), nullable=False)   # chat, chat/stream, chat/batch, gradcam
+    status = Column(Integer, nullable=False)         # HTTP status of the outcome
+    tokens_used = Column(Integer, nullable=False, default=0)
+    model = Column(String(100), nullable=True)
+    latency_ms = Column(Float, nullable=True)        # model call only
+    cache_hit = Column(Boolean, nullable=False, default=False)
+    asi = Column(Float, nullable=True)
+    psi = Column(Float, nullable=True)
+    company = Column(String(100), nullable=True)
+
+    __table_args__ = (Index("ix_usage_events_user_ts", "user_id", "ts"),)
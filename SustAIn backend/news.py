@@ -0,0 +1,351 @@
+import hashlib
+import html
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, get_db
+from models import NewsFeed, NewsItem
+
+# =====================================================
+# NEWS INGESTION
+# =====================================================
+# A background thread polls the configured RSS / Atom feeds every
+# NEWS_POLL_INTERVAL_S. Each poll is a conditional GET (If-None-Match /
+# If-Modified-Since from the feed's last response), so an unchanged feed
+# costs a 304 and no parsing. Servers that ignore the validators are
+# caught by the body hash instead. New items are deduplicated by content
+# hash and stored in one transaction per cycle.
+#
+# Feeds: NEWS_FEEDS (comma-separated URLs) and/or NEWS_FEEDS_FILE (one URL
+# per line, `#` comments). Without any, the worker does not start.
+
+NEWS_POLL_INTERVAL_S = float(os.getenv("NEWS_POLL_INTERVAL_S", "900"))
+NEWS_FETCH_CONCURRENCY = int(os.getenv("NEWS_FETCH_CONCURRENCY", "16"))
+NEWS_FETCH_TIMEOUT_S = float(os.getenv("NEWS_FETCH_TIMEOUT_S", "10"))
+MAX_FEED_BYTES = 5 * 2 ** 20
+SUMMARY_CHARS = 500
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def configured_feeds():
+    urls = [u.strip() for u in os.getenv("NEWS_FEEDS", "").split(",")]
+    path = os.getenv("NEWS_FEEDS_FILE")
+    if path:
+        with open(path, encoding="utf-8") as fh:
+            urls += [line.split("#", 1)[0].strip() for line in fh]
+    return list(dict.fromkeys(u for u in urls if u))
+
+
+# =====================================================
+# PARSING
+# =====================================================
+
+class FeedError(Exception):
+    pass
+
+
+def _clean(text, limit=None):
+    """Feed text to plain text: tags stripped, entities decoded, spaces collapsed."""
+    text = _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", text or ""))).strip()
+    if limit is not None and len(text) > limit:
+        text = text[: limit - 1].rstrip() + "…"
+    return text
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)  # RSS: RFC 822
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))  # Atom: RFC 3339
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def content_hash(title, summary):
+    """Identity of a story across feeds and polls."""
+    key = f"{title.casefold()}\n{summary.casefold()}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def parse_feed(body: bytes):
+    """Items of an RSS 2.0 or Atom document as (source title, [item dicts])."""
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError as exc:
+        raise FeedError(f"invalid XML: {exc}") from None
+
+    if root.tag == "rss":
+        channel = root.find("channel")
+        if channel is None:
+            raise FeedError("RSS without a channel")
+        source = _clean(channel.findtext("title"), 200)
+        entries = (
+            (e.findtext("title"), e.findtext("description"), e.findtext("link"), e.findtext("pubDate"))
+            for e in channel.iter("item")
+        )
+    elif root.tag == _ATOM + "feed":
+        source = _clean(root.findtext(_ATOM + "title"), 200)
+        entries = (
+            (
+                e.findtext(_ATOM + "title"),
+                e.findtext(_ATOM + "summary") or e.findtext(_ATOM + "content"),
+                next(
+                    (link.get("href") for link in e.iter(_ATOM + "link")
+                     if link.get("rel", "alternate") == "alternate"),
+                    None,
+                ),
+                e.findtext(_ATOM + "published") or e.findtext(_ATOM + "updated"),
+            )
+            for e in root.iter(_ATOM + "entry")
+        )
+    else:
+        raise FeedError(f"not an RSS or Atom feed: <{root.tag}>")
+
+    items = []
+    for title, summary, link, published in entries:
+        title = _clean(title, 300)
+        if not title:
+            continue
+        summary = _clean(summary, SUMMARY_CHARS)
+        items.append({
+            "content_hash": content_hash(title, summary),
+            "title": title,
+            "summary": summary,
+            "link": (link or "").strip()[:2000] or None,
+            "published": _parse_date(published),
+        })
+    return source or "Unknown source", items
+
+
+# =====================================================
+# FETCHING
+# =====================================================
+
+def _fetch(client: httpx.Client, url, etag, last_modified, body_hash):
+    """
+    One conditional GET plus parse. Runs on the fetch pool, so it only
+    takes and returns plain values, never ORM objects.
+    """
+    result = {
+        "url": url, "status": None, "error": None, "bytes": 0, "parse_s": 0.0,
+        "etag": etag, "last_modified": last_modified, "body_hash": body_hash,
+        "source": None, "items": [],
+    }
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        with client.stream("GET", url, headers=headers) as resp:
+            result["status"] = resp.status_code
+            # drained even for a 304: an unread response closes its keep-alive connection
+            chunks, size = [], 0
+            for chunk in resp.iter_bytes():
+                size += len(chunk)
+                if size > MAX_FEED_BYTES:
+                    raise FeedError(f"larger than {MAX_FEED_BYTES} bytes")
+                chunks.append(chunk)
+            # what crossed the wire: headers plus the (possibly compressed) body
+            result["bytes"] = resp.num_bytes_downloaded + sum(
+                len(k) + len(v) + 4 for k, v in resp.headers.raw
+            )
+    except (httpx.HTTPError, FeedError) as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"[:200]
+        return result
+
+    if resp.status_code == 304:
+        return result
+    if resp.status_code != 200:
+        result["error"] = f"HTTP {resp.status_code}"
+        return result
+
+    body = b"".join(chunks)
+    result["etag"] = resp.headers.get("etag")
+    result["last_modified"] = resp.headers.get("last-modified")
+    digest = hashlib.sha256(body).hexdigest()
+    if digest == body_hash:
+        return result  # the server ignored the validators, but nothing changed
+    result["body_hash"] = digest
+
+    t0 = time.perf_counter()
+    try:
+        result["source"], result["items"] = parse_feed(body)
+    except FeedError as exc:
+        result["error"] = str(exc)[:200]
+        result["body_hash"] = body_hash  # try again next cycle
+    result["parse_s"] = time.perf_counter() - t0
+    return result
+
+
+class NewsIngestor:
+    def __init__(self, feeds=None, interval_s=NEWS_POLL_INTERVAL_S,
+                 concurrency=NEWS_FETCH_CONCURRENCY, timeout_s=NEWS_FETCH_TIMEOUT_S):
+        self.feeds = feeds
+        self.interval_s = interval_s
+        self.concurrency = concurrency
+        self.timeout_s = timeout_s
+        self.last_cycle = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        """Poll every feed once and store the new items. Returns cycle stats."""
+        feeds = self.feeds if self.feeds is not None else configured_feeds()
+        t0 = time.perf_counter()
+        db = SessionLocal()
+        try:
+            known = {f.url: f for f in db.query(NewsFeed).filter(NewsFeed.url.in_(feeds))} if feeds else {}
+            for url in feeds:
+                if url not in known:
+                    known[url] = NewsFeed(url=url)
+                    db.add(known[url])
+            jobs = [(url, known[url].etag, known[url].last_modified, known[url].body_hash) for url in feeds]
+
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            with httpx.Client(timeout=self.timeout_s, limits=limits, follow_redirects=True,
+                              headers={"User-Agent": "sustAIn-news/1.0"}) as client, \
+                    ThreadPoolExecutor(self.concurrency, thread_name_prefix="news-fetch") as pool:
+                results = list(pool.map(lambda job: _fetch(client, *job), jobs))
+
+            now = datetime.utcnow()
+            candidates = {}
+            for r in results:
+                feed = known[r["url"]]
+                feed.last_polled_at = now
+                feed.last_status = r["status"]
+                feed.last_error = r["error"]
+                feed.etag, feed.last_modified, feed.body_hash = r["etag"], r["last_modified"], r["body_hash"]
+                for item in r["items"]:
+                    candidates.setdefault(item["content_hash"], dict(item, source=r["source"], feed_url=r["url"]))
+
+            existing = set()
+            hashes = list(candidates)
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                existing.update(h for (h,) in db.query(NewsItem.content_hash).filter(NewsItem.content_hash.in_(chunk)))
+            new = [item for h, item in candidates.items() if h not in existing]
+            # ids are the delta cursor: give older stories the lower ids
+            new.sort(key=lambda item: item["published"] or datetime.min)
+            db.add_all(NewsItem(**item) for item in new)
+            db.commit()
+        finally:
+            db.close()
+
+        self.last_cycle = {
+            "finished_at": datetime.utcnow().isoformat() + "Z",
+            "feeds": len(results),
+            "fetched": sum(1 for r in results if r["status"] == 200 and not r["error"]),
+            "not_modified": sum(1 for r in results if r["status"] == 304),
+            "failed": sum(1 for r in results if r["error"]),
+            "bytes": sum(r["bytes"] for r in results),
+            "parse_s": round(sum(r["parse_s"] for r in results), 4),
+            "items_seen": sum(len(r["items"]) for r in results),
+            "items_new": len(new),
+            "duration_s": round(time.perf_counter() - t0, 4),
+        }
+        return self.last_cycle
+
+    # --- background worker ---
+
+    def start(self):
+        if self._thread is not None or not (self.feeds if self.feeds is not None else configured_feeds()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="news-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as exc:  # surfaced through /news/status, next cycle retries
+                self.last_cycle = {"finished_at": datetime.utcnow().isoformat() + "Z",
+                                   "error": f"{type(exc).__name__}: {exc}"}
+            self._stop.wait(self.interval_s)
+
+
+ingestor = NewsIngestor()
+
+
+# =====================================================
+# NEWS API
+# =====================================================
+# Items are served by id, which only grows: a client passes the largest
+# id it has as `since` and gets only what was stored after it, oldest
+# first. If more than `limit` are waiting, it gets the newest `limit` of
+# them: a client that was away for a long time catches up with the
+# latest stories instead of replaying the backlog.
+
+router = APIRouter(prefix="/news", tags=["news"])
+
+
+def _iso(value: Optional[datetime]):
+    return value.isoformat() + "Z" if value is not None else None
+
+
+def _item_dict(item: NewsItem):
+    return {
+        "id": item.id,
+        "title": item.title,
+        "summary": item.summary,
+        "link": item.link,
+        "source": item.source,
+        "published": _iso(item.published),
+    }
+
+
+@router.get("")
+def list_news(
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    items = (
+        db.query(NewsItem)
+        .filter(NewsItem.id > since)
+        .order_by(NewsItem.id.desc())
+        .limit(limit)
+        .all()
+    )
+    items.reverse()
+    return {
+        "items": [_item_dict(i) for i in items],
+        "next_since": items[-1].id if items else since,
+    }
+
+
+@router.get("/status")
+def news_status():
+    return {"feeds": len(ingestor.feeds if ingestor.feeds is not None else configured_feeds()),
+            "last_cycle": ingestor.last_cycle}
@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from utils import (
+    ASI_WEIGHTS, MAX_CONCURRENT_MODEL_CALLS, MAX_GRADCAM_PER_DAY, MAX_PROMPTS_PER_DAY, MAX_TOKENS_PER_DAY,
+    MODEL_WEIGHT,
+)
+
+# =====================================================
+# LIMIT POLICIES
+# =====================================================
+# Daily limits, ASI weights and the company's share of the upstream
+# model (see fairqueue.py) per company and per role (business /
+# consumer), stored in limit_policies. A row names a company and / or a
+# role (NULL: any) and sets some fields (NULL: inherit). A field resolves
+# from the most specific row that sets it:
+#
+#   (company, role) -> (company, any role) -> (any company, role)
+#     -> (any, any) -> the defaults in utils.py
+#
+# The rows are compiled into a dict of fully resolved Policy objects, one
+# per (company, role) pair that any row names, so a request finds its
+# policy in one or two dict lookups and never reads the database.
+#
+# Every write bumps the single version in policy_stamp, in the same
+# transaction as the change. A background thread reads that integer
+# every POLICY_REFRESH_S and recompiles when it moved, so a change
+# reaches every worker within seconds, without a restart. Edit the rows
+# with the CLI below, or bump policy_stamp.version after editing by hand.
+#
+#     python policies.py list
+#     python policies.py set --company Acme --role business --max-prompts 20 --asi-weights 0.5 0.3 0.2
+#     python policies.py delete --company Acme --role business
+
+POLICY_REFRESH_S = float(os.getenv("POLICY_REFRESH_S", "5"))
+
+ROLES = ("business", "consumer")
+LIMIT_FIELDS = ("max_prompts_per_day", "max_tokens_per_day", "max_gradcam_per_day")
+WEIGHT_FIELDS = ("asi_weight_energy", "asi_weight_water", "asi_weight_cost")
+MODEL_FIELDS = ("model_weight", "max_concurrent_model_calls")
+FIELDS = LIMIT_FIELDS + WEIGHT_FIELDS + MODEL_FIELDS
+
+DEFAULTS = {
+    "max_prompts_per_day": MAX_PROMPTS_PER_DAY,
+    "max_tokens_per_day": MAX_TOKENS_PER_DAY,
+    "max_gradcam_per_day": MAX_GRADCAM_PER_DAY,
+    **dict(zip(WEIGHT_FIELDS, ASI_WEIGHTS)),
+    "model_weight": MODEL_WEIGHT,
+    "max_concurrent_model_calls": MAX_CONCURRENT_MODEL_CALLS,
+}
+
+
+class Policy:
+    """The resolved limits, ASI weights and model share of one (company, role)."""
+
+    __slots__ = ("max_prompts_per_day", "max_tokens_per_day", "max_gradcam_per_day", "asi_weights",
+                 "model_weight", "max_concurrent_model_calls")
+
+    def __init__(self, values):
+        self.max_prompts_per_day = values["max_prompts_per_day"]
+        self.max_tokens_per_day = values["max_tokens_per_day"]
+        self.max_gradcam_per_day = values["max_gradcam_per_day"]
+        self.asi_weights = tuple(values[f] for f in WEIGHT_FIELDS)
+        self.model_weight = values["model_weight"]
+        self.max_concurrent_model_calls = values["max_concurrent_model_calls"]
+
+    def as_dict(self):
+        energy, water, cost = self.asi_weights
+        return {
+            "max_prompts_per_day": self.max_prompts_per_day,
+            "max_tokens_per_day": self.max_tokens_per_day,
+            "max_gradcam_per_day": self.max_gradcam_per_day,
+            "asi_weights": {"energy": energy, "water": water, "cost": cost},
+            "model_weight": self.model_weight,
+            "max_concurrent_model_calls": self.max_concurrent_model_calls,
+        }
+
+
+def compile_policies(rows, defaults=DEFAULTS):
+    """
+    {(company, role): Policy} from row dicts, for company None and every
+    company named by a row, and role None and every role.
+    """
+    scopes = {(row["company"], row["role"]): row for row in rows}
+    table = {}
+    for company in [None] + sorted({c for c, _ in scopes if c is not None}):
+        for role in (None,) + ROLES:
+            chain = [scopes.get(key) for key in dict.fromkeys(
+                [(company, role), (company, None), (None, role), (None, None)]
+            )]
+            chain = [row for row in chain if row is not None]
+            values = {}
+            for field in FIELDS:
+                values[field] = next((row[field] for row in chain if row[field] is not None), defaults[field])
+            table[(company, role)] = Policy(values)
+    return table
+
+
+def _row_dict(row):
+    return {
+        "company": row.company,
+        "role": row.role,
+        **{field: getattr(row, field) for field in FIELDS},
+        "updated_at": row.updated_at.isoformat() + "Z",
+    }
+
+
+# =====================================================
+# ENGINE
+# =====================================================
+
+class PolicyEngine:
+    def __init__(self, refresh_s=POLICY_REFRESH_S):
+        self.refresh_s = refresh_s
+        self.defaults = dict(DEFAULTS)
+        self.rows = []
+        self.version = None  # policy_stamp.version of the compiled rows
+        self._table = compile_policies(self.rows, self.defaults)
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.last_error = None
+
+    def lookup(self, company=None, role=None):
+        """The user's Policy. O(1), no database access."""
+        table = self._table  # swapped whole on reload, never mutated
+        return table.get((company, role)) or table.get((None, role)) or table[(None, None)]
+
+    def set_defaults(self, **values):
+        """Override built-in defaults (benchmarks lift the limits this way)."""
+        with self._reload_lock:
+            self.defaults.update(values)
+            self._table = compile_policies(self.rows, self.defaults)
+
+    def refresh(self, force=False):
+        """Recompile if policy_stamp moved; True if it did."""
+        from database import SessionLocal
+        from models import LimitPolicy, PolicyStamp
+
+        with self._reload_lock:
+            db = SessionLocal()
+            try:
+                # stamp first: a write landing between the two reads is
+                # picked up again by the next poll
+                version = db.query(PolicyStamp.version).filter(PolicyStamp.id == 1).scalar() or 0
+                if version == self.version and not force:
+                    return False
+                rows = [_row_dict(row) for row in db.query(LimitPolicy).order_by(LimitPolicy.id)]
+            finally:
+                db.close()
+            self._table = compile_policies(rows, self.defaults)
+            self.rows, self.version = rows, version
+            self.reloads += 1
+            return True
+
+    def start(self):
+        """Load the policies, then poll for changes on a background thread."""
+        try:
+            self.refresh(force=True)
+        except Exception as exc:  # serve the defaults; the poller retries
+            self.last_error = f"{type(exc).__name__}: {exc}"
+        if self._thread is not None or self.refresh_s <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="policy-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_s):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as exc:  # surfaced through /policies/status, next poll retries
+                self.last_error = f"{type(exc).__name__}: {exc}"
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "rows": len(self.rows),
+            "compiled": len(self._table),
+            "reloads": self.reloads,
+            "refresh_s": self.refresh_s,
+            "last_error": self.last_error,
+        }
+
+
+engine = PolicyEngine()
+
+
+# =====================================================
+# WRITES
+# =====================================================
+
+def _validate(role, values):
+    if role is not None and role not in ROLES:
+        raise ValueError(f"role must be one of {', '.join(ROLES)}")
+    for field, value in values.items():
+        if value is None:
+            continue
+        if field == "max_gradcam_per_day" and value < 0:
+            raise ValueError(f"{field} must be 0 or more")
+        if field in ("max_prompts_per_day", "max_tokens_per_day") and value < 1:
+            raise ValueError(f"{field} must be at least 1")  # ASI divides by them
+        if field == "max_concurrent_model_calls" and value < 1:
+            raise ValueError(f"{field} must be at least 1")
+        if field == "model_weight" and value <= 0:
+            raise ValueError(f"{field} must be positive")
+        if field in WEIGHT_FIELDS and value < 0:
+            raise ValueError(f"{field} must not be negative")
+
+
+def _bump_stamp(db):
+    from models import PolicyStamp
+
+    bumped = db.query(PolicyStamp).filter(PolicyStamp.id == 1).update(
+        {PolicyStamp.version: PolicyStamp.version + 1}, synchronize_session=False
+    )
+    if not bumped:
+        db.add(PolicyStamp(id=1, version=1))
+
+
+def put_policy(db, company=None, role=None, **values):
+    """Create or replace the row of (company, role); unset fields inherit."""
+    from models import LimitPolicy
+
+    unknown = set(values) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    _validate(role, values)
+    # `== None` compiles to IS NULL: the wildcard rows match too
+    row = db.query(LimitPolicy).filter(LimitPolicy.company == company, LimitPolicy.role == role).first()
+    if row is None:
+        row = LimitPolicy(company=company, role=role)
+        db.add(row)
+    for field in FIELDS:
+        setattr(row, field, values.get(field))
+    row.updated_at = datetime.utcnow()
+    _bump_stamp(db)
+    db.commit()
+    return _row_dict(row)
+
+
+def delete_policy(db, company=None, role=None):
+    from models import LimitPolicy
+
+    deleted = db.query(LimitPolicy).filter(
+        LimitPolicy.company == company, LimitPolicy.role == role
+    ).delete(synchronize_session=False)
+    if deleted:
+        _bump_stamp(db)
+    db.commit()
+    return bool(deleted)
+
+
+# =====================================================
+# POLICY API
+# =====================================================
+# Read-only and served from the compiled table; the desktop client takes
+# its limits from /policies/limits instead of hard-coding them.
+
+router = APIRouter(prefix="/policies", tags=["policies"])
+
+
+@router.get("/limits")
+def my_limits(
+    company: Optional[str] = Query(None, max_length=100),
+    role: Optional[str] = Query(None, max_length=20),
+):
+    """
+    {"max_prompts_per_day", "max_tokens_per_day", "max_gradcam_per_day",
+    "asi_weights", "model_weight", "max_concurrent_model_calls", "version"}.
+    """
+    if role is not None and role not in ROLES:
+        raise HTTPException(422, f"role must be one of {', '.join(ROLES)}")
+    return {**engine.lookup(company or None, role).as_dict(), "version": engine.version}
+
+
+@router.get("")
+def list_policies():
+    return {"version": engine.version, "defaults": engine.defaults, "policies": engine.rows}
+
+
+@router.get("/status")
+def policy_status():
+    return engine.stats()
+
+
+# =====================================================
+# CLI
+# =====================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-company / per-role limit policies.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="print every row")
+    for name, help_text in (("set", "create or replace a row"), ("delete", "delete a row")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("--company", help="default: every company")
+        cmd.add_argument("--role", choices=ROLES, help="default: both roles")
+        if name == "set":
+            cmd.add_argument("--max-prompts", type=int, dest="max_prompts_per_day")
+            cmd.add_argument("--max-tokens", type=int, dest="max_tokens_per_day")
+            cmd.add_argument("--max-gradcam", type=int, dest="max_gradcam_per_day")
+            cmd.add_argument("--asi-weights", type=float, nargs=3, metavar=("ENERGY", "WATER", "COST"))
+            cmd.add_argument("--model-weight", type=float, dest="model_weight")
+            cmd.add_argument("--max-model-calls", type=int, dest="max_concurrent_model_calls")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal, init_db
+    from models import LimitPolicy
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.command == "list":
+            for row in db.query(LimitPolicy).order_by(LimitPolicy.id):
+                print(json.dumps(_row_dict(row)))
+        elif args.command == "set":
+            values = {field: getattr(args, field) for field in LIMIT_FIELDS + MODEL_FIELDS}
+            if args.asi_weights:
+                values.update(zip(WEIGHT_FIELDS, args.asi_weights))
+            try:
+                print(json.dumps(put_policy(db, args.company, args.role, **values)))
+            except ValueError as exc:
+                parser.error(str(exc))
+        elif not delete_policy(db, args.company, args.role):
+            print("no such policy", file=sys.stderr)
+            return 1
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
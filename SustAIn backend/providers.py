@@ -0,0 +1,42 @@
+import os
+import threading
+
+# =====================================================
+# UPSTREAM MODEL PROVIDER
+# =====================================================
+# google.generativeai pulls in grpc/protobuf and takes a noticeable
+# slice of worker boot time, so it is only imported the first time a
+# model is actually needed (normally by the lifespan warm-up).
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-pro")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _load_gemini():
+    import google.generativeai as genai
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY missing")
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+
+def get_model():
+    """Return the shared model, loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_gemini()
+    return _model
+
+
+def set_model(model):
+    """Install a model object (anything with `generate_content`), e.g. a stub."""
+    global _model
+    with _model_lock:
+        _model = model
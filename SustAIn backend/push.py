@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+from collections import deque
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+# =====================================================
+# PUSH UPDATES
+# =====================================================
+# Clients keep one WebSocket open on /ws and receive a JSON object each
+# time their quota or scores change: a full snapshot right after
+# connecting, then only the fields an action changed, e.g.
+#
+#     {"prompts_left":4,"tokens_left":6120,"ASI":81.2}
+#     {"PSI":63.5,"uses_left":0}
+#
+# Endpoints publish from worker threads; fan-out runs on the event loop.
+# An event is encoded once, whatever the number of subscribers. Each
+# connection has a bounded queue: a client that falls PUSH_QUEUE_SIZE
+# events behind (or stalls a send for PUSH_SEND_TIMEOUT_S) is
+# disconnected with 1013 "try again later" rather than buffered without
+# limit. On reconnect it gets a fresh snapshot, so nothing is lost.
+
+PUSH_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "32"))
+PUSH_SEND_TIMEOUT_S = float(os.getenv("PUSH_SEND_TIMEOUT_S", "10"))
+
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def _encode(fields):
+    return json.dumps(fields, separators=(",", ":"))
+
+
+class Subscriber:
+    __slots__ = ("user_id", "pending", "wakeup", "dropped", "closed")
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.pending = deque()
+        self.wakeup = asyncio.Event()
+        self.dropped = False
+        self.closed = False
+
+    def offer(self, payload):
+        if self.dropped or self.closed:
+            return
+        if len(self.pending) >= PUSH_QUEUE_SIZE:
+            self.dropped = True
+            self.pending.clear()
+        else:
+            self.pending.append(payload)
+        self.wakeup.set()
+
+
+class Broker:
+    """In-process pub/sub of per-user updates to WebSocket connections."""
+
+    def __init__(self):
+        self._subscribers = {}  # user_id -> set of Subscriber
+        self._loop = None
+        self.published = 0
+        self.slow_consumers = 0
+
+    def bind(self, loop):
+        """Attach to the server's event loop; called from the app lifespan."""
+        self._loop = loop
+
+    def stats(self):
+        return {
+            "connections": sum(len(subs) for subs in self._subscribers.values()),
+            "users": len(self._subscribers),
+            "published": self.published,
+            "slow_consumers_dropped": self.slow_consumers,
+        }
+
+    # --- publishing (any thread) ---
+
+    def publish(self, user_id, fields):
+        """Send `fields` to every connection of `user_id`. Thread-safe."""
+        # unlocked read: users without a connection never wake the loop
+        if self._loop is None or user_id not in self._subscribers:
+            return
+        self._loop.call_soon_threadsafe(self._fan_out, user_id, _encode(fields))
+
+    def _fan_out(self, user_id, payload):
+        self.published += 1
+        for sub in self._subscribers.get(user_id, ()):
+            sub.offer(payload)
+
+    # --- connections (event loop) ---
+
+    def _subscribe(self, user_id):
+        sub = Subscriber(user_id)
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def _unsubscribe(self, sub):
+        subs = self._subscribers.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.user_id]
+
+    async def serve(self, websocket: WebSocket, user_id, snapshot):
+        """
+        Run one accepted connection until either side closes it.
+        `snapshot` is an async callable returning the user's current fields.
+        """
+        sub = self._subscribe(user_id)
+        reader = asyncio.ensure_future(self._read_until_closed(websocket, sub))
+        try:
+            fields = await snapshot()
+            # anything published before the snapshot was read is already in it
+            sub.pending.clear()
+            await websocket.send_text(_encode(fields))
+            while True:
+                await sub.wakeup.wait()
+                sub.wakeup.clear()
+                if sub.closed:
+                    return
+                if sub.dropped:
+                    self.slow_consumers += 1
+                    await websocket.close(SLOW_CONSUMER_CLOSE_CODE, "slow consumer")
+                    return
+                while sub.pending:
+                    await asyncio.wait_for(websocket.send_text(sub.pending.popleft()), PUSH_SEND_TIMEOUT_S)
+        except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+            # RuntimeError: the client went away while we were sending
+            pass
+        finally:
+            reader.cancel()
+            self._unsubscribe(sub)
+
+    @staticmethod
+    async def _read_until_closed(websocket: WebSocket, sub):
+        # clients have nothing to say; reading is how a disconnect is noticed
+        try:
+            async for _ in websocket.iter_text():
+                pass
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        sub.closed = True
+        sub.wakeup.set()
+
+
+broker = Broker()
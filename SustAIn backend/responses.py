@@ -0,0 +1,148 @@
+import gzip
+import json
+import os
+from contextvars import ContextVar
+from datetime import date, datetime
+
+from starlette.responses import Response
+
+# =====================================================
+# RESPONSE ENCODING
+# =====================================================
+# FastResponse is the app's default response class:
+#
+# - JSON is encoded with orjson when it is installed (stdlib json
+#   otherwise); clients sending `Accept: application/msgpack` get msgpack
+#   instead, when the msgpack package is installed.
+# - Bodies of COMPRESS_MIN_BYTES or more are compressed for clients that
+#   accept it: brotli if the brotli package is installed, else gzip.
+#   Smaller bodies are sent as they are; compressing them costs more
+#   than it saves.
+#
+# NegotiationMiddleware records each request's Accept / Accept-Encoding
+# in a context variable, which is how the response class sees them.
+#
+# Returning a dict from an endpoint still runs FastAPI's jsonable_encoder
+# (and response_model validation) before the encoder here. Hot endpoints
+# return `fast_response(payload)` instead, so the payload is encoded
+# exactly once; their response_model then only documents the schema.
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ACCEPT = ("application/msgpack", "application/x-msgpack")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# (accept, accept-encoding) header values of the current request
+_request_headers = ContextVar("request_headers", default=(b"", b""))
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps_msgpack(payload) -> bytes:
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def _tokens(header: bytes):
+    """Lower-cased values of a comma-separated header, minus those with q=0."""
+    out = []
+    for part in header.decode("latin-1").lower().split(","):
+        value, _, params = part.partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        out.append(value.strip())
+    return out
+
+
+def negotiate(accept: bytes, accept_encoding: bytes):
+    """(media type, content coding or None) for a request's headers."""
+    media_type = JSON_MEDIA_TYPE
+    if msgpack is not None and accept and any(t in _MSGPACK_ACCEPT for t in _tokens(accept)):
+        media_type = MSGPACK_MEDIA_TYPE
+    coding = None
+    if accept_encoding:
+        codings = _tokens(accept_encoding)
+        if brotli is not None and "br" in codings:
+            coding = "br"
+        elif "gzip" in codings:
+            coding = "gzip"
+    return media_type, coding
+
+
+def compress(body: bytes, coding):
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL)
+
+
+class FastResponse(Response):
+    """JSON or msgpack by Accept, compressed above COMPRESS_MIN_BYTES."""
+
+    media_type = JSON_MEDIA_TYPE
+
+    def __init__(self, content=None, status_code=200, headers=None, media_type=None, background=None):
+        self._media_type, self._coding = negotiate(*_request_headers.get())
+        super().__init__(content, status_code, headers, media_type or self._media_type, background)
+        self.headers["Vary"] = "Accept, Accept-Encoding"
+        if self._coding is not None and len(self.body) >= COMPRESS_MIN_BYTES:
+            self.body = compress(self.body, self._coding)
+            self.headers["Content-Encoding"] = self._coding
+            self.headers["Content-Length"] = str(len(self.body))
+
+    def render(self, content) -> bytes:
+        if self._media_type == MSGPACK_MEDIA_TYPE:
+            return dumps_msgpack(content)
+        return dumps_json(content)
+
+
+def fast_response(payload, status_code=200):
+    """Return this from an endpoint to skip FastAPI's own encoding pass."""
+    return FastResponse(payload, status_code=status_code)
+
+
+class NegotiationMiddleware:
+    """Pure ASGI middleware: exposes Accept / Accept-Encoding to FastResponse."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = accept_encoding = b""
+        for name, value in scope["headers"]:
+            if name == b"accept":
+                accept = value
+            elif name == b"accept-encoding":
+                accept_encoding = value
+        token = _request_headers.set((accept, accept_encoding))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_headers.reset(token)
@@ -0,0 +1,153 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+# =====================================================
+# CONFIG
+# =====================================================
+
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 32 * 1024))   # per session
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", 64))
+SESSION_IDLE_TTL_S = int(os.getenv("SESSION_IDLE_TTL_S", 30 * 60))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 10000))                # per process
+
+# Upper bound on history sent upstream, even with plenty of quota left
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", 2000))
+# Kept free for the model's reply when budgeting the prompt
+REPLY_TOKEN_RESERVE = 256
+SUMMARY_SNIPPET_CHARS = 80
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text; good enough for budgeting
+    return max(1, len(text) // 4)
+
+
+# =====================================================
+# SESSION HISTORY (ring buffer with a byte cap)
+# =====================================================
+
+class ConversationSession:
+    __slots__ = ("user_id", "turns", "nbytes", "last_used")
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        # (role, text, tokens, nbytes) tuples, oldest first
+        self.turns = deque(maxlen=SESSION_MAX_TURNS)
+        self.nbytes = 0
+        self.last_used = time.monotonic()
+
+    def append(self, role, text):
+        if len(self.turns) == self.turns.maxlen:
+            self.nbytes -= self.turns[0][3]
+        size = len(text.encode("utf-8"))
+        self.turns.append((role, text, estimate_tokens(text), size))
+        self.nbytes += size
+        while self.nbytes > SESSION_MAX_BYTES and len(self.turns) > 1:
+            self.nbytes -= self.turns.popleft()[3]
+
+
+class SessionStore:
+    """In-process LRU of conversation sessions with idle eviction."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_ttl_s=SESSION_IDLE_TTL_S):
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self, now):
+        # least recently used first, so stop at the first live session
+        while self._sessions:
+            sid, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_ttl_s and len(self._sessions) < self.max_sessions:
+                break
+            del self._sessions[sid]
+
+    def snapshot(self, session_id, user_id):
+        """
+        Return (session_id, turns) for the user's session, creating it if
+        needed. Returns None if the id belongs to another user.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session_id = session_id or secrets.token_urlsafe(12)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = ConversationSession(user_id)
+            elif session.user_id != user_id:
+                return None
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return session_id, list(session.turns)
+
+    def record(self, session_id, user_message, reply):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:  # evicted while the model was answering
+                return
+            session.append("user", user_message)
+            session.append("model", reply)
+            session.last_used = time.monotonic()
+
+
+# =====================================================
+# TOKEN-BUDGETED CONTEXT ASSEMBLY
+# =====================================================
+
+def _summarize(turns):
+    # Extractive and free: the opening of each dropped user question
+    snippets = []
+    for role, text, _tokens, _size in turns:
+        if role == "user":
+            first = text.strip().split("\n", 1)[0]
+            snippets.append(first[:SUMMARY_SNIPPET_CHARS])
+    if not snippets:
+        return ""
+    return "Earlier in this conversation the user asked: " + "; ".join(snippets)
+
+
+def build_context(turns, message, tokens_left):
+    """
+    Fit the newest history turns plus `message` into what is left of the
+    daily token quota. Older turns that do not fit are folded into a short
+    summary when that fits, otherwise dropped.
+
+    Returns (contents, tokens_saved) where contents is the Gemini
+    `generate_content` payload and tokens_saved is the history tokens not
+    sent compared to replaying every stored turn.
+    """
+    budget = min(CONTEXT_MAX_TOKENS, tokens_left - REPLY_TOKEN_RESERVE) - estimate_tokens(message)
+    full_tokens = sum(t[2] for t in turns)
+
+    kept = []
+    used = 0
+    for turn in reversed(turns):
+        if used + turn[2] > budget:
+            break
+        kept.append(turn)
+        used += turn[2]
+    kept.reverse()
+    # history must open on a user turn for the turns to alternate
+    if kept and kept[0][0] == "model":
+        used -= kept.pop(0)[2]
+
+    contents = []
+    dropped = turns[:len(turns) - len(kept)]
+    if dropped:
+        summary = _summarize(dropped)
+        summary_tokens = estimate_tokens(summary) if summary else 0
+        if summary and used + summary_tokens <= budget:
+            contents.append({"role": "user", "parts": [summary]})
+            contents.append({"role": "model", "parts": ["Understood."]})
+            used += summary_tokens + 1
+
+    contents.extend({"role": role, "parts": [text]} for role, text, _t, _s in kept)
+    contents.append({"role": "user", "parts": [message]})
+    return contents, max(0, full_tokens - used)
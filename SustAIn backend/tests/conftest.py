@@ -0,0 +1,24 @@
+import atexit
+import os
+import sys
+import tempfile
+
+import pytest
+
+# the backend modules import each other by plain name, as when run from
+# this directory; database.py reads DATABASE_URL at import
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_fd, _db_path = tempfile.mkstemp(prefix="sustain-test-", suffix=".db")
+os.close(_fd)
+atexit.register(lambda: os.path.exists(_db_path) and os.remove(_db_path))
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+
+@pytest.fixture(scope="session")
+def database():
+    import database
+
+    database.init_db()
+    return database
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import forum
+
+THREAD = {"title": "Refill stations", "author": "ana", "body": "Where can I refill near the office?"}
+
+
+@pytest.fixture
+def client(database):
+    app = FastAPI()
+    app.include_router(forum.router)
+    return TestClient(app)
+
+
+def test_replay_returns_the_first_thread(client):
+    first = client.post("/forum/threads", json=THREAD, headers={"Idempotency-Key": "replay"})
+    again = client.post("/forum/threads", json=THREAD, headers={"Idempotency-Key": "replay"})
+    assert first.status_code == again.status_code == 201
+    assert again.json()["id"] == first.json()["id"]
+    assert again.headers["Idempotent-Replayed"] == "true"
+
+
+def test_key_reused_for_another_thread_is_rejected(client):
+    client.post("/forum/threads", json=THREAD, headers={"Idempotency-Key": "reused"})
+    resp = client.post("/forum/threads", json={**THREAD, "body": "Something else"},
+                       headers={"Idempotency-Key": "reused"})
+    assert resp.status_code == 422
+
+
+def test_conflict_without_a_replayable_row_is_409(client, monkeypatch):
+    client.post("/forum/threads", json=THREAD, headers={"Idempotency-Key": "vanished"})
+    # the insert hits the unique key, but the row cannot be read back
+    monkeypatch.setattr(forum, "_replayed_thread", lambda *args: None)
+    resp = client.post("/forum/threads", json=THREAD, headers={"Idempotency-Key": "vanished"})
+    assert resp.status_code == 409
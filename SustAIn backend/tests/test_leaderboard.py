@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import leaderboard
+from models import UserUsage
+
+USERS = [("lb-ana", "acme", 80.0), ("lb-ben", "acme", 60.0), ("lb-cy", "globex", 90.0)]
+
+
+@pytest.fixture
+def board(database, monkeypatch):
+    with database.SessionLocal() as db:
+        db.query(UserUsage).filter(UserUsage.user_id.in_([u for u, _, _ in USERS])).delete()
+        db.add_all(UserUsage(user_id=u, company=c, asi=asi) for u, c, asi in USERS)
+        db.commit()
+    fresh = leaderboard.Leaderboard()
+    monkeypatch.setattr(leaderboard, "board", fresh)
+    return fresh
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(leaderboard.router)
+    return TestClient(app)
+
+
+def test_first_request_loads_the_board_without_warmup(board, client):
+    assert not board.loaded
+    resp = client.get("/leaderboard/companies")
+    assert resp.status_code == 200
+    assert [(c["company"], c["asi"], c["members"]) for c in resp.json()["items"]] == [
+        ("globex", 90.0, 1), ("acme", 70.0, 2),
+    ]
+    assert client.get("/leaderboard/rank", params={"user_id": "lb-ben"}).json()["user"]["rank"] == 3
+
+
+def test_failed_load_is_retried_and_does_not_hold_updates(board, client, monkeypatch):
+    def fail():
+        raise RuntimeError("database is down")
+
+    with monkeypatch.context() as m:
+        m.setattr(board, "_read_rows", fail)
+        assert client.get("/leaderboard/companies").status_code == 503
+        assert not board.loaded
+        # updates are no longer held back for a load that is not happening
+        board.update_user("lb-dee", "initech", 50.0)
+        assert board._pending == {}
+
+    resp = client.get("/leaderboard/companies")
+    assert resp.status_code == 200
+    assert board.loaded
+    assert "globex" in [c["company"] for c in resp.json()["items"]]
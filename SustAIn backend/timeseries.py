@@ -0,0 +1,375 @@
+import math
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+# =====================================================
+# ASI / PSI HISTORY
+# =====================================================
+# In-memory time series of ASI, tokens and PSI per user and per company,
+# for the dashboard charts. Every series holds three rings of buckets,
+# one per resolution:
+#
+#   minute  TS_MINUTE_SLOTS buckets (default 1440: the last day)
+#   hour    TS_HOUR_SLOTS   buckets (default 720: the last 30 days)
+#   day     TS_DAY_SLOTS    buckets (default 400: a year and a month)
+#
+# A bucket is five doubles (ASI sum and count, tokens, PSI sum and
+# count). An event is added to its bucket in all three rings, so the
+# coarse rings are always up to date; buckets older than a ring keeps
+# age out.
+#
+# Most series are sparse (a user who chats a few times a day), so a ring
+# starts as a dict of the buckets it holds, about 1 KB per series for a
+# handful of events. When that dict reaches a third of the ring's slots,
+# aged-out buckets are dropped; if many are still live, the ring switches
+# to one flat array of all its slots plus the bucket number each holds
+# (a stale one is treated as empty and reused), which is smaller per
+# bucket from there on: a series never grows past about 120 KB with the
+# default sizes. At most TS_MAX_SERIES series are kept; the least
+# recently updated one is dropped first.
+#
+# A range query looks its series up by key and reads at most one ring's
+# worth of buckets, so its cost depends on the requested range and not
+# on how many users or companies are stored. It uses the coarsest
+# resolution that still gives `points` buckets over the range (and still
+# covers its start), then merges neighbouring buckets down to at most
+# `points`.
+#
+# Events come from the usage log writer thread after each batch is
+# stored (see usage_log.add_sink), never from the request path. The
+# events of earlier runs are loaded from the usage_events table by
+# prime(), on the warm-up thread (or the first /history request without
+# warm-up), so a long replay never holds up the writer. Live events and
+# primed ones do not overlap: prime() only loads events older than
+# begin_live(), which the lifespan calls before the writer starts.
+
+TS_MINUTE_SLOTS = int(os.getenv("TS_MINUTE_SLOTS", "1440"))
+TS_HOUR_SLOTS = int(os.getenv("TS_HOUR_SLOTS", "720"))
+TS_DAY_SLOTS = int(os.getenv("TS_DAY_SLOTS", "400"))
+TS_MAX_SERIES = int(os.getenv("TS_MAX_SERIES", "100000"))
+
+RESOLUTIONS = (("minute", 60), ("hour", 3600), ("day", 86400))
+DEFAULT_POINTS = 200
+MAX_POINTS = 2000
+DEFAULT_RANGE_S = 7 * 86400
+
+_WIDTH = 5  # asi_sum, asi_n, tokens, psi_sum, psi_n
+_EMPTY = array("d", bytes(8 * _WIDTH))
+DENSE_FRACTION = 3  # a ring holding slots // 3 buckets switches to dense
+
+
+def _first_bucket(start, step):
+    return int(math.ceil(start / step))
+
+
+class Ring:
+    """
+    The last `slots` buckets of `step` seconds: a dict of the buckets held
+    (sparse) until it fills a third of the slots, then one flat array of
+    all slots (dense).
+    """
+
+    __slots__ = ("step", "slots", "index", "buckets", "values", "newest")
+
+    def __init__(self, step, slots):
+        self.step = step
+        self.slots = slots
+        self.index = {}       # sparse: bucket -> offset into values
+        self.buckets = None   # dense: bucket held by each slot
+        self.values = array("d")
+        self.newest = -1
+
+    def add(self, ts, asi, tokens, psi):
+        bucket = int(ts // self.step)
+        if self.buckets is not None:
+            o = self._dense_offset(bucket)
+        else:
+            o = self._sparse_offset(bucket)
+        if o is None:
+            return  # older than this ring keeps
+        values = self.values
+        if asi is not None:
+            values[o] += asi
+            values[o + 1] += 1
+        values[o + 2] += tokens
+        if psi is not None:
+            values[o + 3] += psi
+            values[o + 4] += 1
+
+    def _dense_offset(self, bucket):
+        i = bucket % self.slots
+        held = self.buckets[i]
+        if held != bucket:
+            if held > bucket:
+                return None
+            self.buckets[i] = bucket
+            self.values[i * _WIDTH:(i + 1) * _WIDTH] = _EMPTY
+        return i * _WIDTH
+
+    def _sparse_offset(self, bucket):
+        o = self.index.get(bucket)
+        if o is not None:
+            return o
+        if bucket <= self.newest - self.slots:
+            return None
+        self.newest = max(self.newest, bucket)
+        threshold = self.slots // DENSE_FRACTION
+        if len(self.index) >= threshold:
+            # drop aged-out buckets; only go dense if many are still live
+            # (at least half the threshold, so pruning stays amortised O(1))
+            self._prune()
+            if len(self.index) >= threshold // 2:
+                self._densify()
+                return self._dense_offset(bucket)
+        o = len(self.values)
+        self.values.extend(_EMPTY)
+        self.index[bucket] = o
+        return o
+
+    def _prune(self):
+        index, values = {}, array("d")
+        old = self.values
+        for bucket, o in self.index.items():
+            if bucket > self.newest - self.slots:
+                index[bucket] = len(values)
+                values.extend(old[o:o + _WIDTH])
+        self.index, self.values = index, values
+
+    def _densify(self):
+        buckets = array("q", [-1]) * self.slots
+        values = array("d", bytes(8 * _WIDTH * self.slots))
+        old = self.values
+        for bucket, o in self.index.items():
+            if bucket > self.newest - self.slots:
+                i = bucket % self.slots
+                buckets[i] = bucket
+                values[i * _WIDTH:(i + 1) * _WIDTH] = old[o:o + _WIDTH]
+        self.index, self.buckets, self.values = None, buckets, values
+
+    def oldest(self, now):
+        """Start of the oldest bucket this ring still holds at `now`."""
+        return (int(now // self.step) - self.slots + 1) * self.step
+
+    def _held(self, first, last):
+        """(bucket, offset) of the buckets held from `first` to `last`, in order."""
+        if self.buckets is not None:
+            buckets, slots = self.buckets, self.slots
+            return [(b, (b % slots) * _WIDTH) for b in range(first, last + 1) if buckets[b % slots] == b]
+        return sorted((b, o) for b, o in self.index.items() if first <= b <= last)
+
+    def read(self, first, last, group):
+        """
+        Non-empty groups of `group` buckets from bucket `first` to `last`:
+        (start ts, asi_sum, asi_n, tokens, psi_sum, psi_n) each.
+        """
+        values = self.values
+        groups = {}
+        for b, o in self._held(first, last):
+            start = first + (b - first) // group * group
+            acc = groups.get(start)
+            if acc is None:
+                acc = groups[start] = [0.0] * _WIDTH
+            for k in range(_WIDTH):
+                acc[k] += values[o + k]
+        return [(start * self.step, *acc) for start, acc in groups.items()]
+
+
+class Series:
+    __slots__ = ("rings",)
+
+    def __init__(self, slots):
+        self.rings = tuple(Ring(step, n) for (_, step), n in zip(RESOLUTIONS, slots))
+
+    def add(self, ts, asi, tokens, psi):
+        for ring in self.rings:
+            ring.add(ts, asi, tokens, psi)
+
+
+class TimeSeriesStore:
+    def __init__(self, minute_slots=TS_MINUTE_SLOTS, hour_slots=TS_HOUR_SLOTS, day_slots=TS_DAY_SLOTS,
+                 max_series=TS_MAX_SERIES):
+        self._slots = (minute_slots, hour_slots, day_slots)
+        self.max_series = max_series
+        # ("user" | "company", id) -> Series, least recently updated first
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self._prime_lock = threading.Lock()
+        self._live_since = None
+        self.primed = False
+        self.events = 0
+        self.evicted = 0
+
+    def retention_s(self):
+        return max(step * n for (_, step), n in zip(RESOLUTIONS, self._slots))
+
+    def stats(self):
+        with self._lock:
+            kinds = [kind for kind, _ in self._series]
+        return {
+            "primed": self.primed,
+            "events": self.events,
+            "users": kinds.count("user"),
+            "companies": kinds.count("company"),
+            "evicted": self.evicted,
+        }
+
+    # --- writing (usage log writer thread) ---
+
+    def _get(self, key):
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = Series(self._slots)
+            if len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._series.move_to_end(key)
+        return series
+
+    def add(self, ts, user_id, company=None, asi=None, tokens=0, psi=None):
+        with self._lock:
+            self._add(ts, user_id, company, asi, tokens, psi)
+
+    def _add(self, ts, user_id, company, asi, tokens, psi):
+        self._get(("user", user_id)).add(ts, asi, tokens, psi)
+        if company:
+            self._get(("company", company)).add(ts, asi, tokens, psi)
+        self.events += 1
+
+    def add_events(self, rows):
+        """Usage log sink: rows in usage_log.FIELDS order."""
+        with self._lock:
+            for ts, user_id, _, status, tokens, _, _, _, asi, psi, company in rows:
+                if status == 200:
+                    self._add(ts, user_id, company, asi, tokens, psi)
+
+    def begin_live(self):
+        """Events from now on arrive through add_events; prime() loads the older ones."""
+        self._live_since = time.time()
+
+    def prime(self):
+        """
+        Load the stored usage events still inside the retention window and
+        older than begin_live(), once. Runs on the warm-up thread, or on
+        the first /history request when warm-up is off.
+        """
+        with self._prime_lock:
+            if not self.primed:
+                self._prime()
+
+    def _prime(self):
+        from datetime import datetime
+
+        from sqlalchemy import select
+
+        from database import engine
+        from models import UsageEvent
+
+        t = UsageEvent.__table__
+        until = self._live_since or time.time()
+        since = datetime.utcfromtimestamp(until - self.retention_s())
+        query = (
+            select(t.c.ts, t.c.user_id, t.c.company, t.c.asi, t.c.tokens_used, t.c.psi)
+            .where(t.c.ts >= since, t.c.ts < datetime.utcfromtimestamp(until), t.c.status == 200)
+            .order_by(t.c.id)
+        )
+        epoch = datetime(1970, 1, 1)
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=5000).execute(query)
+            for rows in result.partitions():
+                with self._lock:
+                    for ts, user_id, company, asi, tokens, psi in rows:
+                        self._add((ts - epoch).total_seconds(), user_id, company, asi, tokens or 0, psi)
+        self.primed = True
+
+    # --- reading (request threads) ---
+
+    def query(self, kind, key, start, end, points=DEFAULT_POINTS, now=None):
+        """
+        {"resolution", "step", "points": [{"ts", "asi", "tokens", "psi"}]}
+        over [start, end). Only buckets with data are returned, starting at
+        the first whole bucket; `step` is the width of one point in
+        seconds. None if the series is unknown.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            series = self._series.get((kind, key))
+            if series is None:
+                return None
+            ring, name = self._pick(series, start, end, points, now)
+            # a partly covered first bucket is left out; nothing outside
+            # the ring exists, which keeps the scan within its slots
+            first = max(_first_bucket(start, ring.step), int(ring.oldest(now) // ring.step))
+            last = min(int(math.ceil(end / ring.step)) - 1, int(now // ring.step))
+            group = max(1, math.ceil((last - first + 1) / points))
+            groups = ring.read(first, last, group)
+        return {
+            "resolution": name,
+            "step": ring.step * group,
+            "points": [
+                {
+                    "ts": int(ts),
+                    "asi": round(asi_sum / asi_n, 2) if asi_n else None,
+                    "tokens": int(tokens),
+                    "psi": round(psi_sum / psi_n, 2) if psi_n else None,
+                }
+                for ts, asi_sum, asi_n, tokens, psi_sum, psi_n in groups
+            ],
+        }
+
+    @staticmethod
+    def _pick(series, start, end, points, now):
+        """Coarsest ring giving `points` buckets over the range, else the finest covering it."""
+        covering = [
+            (ring, name) for ring, (name, _) in zip(series.rings, RESOLUTIONS)
+            if ring.oldest(now) <= _first_bucket(start, ring.step) * ring.step
+        ]
+        if not covering:
+            return series.rings[-1], RESOLUTIONS[-1][0]  # older than any ring: the longest one
+        for ring, name in reversed(covering):
+            if (end - start) / ring.step >= points:
+                return ring, name
+        return covering[0]
+
+
+store = TimeSeriesStore()
+
+router = APIRouter(tags=["history"])
+
+
+@router.get("/history")
+def history(
+    user_id: Optional[str] = Query(None, max_length=100),
+    company: Optional[str] = Query(None, max_length=100),
+    start: Optional[float] = Query(None, description="epoch seconds, default: end - 7 days"),
+    end: Optional[float] = Query(None, description="epoch seconds, default: now"),
+    points: int = Query(DEFAULT_POINTS, ge=1, le=MAX_POINTS),
+):
+    """
+    ASI, tokens and PSI of one user or one company over time, for charts.
+    At most `points` points, at the coarsest resolution that still gives
+    that many over the range.
+    """
+    if (user_id is None) == (company is None):
+        raise HTTPException(422, "Give exactly one of user_id and company")
+    store.prime()  # no-op once the warm-up has primed the store
+    end = time.time() if end is None else end
+    start = end - DEFAULT_RANGE_S if start is None else start
+    if start >= end:
+        raise HTTPException(422, "start must be before end")
+    kind, key = ("user", user_id) if user_id is not None else ("company", company)
+    result = store.query(kind, key, start, end, points)
+    if result is None:
+        result = {"resolution": None, "step": None, "points": []}
+    return {kind: key, "start": start, "end": end, **result}
+
+
+@router.get("/history/status")
+def history_status():
+    return store.stats()
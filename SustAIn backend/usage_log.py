@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# =====================================================
+# USAGE EVENT LOG
+# =====================================================
+# Request handlers call `record(...)`, which only appends a tuple to an
+# in-memory ring buffer (a deque append: no lock, no I/O). A background
+# thread drains the buffer into the append-only usage_events table, one
+# transaction per batch of up to USAGE_LOG_BATCH events, every
+# USAGE_LOG_FLUSH_INTERVAL_S or as soon as a full batch is waiting.
+#
+# Memory is bounded by USAGE_LOG_CAPACITY events. When the writer cannot
+# keep up (or the database is down) the buffer fills, and the overflow
+# policy decides what is lost:
+#   drop_oldest (default): the new event replaces the oldest buffered one
+#   drop_newest:           the new event is discarded
+# Either way the request never waits, and `dropped` counts the losses.
+# A failed batch is put back in the buffer and retried on the next cycle.
+# stop() drains whatever is buffered before returning (app shutdown).
+#
+# Sinks (add_sink) get each batch on the writer thread once it is stored,
+# for in-memory aggregates such as timeseries.store. Loading what is
+# already stored is up to the sink, off this thread: a long replay here
+# would hold up flushing and overflow the buffer.
+
+USAGE_LOG_CAPACITY = int(os.getenv("USAGE_LOG_CAPACITY", "100000"))
+USAGE_LOG_BATCH = int(os.getenv("USAGE_LOG_BATCH", "1000"))
+USAGE_LOG_FLUSH_INTERVAL_S = float(os.getenv("USAGE_LOG_FLUSH_INTERVAL_S", "0.5"))
+USAGE_LOG_OVERFLOW = os.getenv("USAGE_LOG_OVERFLOW", "drop_oldest")
+
+FIELDS = ("ts", "user_id", "endpoint", "status", "tokens_used", "model",
+          "latency_ms", "cache_hit", "asi", "psi", "company")
+
+
+class UsageLogWriter:
+    def __init__(self, capacity=USAGE_LOG_CAPACITY, batch=USAGE_LOG_BATCH,
+                 interval_s=USAGE_LOG_FLUSH_INTERVAL_S, overflow=USAGE_LOG_OVERFLOW):
+        if overflow not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        self.capacity = capacity
+        self.batch = batch
+        self.interval_s = interval_s
+        self.overflow = overflow
+        # drop_oldest is the deque's own behaviour at maxlen
+        self._buffer = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._sinks = []
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self.last_error = None
+
+    # --- hot path (request threads) ---
+
+    def record(self, user_id, endpoint, status, tokens_used=0, model=None,
+               latency_ms=None, cache_hit=False, asi=None, psi=None, company=None):
+        buffer = self._buffer
+        size = len(buffer)
+        if size >= self.capacity:
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return
+        buffer.append((time.time(), user_id, endpoint, status, tokens_used, model,
+                       latency_ms, cache_hit, asi, psi, company))
+        if size + 1 == self.batch:
+            self._wakeup.set()
+
+    # --- writer thread ---
+
+    def add_sink(self, consume):
+        """`consume(rows)` after each stored batch."""
+        self._sinks.append(consume)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="usage-log", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the writer after it has written everything buffered."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+            "last_error": self.last_error,
+        }
+
+    def _run(self):
+        shutdown_failures = 0
+        while True:
+            self._wakeup.wait(self.interval_s)
+            self._wakeup.clear()
+            stopping = self._stopping
+            # drain everything, a batch per transaction
+            while self._buffer:
+                if self._write_batch():
+                    continue
+                if not stopping:
+                    break  # database trouble: retry next cycle
+                shutdown_failures += 1
+                if shutdown_failures >= 3:
+                    return  # shutting down and the database is gone
+            if stopping and not self._buffer:
+                return
+
+    def _take_batch(self):
+        buffer, rows = self._buffer, []
+        popleft = buffer.popleft
+        for _ in range(min(self.batch, len(buffer))):
+            rows.append(popleft())
+        return rows
+
+    def _write_batch(self):
+        from sqlalchemy import insert
+
+        from database import engine
+        from models import UsageEvent
+
+        rows = self._take_batch()
+        if not rows:
+            return True
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(UsageEvent.__table__), [
+                    dict(zip(FIELDS, (datetime.utcfromtimestamp(r[0]),) + r[1:])) for r in rows
+                ])
+        except Exception as exc:  # surfaced through stats(); the rows are retried
+            self.failed_batches += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"[:200]
+            # back at the front, oldest first; whatever no longer fits is lost
+            room = self.capacity - len(self._buffer)
+            if room < len(rows):
+                self.dropped += len(rows) - room
+                rows = rows[len(rows) - room:] if room > 0 else []
+            self._buffer.extendleft(reversed(rows))
+            return False
+        self.written += len(rows)
+        for consume in self._sinks:
+            try:
+                consume(rows)
+            except Exception as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"[:200]
+        return True
+
+
+writer = UsageLogWriter()
+record = writer.record
@@ -15,9 +15,19 @@ WATER_PER_KWH_LITERS = 0.49
 # Global average enterprise electricity cost
 COST_PER_KWH_USD = 0.12  
 
-# App limits
+# App limits: the defaults; per-company / per-role overrides live in
+# the limit_policies table (see policies.py)
 MAX_TOKENS_PER_DAY = 8000
 MAX_PROMPTS_PER_DAY = 7
+MAX_GRADCAM_PER_DAY = 1
+
+# Upstream model queue, per company: share of the model calls when
+# companies compete (relative weight), and calls in flight at once
+MODEL_WEIGHT = 1.0
+MAX_CONCURRENT_MODEL_CALLS = 4
+
+# ASI weights: energy (server load), water, cost
+ASI_WEIGHTS = (0.4, 0.4, 0.2)
 
 
 # =====================================================
@@ -37,16 +47,29 @@ def reset_daily_limits_if_needed(user):
 # AI SUSTAINABILITY INDEX (ASI)
 # =====================================================
 
-def calculate_asi(tokens_used: int, prompts_used: int):
+def calculate_asi(tokens_used: int, prompts_used: int, tokens_compacted: int = 0, policy=None):
     """
     Calculates:
     - ASI score (0–100)
     - Real energy saved (kWh)
     - Real water saved (liters)
     - Real cost saved (USD)
+
+    tokens_compacted: tokens removed from prompts before the model call
+    (prompt compaction) over the same period as tokens_used, i.e. the
+    usage row's running total; they count towards the savings.
+    policy: the user's policies.Policy (limits and weights); the
+    defaults above without one.
     """
 
-    tokens_saved = max(0, MAX_TOKENS_PER_DAY - tokens_used)
+    if policy is None:
+        max_tokens, max_prompts, weights = MAX_TOKENS_PER_DAY, MAX_PROMPTS_PER_DAY, ASI_WEIGHTS
+    else:
+        max_tokens, max_prompts, weights = (
+            policy.max_tokens_per_day, policy.max_prompts_per_day, policy.asi_weights
+        )
+
+    tokens_saved = max(0, max_tokens - tokens_used) + tokens_compacted
 
     # Real resource savings
     energy_saved_kwh = tokens_saved * ENERGY_PER_TOKEN_KWH
@@ -54,14 +77,15 @@ def calculate_asi(tokens_used: int, prompts_used: int):
     cost_saved_usd = energy_saved_kwh * COST_PER_KWH_USD
 
     # Normalized usage fractions
-    token_fraction = tokens_used / MAX_TOKENS_PER_DAY
-    prompt_fraction = prompts_used / MAX_PROMPTS_PER_DAY
+    token_fraction = tokens_used / max_tokens
+    prompt_fraction = prompts_used / max_prompts
 
     # Weighted ASI score
+    w_energy, w_water, w_cost = weights
     asi_score = (
-        0.4 * (1 - token_fraction) +   # server load / energy
-        0.4 * (1 - token_fraction) +   # water
-        0.2 * (1 - prompt_fraction)    # cost
+        w_energy * (1 - token_fraction) +   # server load / energy
+        w_water * (1 - token_fraction) +    # water
+        w_cost * (1 - prompt_fraction)      # cost
     ) * 100
 
     return {
@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+
+# =====================================================
+# WARM-UP SCHEDULER
+# =====================================================
+# Runs the expensive first-use work (provider client, Grad-CAM weights,
+# first forward/backward passes) on a background thread at lifespan start,
+# so the first real request does not pay for it. /ready only turns 200
+# once every task has finished.
+
+WARMUP_ENABLED = os.getenv("SUSTAIN_WARMUP", "1") != "0"
+
+
+class WarmupScheduler:
+    def __init__(self, enabled=WARMUP_ENABLED):
+        self.enabled = enabled
+        self._tasks = []
+        self._status = {}
+        self._thread = None
+        self._done = threading.Event()
+
+    def add(self, name, fn):
+        """Register a task; tasks run in the order they were added."""
+        self._tasks.append((name, fn))
+        self._status[name] = {"state": "pending", "duration_s": None, "error": None}
+
+    def start(self):
+        self._done.clear()
+        for status in self._status.values():
+            status.update(state="pending", duration_s=None, error=None)
+
+        if not self.enabled:
+            # lazy mode: every task is paid by the first request that needs it
+            for status in self._status.values():
+                status["state"] = "skipped"
+            self._done.set()
+            return
+
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for name, fn in self._tasks:
+            status = self._status[name]
+            status["state"] = "running"
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except Exception as exc:  # surfaced through /ready
+                status["state"] = "failed"
+                status["error"] = f"{type(exc).__name__}: {exc}"
+            else:
+                status["state"] = "done"
+            status["duration_s"] = round(time.perf_counter() - t0, 4)
+        self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and not any(
+            s["state"] == "failed" for s in self._status.values()
+        )
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "tasks": {name: dict(s) for name, s in self._status.items()},
+        }
@@ -0,0 +1,317 @@
+"""
+Non-blocking client for the sustAIn backend, for use from the Qt GUI thread.
+
+Requests run on a QThreadPool over a small pool of keep-alive HTTP
+connections; JSON decoding happens on the worker too. Results come back
+as Qt signals, which are delivered on the GUI thread. Requests can be
+tagged (e.g. with the screen that issued them) and cancelled as a group
+when the user navigates away.
+
+Streaming endpoints answer with newline-delimited JSON: one object per
+line, the last one carrying "done": true. Each earlier line is emitted as
+a `chunk` as soon as it arrives; the final object is the `finished` value.
+
+Requests made with `idempotent=True` carry an Idempotency-Key, the same
+on every attempt, and are sent again after a timeout: the backend runs
+them once and answers the retries with the first attempt's response.
+A request that finds its pooled connection closed is sent again only if
+that is safe: an idempotent method (GET, PUT, DELETE, ...) or a request
+with an Idempotency-Key. Any other POST may already have been applied.
+"""
+
+import gzip
+import http.client
+import json
+import os
+import queue
+import threading
+import uuid
+from urllib.parse import urlsplit
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+API_URL = os.getenv("SUSTAIN_API_URL", "")
+API_TIMEOUT_S = float(os.getenv("SUSTAIN_API_TIMEOUT_S", "30"))
+API_TIMEOUT_RETRIES = int(os.getenv("SUSTAIN_API_TIMEOUT_RETRIES", "2"))
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(f"{status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+# ============================================================
+#  CONNECTION POOL
+# ============================================================
+
+class _ConnectionPool:
+    """Keep-alive connections shared by the worker threads (LIFO, bounded)."""
+
+    def __init__(self, base_url, size, timeout):
+        parts = urlsplit(base_url)
+        self._conn_cls = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self._host = parts.hostname
+        self._port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self._timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self.opened = 0
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            self.opened += 1
+            return self._conn_cls(self._host, self._port, timeout=self._timeout)
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# ============================================================
+#  REQUESTS
+# ============================================================
+
+class ApiRequest(QObject):
+    """Handle for one in-flight request. Exactly one signal fires unless cancelled."""
+
+    chunk = pyqtSignal(object)      # streaming only: one decoded line
+    finished = pyqtSignal(object)   # decoded JSON body (streaming: the "done" line)
+    failed = pyqtSignal(object)     # ApiError or OSError
+    done = pyqtSignal()             # always last, also after cancellation
+
+    def __init__(self, method, path, body, headers, tag, streaming=False):
+        super().__init__()
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers
+        self.tag = tag
+        self.streaming = streaming
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Drop the result; aborts the socket if the request is already running."""
+        with self._lock:
+            self.cancelled = True
+            conn = self._conn
+        if conn is not None and conn.sock is not None:
+            try:
+                conn.sock.shutdown(2)  # unblocks the worker's read
+            except OSError:
+                pass
+
+
+class _RequestTask(QRunnable):
+    def __init__(self, client, request):
+        super().__init__()
+        self.client = client
+        self.request = request
+
+    def run(self):
+        req = self.request
+        if req.cancelled:
+            req.done.emit()
+            return
+        pool = self.client._pool
+        try:
+            result = self._send(pool)
+        except (OSError, http.client.HTTPException, ApiError, ValueError) as exc:
+            if not req.cancelled:
+                req.failed.emit(exc)
+        else:
+            if not req.cancelled:
+                req.finished.emit(result)
+        finally:
+            req.done.emit()
+
+    def _send(self, pool):
+        req = self.request
+        keyed = "Idempotency-Key" in req.headers
+        stale_retry = keyed or req.method in IDEMPOTENT_METHODS
+        timeout_retries = API_TIMEOUT_RETRIES if keyed else 0
+        while True:
+            conn = pool.acquire()
+            with req._lock:
+                if req.cancelled:
+                    pool.release(conn)
+                    return None
+                req._conn = conn
+            try:
+                try:
+                    conn.request(req.method, pool.prefix + req.path, body=req.body, headers=req.headers)
+                    resp = conn.getresponse()
+                except (ConnectionError, http.client.RemoteDisconnected, http.client.BadStatusLine):
+                    conn.close()
+                    # a pooled keep-alive socket the server already closed: retry once
+                    # fresh, unless the server may have applied the request already
+                    if not stale_retry or req.cancelled:
+                        raise
+                    stale_retry = False
+                    continue
+                except TimeoutError:
+                    conn.close()
+                    # safe to resend with the same key: the backend does not run it twice
+                    if not timeout_retries or req.cancelled:
+                        raise
+                    timeout_retries -= 1
+                    continue
+                if req.streaming and resp.status < 400:
+                    data = self._read_stream(resp)
+                else:
+                    payload = resp.read()
+                    if resp.getheader("Content-Encoding") == "gzip":
+                        payload = gzip.decompress(payload)
+            except Exception:
+                conn.close()
+                raise
+            finally:
+                with req._lock:
+                    req._conn = None
+
+            if resp.will_close:
+                conn.close()
+            else:
+                pool.release(conn)
+
+            if req.streaming and resp.status < 400:
+                if isinstance(data, dict) and "error" in data:
+                    raise ApiError(data.get("status", 500), data["error"])
+                return data
+            data = json.loads(payload) if payload else None
+            if resp.status >= 400:
+                detail = data.get("detail") if isinstance(data, dict) else payload.decode(errors="replace")
+                raise ApiError(resp.status, detail)
+            return data
+
+    def _read_stream(self, resp):
+        req = self.request
+        trailer = None
+        for line in resp:
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            if obj.get("done"):
+                trailer = obj
+            elif not req.cancelled:
+                req.chunk.emit(obj)
+        if trailer is None:
+            raise ApiError(502, "stream ended without a final message")
+        return trailer
+
+
+def encode_multipart(fields, files):
+    """fields: {name: str}, files: {name: (filename, bytes, content_type)}."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, data, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# ============================================================
+#  CLIENT
+# ============================================================
+
+class ApiClient(QObject):
+    def __init__(self, base_url=API_URL, max_workers=4, timeout=API_TIMEOUT_S, parent=None):
+        super().__init__(parent)
+        self.base_url = base_url
+        self._pool = _ConnectionPool(base_url, max_workers, timeout)
+        self._threads = QThreadPool(self)
+        self._threads.setMaxThreadCount(max_workers)
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+
+    @property
+    def connections_opened(self):
+        return self._pool.opened
+
+    def request(self, method, path, json_body=None, body=None, headers=None, tag=None,
+                on_finished=None, on_failed=None, on_chunk=None, idempotent=False):
+        """
+        Queue a request and return its ApiRequest. Callbacks are connected
+        before the request starts, so a fast reply cannot be missed; they
+        run on the GUI thread. Passing `on_chunk` reads the response as a
+        newline-delimited JSON stream. `idempotent=True` for endpoints that
+        honour Idempotency-Key (/chat, /gradcam): retried after a timeout.
+        """
+        streaming = on_chunk is not None
+        headers = dict(headers or {})
+        if idempotent:
+            headers.setdefault("Idempotency-Key", uuid.uuid4().hex)
+        headers.setdefault("Accept", "application/x-ndjson" if streaming else "application/json")
+        if not streaming:
+            # the backend compresses large bodies (news pages, lists) when allowed to
+            headers.setdefault("Accept-Encoding", "gzip")
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        req = ApiRequest(method, path, body, headers, tag, streaming)
+        # a reply already queued when cancel() ran must not reach the caller
+        if streaming:
+            req.chunk.connect(lambda data: req.cancelled or on_chunk(data))
+        if on_finished is not None:
+            req.finished.connect(lambda data: req.cancelled or on_finished(data))
+        if on_failed is not None:
+            req.failed.connect(lambda exc: req.cancelled or on_failed(exc))
+        # the client holds the request until its last signal has been delivered
+        req.done.connect(lambda: self._forget(req))
+        with self._inflight_lock:
+            self._inflight.add(req)
+        self._threads.start(_RequestTask(self, req))
+        return req
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post_json(self, path, payload, **kwargs):
+        return self.request("POST", path, json_body=payload, **kwargs)
+
+    def post_multipart(self, path, fields=None, files=None, **kwargs):
+        body, content_type = encode_multipart(fields or {}, files or {})
+        return self.request("POST", path, body=body, headers={"Content-Type": content_type}, **kwargs)
+
+    def cancel_tag(self, tag):
+        """Cancel every pending or running request issued with `tag`."""
+        with self._inflight_lock:
+            victims = [r for r in self._inflight if r.tag == tag]
+        for req in victims:
+            req.cancel()
+
+    def _forget(self, req):
+        with self._inflight_lock:
+            self._inflight.discard(req)
+
+    def shutdown(self, wait_ms=2000):
+        with self._inflight_lock:
+            pending = list(self._inflight)
+        for req in pending:
+            req.cancel()
+        self._threads.waitForDone(wait_ms)
+        self._pool.close()
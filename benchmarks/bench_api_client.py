@@ -0,0 +1,144 @@
+"""
+GUI-thread responsiveness while the desktop client talks to the backend.
+
+    python benchmarks/bench_api_client.py --requests 200 --latency-ms 50
+
+Starts a local HTTP/1.1 keep-alive stub of /chat and /gradcam with an
+artificial latency, then fires requests through ApiClient from the Qt
+event loop while a 1 ms timer records the gaps between its ticks. A gap
+is time the GUI thread could not process input or paint.
+
+Reports:
+
+- max_stall_ms / p99_stall_ms:  longest event-loop gaps during the run
+- connections_opened:           sockets created for all requests (reuse)
+- cancelled:                    requests dropped by cancel_tag, and whether
+                                any of their callbacks still ran
+
+Exits non-zero if the longest stall exceeds --max-stall-ms (one 60 Hz
+frame by default), so it can gate changes to the network path.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import common
+
+from api_client import ApiClient
+
+
+def make_server(latency_s, port=0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes; without this, Nagle
+        # plus delayed ACK adds ~40 ms to every keep-alive response
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(latency_s)
+            if self.path.startswith("/gradcam/"):
+                payload = {"PSI": 72.5, "uses_left": 0}
+            else:
+                payload = {
+                    "reply": "x" * 400, "tokens_used": 100, "prompts_left": 6,
+                    "tokens_left": 7900, "ASI": 87.5,
+                }
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except BrokenPipeError:  # the client cancelled and shut the socket
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_until(app, predicate, timeout_s):
+    deadline = time.perf_counter() + timeout_s
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise RuntimeError("timed out waiting for replies")
+        app.processEvents()
+        time.sleep(0.0005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--image-kb", type=int, default=512, help="size of each /gradcam upload")
+    parser.add_argument("--max-stall-ms", type=float, default=16.0)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/api_client-<commit>.json)")
+    args = parser.parse_args()
+
+    app = common.qt_app()
+    server = make_server(args.latency_ms / 1000)
+    client = ApiClient(f"http://127.0.0.1:{server.server_address[1]}", max_workers=args.workers)
+    image = b"\x89PNG" + bytes(args.image_kb * 1024)
+
+    replies = []
+    errors = []
+    meter = common.StallMeter()
+    meter.start()
+    t0 = time.perf_counter()
+    for i in range(args.requests):
+        if i % 2:
+            client.post_json("/chat", {"user_id": "bench", "message": "hi"},
+                             on_finished=replies.append, on_failed=errors.append)
+        else:
+            client.post_multipart("/gradcam/bench", files={"image": ("a.png", image, "image/png")},
+                                  on_finished=replies.append, on_failed=errors.append)
+    run_until(app, lambda: len(replies) + len(errors) >= args.requests, 60)
+    elapsed = time.perf_counter() - t0
+    meter.stop()
+    gaps = meter.gaps[1:]  # the first tick includes timer start-up
+
+    # cancellation: queue a screen's worth of requests, then leave the screen
+    late = []
+    for _ in range(args.workers * 4):
+        client.post_json("/chat", {"user_id": "bench", "message": "hi"},
+                         tag="ai_usage", on_finished=late.append, on_failed=late.append)
+    client.cancel_tag("ai_usage")
+    run_until(app, lambda: not client._inflight, 10)
+
+    results = {
+        "requests": args.requests,
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(args.requests / elapsed, 1),
+        "max_stall_ms": round(max(gaps), 3),
+        "p99_stall_ms": round(common.percentile(gaps, 99), 3),
+        "connections_opened": client.connections_opened,
+        "cancelled": args.workers * 4,
+        "callbacks_after_cancel": len(late),
+    }
+    client.shutdown()
+    server.shutdown()
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("api_client", config, results, args.out)
+
+    if errors or late:
+        sys.exit("requests failed or cancelled callbacks ran")
+    if results["max_stall_ms"] > args.max_stall_ms:
+        sys.exit(f"GUI thread stalled {results['max_stall_ms']} ms (limit {args.max_stall_ms} ms)")
+
+
+if __name__ == "__main__":
+    main()
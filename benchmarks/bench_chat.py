@@ -0,0 +1,144 @@
+"""
+Chat screen cost with a long conversation and a fast token stream.
+
+    python benchmarks/bench_chat.py --messages 10000 --chunks 2000 --rate 2000
+
+Builds an AppFrame offscreen with N messages of history and measures:
+
+- open_chat_ms:      navigating to the chat (first history page rendered)
+- load_page_ms:      scrolling to the top loads one older page
+- stream:            a worker thread emits --chunks deltas at --rate per
+                     second (queued signals, like ApiClient); reports the
+                     longest GUI-thread stall and how many times the
+                     document was written
+- stream_naive:      the same stream re-setting the whole transcript text
+                     per chunk, for comparison
+- rss_mb:            process RSS after all of the above
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import common
+from common import settle
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtWidgets import QTextEdit
+
+import main as desktop
+
+
+class ChunkSource(QObject):
+    delta = pyqtSignal(object)
+
+    def run(self, chunks, rate):
+        interval = 1.0 / rate
+        t_next = time.perf_counter()
+        for i in range(chunks):
+            self.delta.emit({"delta": f"tok{i % 10} "})
+            t_next += interval
+            delay = t_next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def stream(app, on_delta, chunks, rate):
+    source = ChunkSource()
+    received = []
+
+    def deliver(data):
+        received.append(1)
+        on_delta(data["delta"])
+
+    source.delta.connect(deliver)
+    meter = common.StallMeter()
+    meter.start()
+    worker = threading.Thread(target=source.run, args=(chunks, rate))
+    worker.start()
+    while worker.is_alive() or len(received) < chunks:
+        app.processEvents()
+        time.sleep(0.0002)
+    meter.stop()
+    gaps = meter.gaps[1:]
+    return {
+        "max_stall_ms": round(max(gaps), 3),
+        "p99_stall_ms": round(common.percentile(gaps, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--rate", type=int, default=2000, help="chunks per second")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/chat-<commit>.json)")
+    args = parser.parse_args()
+
+    app = common.qt_app()
+    state = desktop.AppState(current_username="bench")
+    text = "How many prompts per day feels right for a team of five?"
+    state.chat_messages = [
+        {"role": "user" if i % 2 == 0 else "model", "text": f"{i}: {text}"}
+        for i in range(args.messages)
+    ]
+    frame = desktop.AppFrame(state, on_switch_role=lambda: None, on_logout=lambda: None)
+    frame.resize(1200, 750)
+    frame.show()
+    settle(app)
+    screen = frame.chat_screen
+
+    t0 = time.perf_counter()
+    frame.set_current_page("chat")
+    settle(app)
+    results = {"open_chat_ms": round((time.perf_counter() - t0) * 1000, 3)}
+
+    samples = []
+    bar = screen.transcript.verticalScrollBar()
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        bar.setValue(0)
+        settle(app)
+        samples.append(time.perf_counter() - t0)
+    results["load_page_ms"] = {
+        "median": round(statistics.median(samples) * 1000, 3),
+        "max": round(max(samples) * 1000, 3),
+    }
+    results["blocks_in_document"] = screen.document.blockCount()
+
+    writes = []
+    flush = screen._flush_pending
+    screen._flush_pending = lambda: (writes.append(1), flush())
+    screen._flush_timer.timeout.disconnect()
+    screen._flush_timer.timeout.connect(screen._flush_pending)
+    screen.begin_reply()
+    results["stream"] = stream(app, screen.append_delta, args.chunks, args.rate)
+    screen.end_reply()
+    results["stream"]["document_writes"] = len(writes)
+
+    # baseline: one QTextEdit holding the same page, whole text re-set per chunk
+    naive = QTextEdit()
+    naive.setReadOnly(True)
+    naive.resize(900, 600)
+    naive.show()
+    history = "\n".join(
+        f"{m['role']}: {m['text']}" for m in state.chat_messages[-desktop.ChatScreen.PAGE_SIZE:]
+    )
+    reply = []
+
+    def naive_delta(delta):
+        reply.append(delta)
+        naive.setPlainText(history + "\nsustAIn: " + "".join(reply))
+
+    results["stream_naive"] = stream(app, naive_delta, args.chunks, args.rate)
+    results["stream_naive"]["document_writes"] = args.chunks
+    results["rss_mb"] = round(common.rss_bytes() / 2 ** 20, 1)
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("chat", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Picking and uploading a large photo for the sustainability index.
+
+    python benchmarks/bench_image_upload.py --width 5472 --height 3648
+
+Writes a synthetic photo (default 20 MP JPEG) and measures:
+
+- upload_bytes:   multipart body for the raw file (what the client used to
+                  send), for the prepared MODEL_INPUT_SIZE upload, and for a
+                  hash-only request once the backend has scored the image
+- gui_stall_ms:   longest gap of a 1 ms GUI-thread timer while the image
+                  is prepared by ImageLoader, compared with decoding a
+                  preview on the GUI thread
+- prepare_ms:     wall time until the thumbnail and upload are ready, cold
+                  and for a cached (unchanged) file
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import common
+
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+
+from api_client import encode_multipart
+from image_loader import ImageLoader, MODEL_INPUT_SIZE
+
+
+def write_photo(path, width, height, quality):
+    # smooth gradients plus sensor-like noise, so JPEG sizes resemble photos
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    rgb = np.empty((height, width, 3), dtype=np.uint8)
+    noise = np.random.default_rng(0).integers(-10, 11, size=(height, width), dtype=np.int16)
+    rgb[..., 0] = np.clip((x * 0.7 + y * 0.3) + noise, 0, 255)
+    rgb[..., 1] = np.clip((255 - x) * 0.5 + y * 0.4 + noise, 0, 255)
+    rgb[..., 2] = np.clip(y * 0.8 + noise, 0, 255)
+    image = QImage(rgb.data, width, height, width * 3, QImage.Format_RGB888)
+    if not image.save(path, "JPEG", quality):
+        raise OSError(f"could not write {path}")
+
+
+def wait_loaded(app, loader, path):
+    box = []
+    meter = common.StallMeter()
+    meter.start()
+    t0 = time.perf_counter()
+    loader.load(path, box.append, box.append)
+    while not box:
+        app.processEvents()
+        time.sleep(0.0005)
+    elapsed = time.perf_counter() - t0
+    meter.stop()
+    if isinstance(box[0], Exception):
+        raise box[0]
+    return box[0], elapsed, meter.gaps[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=5472)
+    parser.add_argument("--height", type=int, default=3648)
+    parser.add_argument("--quality", type=int, default=92, help="JPEG quality of the synthetic photo")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/image_upload-<commit>.json)")
+    args = parser.parse_args()
+
+    app = common.qt_app()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "photo.jpg")
+        write_photo(path, args.width, args.height, args.quality)
+
+        # before: the raw file was read on the GUI thread and uploaded as is
+        t0 = time.perf_counter()
+        with open(path, "rb") as fh:
+            raw = fh.read()
+        read_ms = (time.perf_counter() - t0) * 1000
+
+        # a preview decoded on the GUI thread blocks for the whole decode
+        t0 = time.perf_counter()
+        QImage(path).scaled(160, 160, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        gui_decode_ms = (time.perf_counter() - t0) * 1000
+
+        loader = ImageLoader()
+        prepared, cold_s, gaps = wait_loaded(app, loader, path)
+        _, cached_s, _ = wait_loaded(app, loader, path)
+
+    body = lambda files: len(encode_multipart({"image_sha256": prepared.sha256}, files)[0])
+    results = {
+        "source_mb": round(len(raw) / 2 ** 20, 2),
+        "upload_bytes": {
+            "raw_file": body({"image": ("photo.jpg", raw, "image/jpeg")}),
+            "prepared": body({"image": ("photo.jpg", prepared.upload, "image/jpeg")}),
+            "hash_only": body({}),
+        },
+        "prepared_size": f"{MODEL_INPUT_SIZE}x{MODEL_INPUT_SIZE}",
+        "gui_stall_ms": {
+            "raw_read_on_gui_thread": round(read_ms, 3),
+            "preview_decode_on_gui_thread": round(gui_decode_ms, 3),
+            "image_loader_max_gap": round(max(gaps), 3),
+        },
+        "prepare_ms": {
+            "cold": round(cold_s * 1000, 3),
+            "cached": round(cached_s * 1000, 3),
+        },
+    }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("image_upload", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Forum and news list cost at 100k items: memory, population and scrolling.
+
+    python benchmarks/bench_lists.py --items 100000 --frames 300
+
+Fills AppState with N forum threads and N news items, opens each screen
+offscreen and reports
+
+- rss_*:            process RSS after data creation and after the views
+                    have been populated (the difference is the UI cost)
+- populate:         list assignment until the first rows are on screen,
+                    and the longest event-loop stall while the view lays
+                    out the remaining rows in the background
+- scroll frame:     per-frame time scrolling by ~one row, repainting the
+                    viewport synchronously each step
+- post_thread:      same two numbers for posting into the 100k-row forum
+"""
+
+import argparse
+import statistics
+import time
+
+import common
+from common import settle
+
+import main as desktop
+
+
+def responsiveness(app, fn, drain_s=0.5):
+    """Time until fn's change is on screen, then the worst stall after it."""
+    t0 = time.perf_counter()
+    fn()
+    app.processEvents()
+    first = time.perf_counter() - t0
+    stalls = [0.0]
+    end = time.perf_counter() + drain_s
+    while time.perf_counter() < end:
+        t1 = time.perf_counter()
+        app.processEvents()
+        stalls.append(time.perf_counter() - t1)
+    return {"first_paint_ms": round(first * 1000, 3), "max_stall_ms": round(max(stalls) * 1000, 3)}
+
+
+def scroll_frames(app, view, frames, step_px):
+    bar = view.verticalScrollBar()
+    samples = []
+    for i in range(frames):
+        t0 = time.perf_counter()
+        bar.setValue((bar.value() + step_px) % max(1, bar.maximum()))
+        view.viewport().repaint()
+        app.processEvents()
+        samples.append(time.perf_counter() - t0)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "frames": frames,
+        "median_ms": ms(statistics.median(samples)),
+        "p95_ms": ms(common.percentile(samples, 95)),
+        "max_ms": ms(max(samples)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/lists-<commit>.json)")
+    args = parser.parse_args()
+
+    app = common.qt_app()
+    state = desktop.AppState(current_username="bench")
+    frame = desktop.AppFrame(state, on_switch_role=lambda: None, on_logout=lambda: None)
+    frame.resize(1200, 750)
+    frame.show()
+    settle(app)
+    rss_empty = common.rss_bytes()
+
+    threads = [
+        {"title": f"Thread {i}", "author": f"user{i % 97}",
+         "body": "We tested 8 prompts a day and saw better creativity. " * 3}
+        for i in range(args.items)
+    ]
+    news = [
+        {"title": f"Headline {i}", "source": "EcoTech Journal",
+         "summary": "Closed-loop cooling systems cut water consumption for AI workloads."}
+        for i in range(args.items)
+    ]
+    settle(app)
+    rss_data = common.rss_bytes()
+
+    results = {}
+    for page, field, items, screen_view in (
+        ("forum", "forum_threads", threads, lambda: frame.forum_screen.thread_view),
+        ("news", "news_items", news, lambda: frame.news_screen.news_view),
+    ):
+        frame.set_current_page(page)
+        settle(app)
+        populate = responsiveness(app, lambda: setattr(state, field, items), drain_s=1.0)
+        view = screen_view()
+        row_h = view.sizeHintForRow(0) or 60
+        results[page] = {
+            "populate": populate,
+            "scroll_frame": scroll_frames(app, view, args.frames, row_h),
+        }
+
+    frame.set_current_page("forum")
+    settle(app)
+    posts = [responsiveness(app, lambda: frame.add_forum_thread(f"Posted {i}", "body"))
+             for i in range(10)]
+    results["forum"]["post_thread"] = {
+        key: round(statistics.median(p[key] for p in posts), 3) for key in posts[0]
+    }
+
+    mb = lambda v: round(v / 2 ** 20, 1)
+    results["rss_empty_mb"] = mb(rss_empty)
+    results["rss_with_data_mb"] = mb(rss_data)
+    results["rss_with_views_mb"] = mb(common.rss_bytes())
+    results["ui_overhead_mb"] = round(results["rss_with_views_mb"] - results["rss_with_data_mb"], 1)
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("lists", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Startup, first view and offline sync with a large local store.
+
+    python benchmarks/bench_local_store.py --threads 100000 --budget-ms 250
+
+Fills a throwaway store (SUSTAIN_DATA_DIR) with N forum threads, chat
+messages and a tail of uncompacted field changes, then measures:
+
+- startup_ms:         MainWindow construction incl. opening the store and
+                      restoring fields (collections are not read yet)
+- first_forum_ms:     opening the forum page, which loads the threads
+- post_thread_ms:     one forum post, saved and queued for sync
+- compact_ms:         folding COMPACT_AFTER_EVENTS field changes
+- outbox:             posts queued while the backend is down, then the time
+                      to deliver all of them once it is up
+
+Exits non-zero if startup exceeds --budget-ms.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+import common
+from common import settle
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def populate(store, threads, messages, field_changes):
+    for i in range(threads):
+        store.append("forum_threads", {"title": f"Thread {i}", "author": "bench",
+                                       "body": "How many prompts per day feels right?"})
+        if i % 5000 == 0:
+            store.flush()
+    for i in range(messages):
+        store.append("chat_messages", {"role": "user" if i % 2 == 0 else "model", "text": f"message {i}"})
+    store.flush()
+    for i in range(field_changes):
+        store.record_field("prompts_used_today", i % 8)
+    store.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--queued-posts", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/local_store-<commit>.json)")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["SUSTAIN_DATA_DIR"] = tmpdir.name
+    port = free_port()
+    os.environ["SUSTAIN_API_URL"] = f"http://127.0.0.1:{port}"
+
+    app = common.qt_app()
+    # after SUSTAIN_API_URL is set: api_client reads it at import
+    import local_store
+    import main as desktop
+    from bench_api_client import make_server, run_until
+
+    store = local_store.LocalStore(local_store.default_path())
+    populate(store, args.threads, args.messages, local_store.COMPACT_AFTER_EVENTS - 1)
+    store._db.close()
+    results = {"db_mb": round(os.path.getsize(local_store.default_path()) / 2 ** 20, 1)}
+
+    t0 = time.perf_counter()
+    window = desktop.MainWindow()
+    results["startup_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    window.show()
+    window.handle_role_select("consumer")
+    settle(app)
+    frame = window.app_frame
+
+    t0 = time.perf_counter()
+    frame.set_current_page("forum")
+    settle(app)
+    results["first_forum_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    results["forum_rows"] = frame.forum_screen.thread_model.rowCount()
+
+    # backend down: posts stay queued
+    samples = []
+    for i in range(args.queued_posts):
+        t0 = time.perf_counter()
+        frame.add_forum_thread(f"Offline {i}", "queued while the backend is down")
+        settle(app)
+        samples.append(time.perf_counter() - t0)
+    results["post_thread_ms"] = {
+        "median": round(statistics.median(samples) * 1000, 3),
+        "max": round(max(samples) * 1000, 3),
+    }
+    run_until(app, lambda: frame.outbox._retry.isActive(), 10)
+    queued = window.store.outbox_size()
+
+    # backend up again: drain the outbox
+    server = make_server(0.002, port=port)
+    t0 = time.perf_counter()
+    frame.outbox._retry.stop()
+    frame.outbox.kick()
+    run_until(app, lambda: window.store.outbox_size() == 0, 60)
+    results["outbox"] = {
+        "queued_offline": queued,
+        "delivered": frame.outbox.delivered,
+        "drain_ms": round((time.perf_counter() - t0) * 1000, 3),
+        "connections_opened": window.api.connections_opened,
+    }
+    server.shutdown()
+
+    threshold = local_store.COMPACT_AFTER_EVENTS
+    local_store.COMPACT_AFTER_EVENTS = float("inf")  # time compact() on its own below
+    for i in range(threshold):
+        window.store.record_field("prompts_used_today", i % 8)
+    window.store.flush()
+    local_store.COMPACT_AFTER_EVENTS = threshold
+    t0 = time.perf_counter()
+    window.store.compact()
+    results["compact_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+
+    window.close()
+    tmpdir.cleanup()
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("local_store", config, results, args.out)
+    if results["startup_ms"] > args.budget_ms:
+        sys.exit(f"startup took {results['startup_ms']} ms (budget {args.budget_ms} ms)")
+
+
+if __name__ == "__main__":
+    main()
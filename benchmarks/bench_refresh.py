@@ -0,0 +1,89 @@
+"""
+Desktop UI refresh cost with a large forum, full refresh vs dirty tracking.
+
+    python benchmarks/bench_refresh.py --threads 10000
+
+Builds an AppFrame offscreen with N forum threads and times:
+
+- refresh_all:          every screen rebuilt (what every action used to do)
+- simulate_use:         "Simulate use" on the dashboard, dirty tracking
+- post_thread_hidden:   forum post while another page is visible
+- show_forum:           navigating to the forum after it went dirty
+
+Each timing includes processing the event loop (deferred refreshes and
+deleteLater) so the numbers are what the user waits for.
+"""
+
+import argparse
+import statistics
+import time
+
+import common
+from common import settle
+
+import main as desktop
+
+
+def timed(app, fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        settle(app)
+        samples.append(time.perf_counter() - t0)
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/refresh-<commit>.json)")
+    args = parser.parse_args()
+
+    app = common.qt_app()
+    state = desktop.AppState(current_username="bench", max_prompts_per_day=10 ** 9)
+    state.forum_threads = [
+        {"title": f"Thread {i}", "author": "bench", "body": "How many prompts per day feels right?"}
+        for i in range(args.threads)
+    ]
+    frame = desktop.AppFrame(state, on_switch_role=lambda: None, on_logout=lambda: None)
+    frame.resize(1200, 750)
+    frame.show()
+    settle(app)
+
+    counter = iter(range(10 ** 9))
+
+    def post():
+        frame.add_forum_thread(f"Posted {next(counter)}", "body")
+
+    def show_forum():
+        frame.set_current_page("dashboard")
+        post()
+        settle(app)
+        t0 = time.perf_counter()
+        frame.set_current_page("forum")
+        settle(app)
+        return time.perf_counter() - t0
+
+    frame.set_current_page("dashboard")
+    results = {
+        "refresh_all": timed(app, frame.refresh_all, args.repeat),
+        "simulate_use": timed(app, frame.simulate_prompt_use, args.repeat),
+        "post_thread_hidden": timed(app, post, args.repeat),
+    }
+    samples = [show_forum() for _ in range(args.repeat)]
+    results["show_forum"] = {
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    common.write_results("refresh", config, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Shared helpers for the desktop client benchmarks (offscreen Qt).
+
+Results are written as JSON to benchmarks/results/<name>-<commit>.json so
+two commits can be compared side by side.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def qt_app():
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+def settle(app):
+    """Run pending events, including deferred refreshes and deleteLater."""
+    app.processEvents()
+    app.sendPostedEvents(None, 0)
+    app.processEvents()
+
+
+class StallMeter:
+    """Records the gaps between ticks of a 1 ms timer on the GUI thread."""
+
+    def __init__(self):
+        from PyQt5.QtCore import QElapsedTimer, QTimer
+
+        self.gaps = []
+        self._clock = QElapsedTimer()
+        self._timer = QTimer()
+        self._timer.setInterval(1)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        self.gaps.clear()
+        self._clock.start()
+        self._last = 0
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        now = self._clock.nsecsElapsed()
+        self.gaps.append((now - self._last) / 1e6)
+        self._last = now
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct / 100.0)))]
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss
+        except ImportError:
+            return 0
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(name, config, results, out=None):
+    payload = {
+        "benchmark": name,
+        "git_commit": git_commit(),
+        "config": config,
+        "results": results,
+    }
+    if out is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        out = RESULTS_DIR / f"{name}-{payload['git_commit']}.json"
+    Path(out).write_text(json.dumps(payload, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"\nwrote {out}")
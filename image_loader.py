@@ -0,0 +1,146 @@
+"""
+Background image preparation for the index screen.
+
+Picking a photo must not block the GUI thread, and a 20 MP photo should
+not travel to the backend only to be shrunk to the model's input there.
+ImageLoader decodes on a QThreadPool with QImageReader.setScaledSize (the
+JPEG reader then decodes at reduced resolution instead of full size),
+derives a preview thumbnail and a re-encoded upload at the model's input
+size, and hashes the upload so the backend can recognise an image it has
+already scored. Results are cached per file (path, mtime, size).
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QRunnable, QSize, Qt, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+MODEL_INPUT_SIZE = 224      # gradcam_model.INPUT_SIZE on the backend
+THUMBNAIL_SIZE = 160
+UPLOAD_FORMAT = "JPEG"
+UPLOAD_QUALITY = 90
+CACHE_SIZE = 32
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    path: str
+    thumbnail: QImage
+    upload: bytes           # MODEL_INPUT_SIZE square, re-encoded
+    sha256: str             # of `upload`, as the backend computes it
+    source_bytes: int
+
+
+def _scaled_to_cover(size, side):
+    """Aspect-preserving size whose shorter edge is `side` (never upscales)."""
+    short = min(size.width(), size.height())
+    if short <= side:
+        return size
+    return QSize(max(1, round(size.width() * side / short)), max(1, round(size.height() * side / short)))
+
+
+def prepare_image(path):
+    """Decode, thumbnail and re-encode one file. Safe to call off the GUI thread."""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)  # honour EXIF rotation
+    size = reader.size()
+    if size.isValid():
+        reader.setScaledSize(_scaled_to_cover(size, MODEL_INPUT_SIZE))
+    image = reader.read()
+    if image.isNull():
+        raise OSError(f"cannot read {os.path.basename(path)}: {reader.errorString()}")
+
+    thumbnail = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    # the model squashes to a square as well, so match it instead of cropping
+    model_input = image.scaled(
+        MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+    ).convertToFormat(QImage.Format_RGB888)
+
+    data = QByteArray()
+    buf = QBuffer(data)
+    buf.open(QIODevice.WriteOnly)
+    model_input.save(buf, UPLOAD_FORMAT, UPLOAD_QUALITY)
+    buf.close()
+    upload = bytes(data)
+
+    return PreparedImage(
+        path=path,
+        thumbnail=thumbnail,
+        upload=upload,
+        sha256=hashlib.sha256(upload).hexdigest(),
+        source_bytes=os.path.getsize(path),
+    )
+
+
+class _LoadSignals(QObject):
+    loaded = pyqtSignal(object)   # PreparedImage
+    failed = pyqtSignal(object)   # OSError
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, path, signals):
+        super().__init__()
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = prepare_image(self.path)
+        except OSError as exc:
+            self.signals.failed.emit(exc)
+        else:
+            self.signals.loaded.emit(result)
+
+
+class ImageLoader(QObject):
+    def __init__(self, max_workers=2, cache_size=CACHE_SIZE, parent=None):
+        super().__init__(parent)
+        self._threads = QThreadPool(self)
+        self._threads.setMaxThreadCount(max_workers)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._pending = set()
+
+    @staticmethod
+    def _key(path):
+        st = os.stat(path)
+        return path, st.st_mtime_ns, st.st_size
+
+    def load(self, path, on_loaded, on_failed=None):
+        """
+        Prepare `path` in the background; callbacks run on the GUI thread.
+        A cached result for an unchanged file is delivered synchronously.
+        """
+        try:
+            key = self._key(path)
+        except OSError as exc:
+            if on_failed is not None:
+                on_failed(exc)
+            return
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            on_loaded(cached)
+            return
+
+        signals = _LoadSignals()
+        signals.loaded.connect(lambda result: self._remember(key, result, signals))
+        signals.loaded.connect(on_loaded)
+        signals.failed.connect(lambda exc: self._pending.discard(signals))
+        if on_failed is not None:
+            signals.failed.connect(on_failed)
+        self._pending.add(signals)  # keeps the signal object alive until delivery
+        self._threads.start(_LoadTask(path, signals))
+
+    def _remember(self, key, result, signals):
+        self._pending.discard(signals)
+        self._cache[key] = result
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def wait(self, timeout_ms=-1):
+        return self._threads.waitForDone(timeout_ms)
@@ -1,8 +1,10 @@
+import os
 import sys
 from dataclasses import dataclass
+from urllib.parse import urlencode
 
-from PyQt5.QtCore import Qt, QCoreApplication
-from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt, QCoreApplication, QTimer, QAbstractListModel, QModelIndex, QPointF, QRect, QSize
+from PyQt5.QtGui import QFont, QColor, QPen, QPainter, QPixmap, QFontMetrics, QTextCharFormat, QTextCursor
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -15,17 +17,26 @@ from PyQt5.QtWidgets import (
     QLineEdit,
     QTextEdit,
     QProgressBar,
-    QScrollArea,
+    QListView,
+    QStyledItemDelegate,
     QFileDialog,
     QFrame,
     QSizePolicy,
 )
 
+from api_client import API_URL, ApiClient, ApiError
+from image_loader import ImageLoader
+from local_store import LocalStore, OutboxSync, default_path
+from push_client import PushClient
+
 
 # ============================================================
 #  APP STATE
 # ============================================================
 
+_UNSET = object()
+
+
 @dataclass
 class AppState:
     # Login + user info
@@ -33,16 +44,19 @@ class AppState:
     current_company: str = ""
     current_role: str = "consumer"  # "business" or "consumer"
 
-    # AI usage
-    max_prompts_per_day: int = 8
+    # AI usage; the limits are replaced by the backend's /policies/limits
+    max_prompts_per_day: int = 7
     prompts_used_today: int = 0
     current_asi: float = 100.0
+    asi_history: list = None  # ASI per point of the dashboard trend, oldest first
+    asi_rank_line: str = ""
     prompt_limit_message: str = ""
     asi_interpretation: str = "Using AI sparingly today."
 
     # Sustainability index
     selected_image_path: str = ""
     selected_image_name: str = "No image selected"
+    selected_image_thumbnail: object = None  # QImage preview, set once prepared
     last_index_score: float = 0.0
     index_daily_limit: int = 1
     index_uses_today: int = 0
@@ -64,8 +78,13 @@ class AppState:
     daily_tip: str = "Try solving a task manually first, then refine with AI."
     forum_highlight: str = "“How many prompts per day feels right?”"
 
+    # Chat: {"role": "user" | "model", "text": ...} dicts, oldest first
+    chat_messages: list = None
+    chat_status: str = ""
+
     # News + forum
     news_items: list = None
+    news_since: int = 0  # largest backend news id received so far
     forum_threads: list = None
 
     def __post_init__(self):
@@ -84,6 +103,31 @@ class AppState:
             ]
         if self.forum_threads is None:
             self.forum_threads = []
+        if self.chat_messages is None:
+            self.chat_messages = []
+        if self.asi_history is None:
+            self.asi_history = []
+
+    # --- change notification ---------------------------------
+    # Every field assignment notifies subscribers with the field name, so
+    # the UI only refreshes screens bound to what actually changed.
+    # In-place mutations (e.g. forum_threads.insert) call notify() themselves.
+
+    def __setattr__(self, name, value):
+        old = self.__dict__.get(name, _UNSET)
+        super().__setattr__(name, value)
+        if old is value or (not isinstance(value, list) and old == value):
+            return
+        self.notify(name)
+
+    def subscribe(self, callback):
+        self.__dict__.setdefault("_listeners", []).append(callback)
+
+    def notify(self, *fields):
+        listeners = self.__dict__.get("_listeners", ())
+        for name in fields:
+            for callback in listeners:
+                callback(name)
 
     @property
     def current_user_label(self) -> str:
@@ -91,6 +135,40 @@ class AppState:
         return f"{base} ({self.current_role.capitalize()})"
 
 
+# Fields saved to the local store on change and restored at startup.
+# Daily fields are only restored on the day they were written.
+PERSISTED_FIELDS = frozenset({
+    "current_username",
+    "current_company",
+    "current_role",
+    "prompts_used_today",
+    "current_asi",
+    "asi_interpretation",
+    "index_uses_today",
+    "last_index_score",
+    "index_score_line",
+    "index_score_interpretation",
+    "forum_highlight",
+    "news_since",
+    "max_prompts_per_day",
+    "index_daily_limit",
+})
+DAILY_FIELDS = frozenset({
+    "prompts_used_today",
+    "current_asi",
+    "asi_interpretation",
+    "index_uses_today",
+})
+
+# Collections read from the local store the first time their page opens:
+# page name -> (AppState field, stored newest first on the page)
+LAZY_COLLECTIONS = {
+    "forum": ("forum_threads", True),
+    "news": ("news_items", True),
+    "chat": ("chat_messages", False),
+}
+
+
 # ============================================================
 #  REUSABLE WIDGETS
 # ============================================================
@@ -106,6 +184,11 @@ class CardFrame(QFrame):
 
 
 class SustainTopBar(QWidget):
+    bound_fields = frozenset({
+        "current_username",
+        "current_role",
+    })
+
     def __init__(self, app_state: AppState, get_context_title, parent=None):
         super().__init__(parent)
         self.app_state = app_state
@@ -156,6 +239,7 @@ class SustainSideNav(QWidget):
 
         add_btn("Dashboard", "dashboard")
         add_btn("AI Usage & ASI", "ai_usage")
+        add_btn("Chat", "chat")
         add_btn("Product / Waste Index", "sustain_index")
         add_btn("News", "news")
         add_btn("Forum", "forum")
@@ -172,39 +256,182 @@ class SustainSideNav(QWidget):
         layout.addWidget(logout_btn)
 
 
-class NewsItemWidget(CardFrame):
-    def __init__(self, title, summary, source, parent=None):
-        super().__init__(parent, vertical_expanding=False)
-        layout = QVBoxLayout(self)
-        layout.setSpacing(4)
+class CardListModel(QAbstractListModel):
+    """
+    Read-only list model over a list of dicts from AppState (plus optional
+    fixed rows after it). Rows are painted by CardItemDelegate, so there
+    is no widget per item no matter how long the list gets.
+    """
 
-        t = QLabel(f"<b>{title}</b>")
-        s = QLabel(summary)
-        s.setWordWrap(True)
-        src = QLabel(f"Source: {source}")
-        src.setStyleSheet("font-size: 9pt; color: #666666;")
+    TitleRole = Qt.UserRole + 1
+    MetaRole = Qt.UserRole + 2
+    BodyRole = Qt.UserRole + 3
 
-        layout.addWidget(t)
-        layout.addWidget(s)
-        layout.addWidget(src)
+    def __init__(self, items, body_key, meta_format, tail=(), parent=None):
+        super().__init__(parent)
+        self._items = items
+        self._tail = list(tail)
+        self._count = len(items)  # rows the views have been told about
+        self._body_key = body_key
+        self._meta_format = meta_format
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count + len(self._tail)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        item = self._items[row] if row < self._count else self._tail[row - self._count]
+        if role in (Qt.DisplayRole, self.TitleRole):
+            return item["title"]
+        if role == self.MetaRole:
+            return self._meta_format.format(**item)
+        if role in (self.BodyRole, Qt.ToolTipRole):
+            return item[self._body_key]
+        return None
+
+    def prepend(self, item):
+        """Insert at the top; only the new row is announced to the views."""
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._items.insert(0, item)
+        self._count += 1
+        self.endInsertRows()
+
+    def sync(self, items):
+        """Catch up with `items` after it changed outside prepend()."""
+        if items is self._items and len(items) >= self._count:
+            added = len(items) - self._count
+            if added:
+                # lists are newest-first, so anything new is at the front
+                self.beginInsertRows(QModelIndex(), 0, added - 1)
+                self._count = len(items)
+                self.endInsertRows()
+            return
+        self.beginResetModel()
+        self._items = items
+        self._count = len(items)
+        self.endResetModel()
 
 
-class ForumThreadItemWidget(CardFrame):
-    def __init__(self, title, author, body, parent=None):
-        super().__init__(parent, vertical_expanding=False)
-        layout = QVBoxLayout(self)
-        layout.setSpacing(4)
+class CardItemDelegate(QStyledItemDelegate):
+    """Paints a CardListModel row as a card: title, meta line and body."""
+
+    BODY_LINES = 2
+    PADDING = 10
+    SPACING = 4
+
+    def __init__(self, meta_below_body=False, parent=None):
+        super().__init__(parent)
+        self.meta_below_body = meta_below_body
+
+        self.title_font = QFont()
+        self.title_font.setBold(True)
+        self.meta_font = QFont()
+        self.meta_font.setPointSize(9)
+        self.body_font = QFont()
+
+        self.title_h = QFontMetrics(self.title_font).height()
+        self.meta_h = QFontMetrics(self.meta_font).height()
+        self.body_fm = QFontMetrics(self.body_font)
+        self.body_h = self.body_fm.height() * self.BODY_LINES
+
+    def sizeHint(self, option, index):
+        # uniform height, so the view never has to measure every row
+        h = 2 * self.PADDING + self.title_h + self.meta_h + self.body_h + 2 * self.SPACING
+        return QSize(option.rect.width(), h)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        card = option.rect.adjusted(1, 1, -1, -1)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setPen(QPen(QColor("#E8E8E8")))
+        painter.setBrush(QColor("white"))
+        painter.drawRoundedRect(card, 8, 8)
+
+        x = card.left() + self.PADDING
+        w = card.width() - 2 * self.PADDING
+        y = card.top() + self.PADDING
+
+        painter.setPen(QColor("#333333"))
+        painter.setFont(self.title_font)
+        painter.drawText(QRect(x, y, w, self.title_h), Qt.AlignLeft | Qt.AlignVCenter,
+                         index.data(CardListModel.TitleRole))
+        y += self.title_h + self.SPACING
+
+        meta = index.data(CardListModel.MetaRole)
+        body = self.body_fm.elidedText(
+            index.data(CardListModel.BodyRole), Qt.ElideRight, w * self.BODY_LINES - self.body_fm.averageCharWidth() * 4
+        )
+        if self.meta_below_body:
+            y = self._draw_body(painter, x, y, w, body)
+            self._draw_meta(painter, x, y, w, meta)
+        else:
+            y = self._draw_meta(painter, x, y, w, meta)
+            self._draw_body(painter, x, y, w, body)
+        painter.restore()
+
+    def _draw_meta(self, painter, x, y, w, text):
+        painter.setPen(QColor("#666666"))
+        painter.setFont(self.meta_font)
+        painter.drawText(QRect(x, y, w, self.meta_h), Qt.AlignLeft | Qt.AlignVCenter, text)
+        return y + self.meta_h + self.SPACING
+
+    def _draw_body(self, painter, x, y, w, text):
+        painter.setPen(QColor("#333333"))
+        painter.setFont(self.body_font)
+        painter.drawText(QRect(x, y, w, self.body_h), Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap, text)
+        return y + self.body_h + self.SPACING
+
+
+class TrendChart(QWidget):
+    """A line of values (0..maximum), scaled to the widget; no axes."""
+
+    def __init__(self, maximum=100.0, parent=None):
+        super().__init__(parent)
+        self.maximum = maximum
+        self._values = []
+        self.setMinimumHeight(48)
+
+    def set_values(self, values):
+        self._values = list(values)
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self._values) < 2:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setPen(QPen(QColor("#4CAF50"), 2))
+        w, h = self.width() - 4, self.height() - 4
+        dx = w / (len(self._values) - 1)
+        points = [
+            QPointF(2 + i * dx, 2 + h * (1 - min(max(v / self.maximum, 0.0), 1.0)))
+            for i, v in enumerate(self._values)
+        ]
+        painter.drawPolyline(*points)
+        painter.end()
+
 
-        t = QLabel(f"<b>{title}</b>")
-        a = QLabel(f"By {author}")
-        a.setStyleSheet("font-size: 9pt; color: #666666;")
-        b = QLabel(body)
-        b.setWordWrap(True)
+def make_card_list_view(model, delegate, spacing):
+    view = QListView()
+    view.setModel(model)
+    view.setItemDelegate(delegate)
+    view.setUniformItemSizes(True)
+    view.setSelectionMode(QListView.NoSelection)
+    view.setVerticalScrollMode(QListView.ScrollPerPixel)
+    view.setSpacing(spacing // 2)
+    # Qt relayouts every row on insert/reset; in batches it never blocks
+    # the event loop for more than a few ms, even with 100k rows
+    view.setLayoutMode(QListView.Batched)
+    view.setBatchSize(2000)
+    return view
 
 
-        layout.addWidget(t)
-        layout.addWidget(a)
-        layout.addWidget(b)
+def index_limit_text(per_day):
+    if per_day == 1:
+        return "Limit: once per day"
+    return f"Limit: {per_day} times per day"
 
 
 # ============================================================
@@ -212,6 +439,22 @@ class ForumThreadItemWidget(CardFrame):
 # ============================================================
 
 class DashboardScreen(QWidget):
+    TREND_POINTS = 84  # last 7 days, two-hourly
+
+    bound_fields = frozenset({
+        "dashboard_subtitle",
+        "max_prompts_per_day",
+        "prompts_used_today",
+        "current_asi",
+        "asi_history",
+        "asi_rank_line",
+        "sustain_box_title",
+        "sustain_box_description",
+        "sustain_score_line",
+        "daily_tip",
+        "forum_highlight",
+    })
+
     def __init__(self, app_state: AppState, parent=None):
         super().__init__(parent)
         self.app_state = app_state
@@ -259,6 +502,13 @@ class DashboardScreen(QWidget):
         u_layout.addWidget(self.prompts_bar)
         u_layout.addWidget(self.asi_bar)
 
+        # ASI over the last days, from the backend's /history
+        self.asi_trend = TrendChart()
+        u_layout.addWidget(self.asi_trend)
+        self.rank_label = QLabel("")
+        self.rank_label.setAlignment(Qt.AlignCenter)
+        u_layout.addWidget(self.rank_label)
+
         self.sustain_card = CardFrame()
         s_layout = QVBoxLayout(self.sustain_card)
         s_layout.setSpacing(6)
@@ -335,6 +585,8 @@ class DashboardScreen(QWidget):
 
         self.asi_bar.setMaximum(100)
         self.asi_bar.setValue(int(st.current_asi))
+        self.asi_trend.set_values(st.asi_history)
+        self.rank_label.setText(st.asi_rank_line)
 
         self.sustain_title.setText(st.sustain_box_title)
         self.sustain_desc.setText(st.sustain_box_description)
@@ -345,6 +597,14 @@ class DashboardScreen(QWidget):
 
 
 class AIUsageScreen(QWidget):
+    bound_fields = frozenset({
+        "max_prompts_per_day",
+        "prompts_used_today",
+        "prompt_limit_message",
+        "current_asi",
+        "asi_interpretation",
+    })
+
     def __init__(self, app_state: AppState, on_simulate_use, on_reset, parent=None):
         super().__init__(parent)
         self.app_state = app_state
@@ -442,7 +702,206 @@ class AIUsageScreen(QWidget):
         self.asi_interp_label.setText(st.asi_interpretation)
 
 
+class ChatScreen(QWidget):
+    """
+    Chat transcript kept in one QTextDocument that is only ever appended to
+    (or prepended to, when an older page is loaded) with cursor inserts.
+    Streamed reply text is buffered and written at most once per frame.
+    """
+
+    bound_fields = frozenset({
+        "chat_status",
+        "current_asi",
+    })
+
+    PAGE_SIZE = 200
+    FRAME_MS = 16
+    ROLE_LABELS = {"user": "You", "model": "sustAIn"}
+
+    def __init__(self, app_state: AppState, on_send, parent=None):
+        super().__init__(parent)
+        self.app_state = app_state
+        self.on_send = on_send
+
+        root = QVBoxLayout(self)
+        root.setContentsMargins(16, 12, 16, 12)
+        root.setSpacing(8)
+
+        title = QLabel("Chat")
+        title.setStyleSheet("font-size: 15pt; font-weight: bold;")
+        root.addWidget(title)
+
+        self.transcript = QTextEdit()
+        self.transcript.setReadOnly(True)
+        self.document = self.transcript.document()
+        self.document.setUndoRedoEnabled(False)
+        self.transcript.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        root.addWidget(self.transcript)
+        root.setStretchFactor(self.transcript, 1)
+
+        self.counter_label = QLabel("")
+        self.counter_label.setStyleSheet("color: #555555; font-size: 9pt;")
+        root.addWidget(self.counter_label)
+
+        input_row = QHBoxLayout()
+        self.message_input = QLineEdit()
+        self.message_input.setPlaceholderText("Ask something...")
+        self.message_input.returnPressed.connect(self.send_clicked)
+        input_row.addWidget(self.message_input, 1)
+        self.send_btn = QPushButton("Send")
+        self.send_btn.clicked.connect(self.send_clicked)
+        input_row.addWidget(self.send_btn)
+        root.addLayout(input_row)
+
+        self._role_format = QTextCharFormat()
+        self._role_format.setFontWeight(QFont.Bold)
+        self._text_format = QTextCharFormat()
+
+        # index into chat_messages of the oldest message in the document
+        self._first_loaded = len(self.app_state.chat_messages)
+        self._reply_cursor = None
+        self._reply_parts = []
+        self._pending = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(self.FRAME_MS)
+        self._flush_timer.timeout.connect(self._flush_pending)
+
+        self.refresh()
+
+    # --- transcript -------------------------------------------
+
+    def _insert_message(self, cursor, role, text):
+        cursor.insertText(f"{self.ROLE_LABELS.get(role, role)}: ", self._role_format)
+        cursor.insertText(text, self._text_format)
+
+    def _at_bottom(self):
+        bar = self.transcript.verticalScrollBar()
+        return bar.value() >= bar.maximum() - 4
+
+    def _scroll_to_bottom(self):
+        bar = self.transcript.verticalScrollBar()
+        bar.setValue(bar.maximum())
+
+    def _end_cursor(self):
+        cursor = QTextCursor(self.document)
+        cursor.movePosition(QTextCursor.End)
+        if not self.document.isEmpty():
+            cursor.insertBlock()
+        return cursor
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.document.isEmpty() and self._first_loaded:
+            self.load_earlier_page()
+            self._scroll_to_bottom()
+
+    def load_earlier_page(self):
+        """Prepend the previous page of history, keeping the view where it was."""
+        if self._first_loaded == 0:
+            return
+        start = max(0, self._first_loaded - self.PAGE_SIZE)
+        page = self.app_state.chat_messages[start:self._first_loaded]
+        bar = self.transcript.verticalScrollBar()
+        old_max, old_value = bar.maximum(), bar.value()
+
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.Start)
+        was_empty = self.document.isEmpty()
+        for i, msg in enumerate(page):
+            self._insert_message(cursor, msg["role"], msg["text"])
+            if i < len(page) - 1 or not was_empty:
+                cursor.insertBlock()
+        cursor.endEditBlock()
+        self._first_loaded = start
+
+        bar.setValue(old_value + bar.maximum() - old_max)
+
+    def reset_history(self):
+        """Start over from chat_messages, e.g. after it was loaded from disk."""
+        self.document.clear()
+        self._first_loaded = len(self.app_state.chat_messages)
+        if self.isVisible():
+            self.load_earlier_page()
+            self._scroll_to_bottom()
+
+    def _on_scrolled(self, value):
+        if value == 0 and self._first_loaded and not self.document.isEmpty():
+            self.load_earlier_page()
+
+    def append_message(self, role, text):
+        stick = self._at_bottom()
+        self._insert_message(self._end_cursor(), role, text)
+        if stick:
+            self._scroll_to_bottom()
+
+    # --- streamed reply ---------------------------------------
+
+    def begin_reply(self):
+        self.send_btn.setEnabled(False)
+        cursor = self._end_cursor()
+        cursor.insertText(f"{self.ROLE_LABELS['model']}: ", self._role_format)
+        cursor.setCharFormat(self._text_format)
+        self._reply_cursor = cursor
+        self._reply_parts = []
+        self._scroll_to_bottom()
+
+    def append_delta(self, text):
+        self._pending.append(text)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush_pending(self):
+        if not self._pending or self._reply_cursor is None:
+            return
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._reply_parts.append(text)
+        stick = self._at_bottom()
+        self._reply_cursor.insertText(text)
+        if stick:
+            self._scroll_to_bottom()
+        streamed = sum(len(part) for part in self._reply_parts)
+        self.counter_label.setText(f"Receiving... ~{max(1, streamed // 4)} tokens")
+
+    def end_reply(self, note=""):
+        """Finish the streamed reply; returns its full text."""
+        self._flush_timer.stop()
+        self._flush_pending()
+        if note and self._reply_cursor is not None:
+            self._reply_cursor.insertText(f" [{note}]")
+        self._reply_cursor = None
+        self.send_btn.setEnabled(True)
+        self.refresh()
+        return "".join(self._reply_parts)
+
+    def send_clicked(self):
+        text = self.message_input.text().strip()
+        if not text or not self.send_btn.isEnabled():
+            return
+        self.message_input.clear()
+        self.on_send(text)
+
+    def refresh(self):
+        st = self.app_state
+        status = f" · {st.chat_status}" if st.chat_status else ""
+        self.counter_label.setText(f"ASI {st.current_asi:.1f}{status}")
+
+
 class SustainIndexScreen(QWidget):
+    bound_fields = frozenset({
+        "index_title",
+        "index_subtitle",
+        "index_form_label",
+        "selected_image_name",
+        "selected_image_thumbnail",
+        "index_limit_message",
+        "index_score_line",
+        "index_score_interpretation",
+        "index_usage_limit_description",
+    })
+
     def __init__(self, app_state: AppState, on_pick_image, on_compute_score, parent=None):
         super().__init__(parent)
         self.app_state = app_state
@@ -484,6 +943,13 @@ class SustainIndexScreen(QWidget):
         self.image_label.setStyleSheet("font-size: 9pt; color: #555555;")
         in_layout.addWidget(self.image_label)
 
+        self.thumbnail_label = QLabel("")
+        self.thumbnail_label.setFixedHeight(160)
+        self.thumbnail_label.setAlignment(Qt.AlignCenter)
+        self.thumbnail_label.hide()
+        in_layout.addWidget(self.thumbnail_label)
+        self._shown_thumbnail = None
+
         compute_btn = QPushButton("Compute Score")
         compute_btn.clicked.connect(self.compute_clicked)
         in_layout.addWidget(compute_btn)
@@ -540,6 +1006,14 @@ class SustainIndexScreen(QWidget):
         self.form_label.setText(st.index_form_label)
 
         self.image_label.setText(st.selected_image_name)
+        if st.selected_image_thumbnail is not self._shown_thumbnail:
+            self._shown_thumbnail = st.selected_image_thumbnail
+            if self._shown_thumbnail is None:
+                self.thumbnail_label.clear()
+                self.thumbnail_label.hide()
+            else:
+                self.thumbnail_label.setPixmap(QPixmap.fromImage(self._shown_thumbnail))
+                self.thumbnail_label.show()
         self.limit_label.setText(st.index_limit_message)
         self.score_line_label.setText(st.index_score_line)
         self.score_interp_label.setText(st.index_score_interpretation)
@@ -547,6 +1021,12 @@ class SustainIndexScreen(QWidget):
 
 
 class NewsScreen(QWidget):
+    bound_fields = frozenset({
+        "news_items",
+    })
+
+    FETCH_LIMIT = 200  # newest stories fetched per visit
+
     def __init__(self, app_state: AppState, parent=None):
         super().__init__(parent)
         self.app_state = app_state
@@ -559,33 +1039,37 @@ class NewsScreen(QWidget):
         title.setStyleSheet("font-size: 15pt; font-weight: bold;")
         root.addWidget(title)
 
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        self.container = QWidget()
-        self.container_layout = QVBoxLayout(self.container)
-        self.container_layout.setContentsMargins(0, 0, 0, 0)
-        self.container_layout.setSpacing(8)
-        scroll.setWidget(self.container)
-        root.addWidget(scroll)
-        root.setStretchFactor(scroll, 1)
-
-        self.refresh()
+        self.news_model = CardListModel(
+            self.app_state.news_items, body_key="summary", meta_format="Source: {source}"
+        )
+        self.news_view = make_card_list_view(
+            self.news_model, CardItemDelegate(meta_below_body=True), spacing=8
+        )
+        root.addWidget(self.news_view)
+        root.setStretchFactor(self.news_view, 1)
 
     def refresh(self):
-        while self.container_layout.count():
-            item = self.container_layout.takeAt(0)
-            w = item.widget()
-            if w:
-                w.deleteLater()
-
-        for item in self.app_state.news_items:
-            w = NewsItemWidget(item["title"], item["summary"], item["source"])
-            self.container_layout.addWidget(w)
-
-        self.container_layout.addStretch(1)
+        self.news_model.sync(self.app_state.news_items)
 
 
 class ForumScreen(QWidget):
+    bound_fields = frozenset({
+        "forum_threads",
+    })
+
+    MOCK_THREADS = (
+        {
+            "title": "How strict should prompt limits be?",
+            "author": "TechCo Lead",
+            "body": "We tested 8/day and saw better creativity.",
+        },
+        {
+            "title": "Tracking AI water usage",
+            "author": "Analyst",
+            "body": "Anyone converting token usage to water metrics?",
+        },
+    )
+
     def __init__(self, app_state: AppState, on_add_thread, parent=None):
         super().__init__(parent)
         self.app_state = app_state
@@ -606,15 +1090,16 @@ class ForumScreen(QWidget):
         tlayout_outer = QVBoxLayout(threads_card)
         tlayout_outer.setSpacing(4)
 
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        self.thread_container = QWidget()
-        self.thread_layout = QVBoxLayout(self.thread_container)
-        self.thread_layout.setContentsMargins(0, 0, 0, 0)
-        self.thread_layout.setSpacing(6)
-        scroll.setWidget(self.thread_container)
-
-        tlayout_outer.addWidget(scroll)
+        self.thread_model = CardListModel(
+            self.app_state.forum_threads,
+            body_key="body",
+            meta_format="By {author}",
+            tail=self.MOCK_THREADS,
+        )
+        self.thread_view = make_card_list_view(
+            self.thread_model, CardItemDelegate(), spacing=6
+        )
+        tlayout_outer.addWidget(self.thread_view)
 
         post_card = CardFrame()
         post_layout = QVBoxLayout(post_card)
@@ -653,36 +1138,9 @@ class ForumScreen(QWidget):
         self.on_add_thread(title, body)
         self.new_title_input.clear()
         self.new_body_input.clear()
-        self.refresh()
 
     def refresh(self):
-        while self.thread_layout.count():
-            item = self.thread_layout.takeAt(0)
-            w = item.widget()
-            if w:
-                w.deleteLater()
-
-        for t in self.app_state.forum_threads:
-            w = ForumThreadItemWidget(t["title"], t["author"], t["body"])
-            self.thread_layout.addWidget(w)
-
-        mock_threads = [
-            {
-                "title": "How strict should prompt limits be?",
-                "author": "TechCo Lead",
-                "body": "We tested 8/day and saw better creativity.",
-            },
-            {
-                "title": "Tracking AI water usage",
-                "author": "Analyst",
-                "body": "Anyone converting token usage to water metrics?",
-            },
-        ]
-        for t in mock_threads:
-            w = ForumThreadItemWidget(t["title"], t["author"], t["body"])
-            self.thread_layout.addWidget(w)
-
-        self.thread_layout.addStretch(1)
+        self.thread_model.sync(self.app_state.forum_threads)
 
 
 class SettingsScreen(QWidget):
@@ -900,9 +1358,24 @@ class RoleSelectScreen(QWidget):
 
 
 class AppFrame(QWidget):
-    def __init__(self, app_state: AppState, on_switch_role, on_logout, parent=None):
+    def __init__(self, app_state: AppState, on_switch_role, on_logout, api=None, store=None, push=None,
+                 parent=None):
         super().__init__(parent)
         self.app_state = app_state
+        # backend client; None runs the screens on local placeholders
+        self.api = api
+        # live quota / score updates from the backend; None without one
+        if push is not None:
+            push.update.connect(self._on_push_update)
+        # local persistence; None keeps everything in memory
+        self.store = store
+        self._loaded_collections = set()
+        self.outbox = OutboxSync(store, api, parent=self) if store is not None and api is not None else None
+        self.image_loader = ImageLoader(parent=self)
+        self._prepared_image = None
+        # image hashes the backend has already scored, sent without the image
+        self._scored_hashes = set()
+        self._index_description = ""
 
         root = QVBoxLayout(self)
         root.setContentsMargins(0, 0, 0, 0)
@@ -917,6 +1390,7 @@ class AppFrame(QWidget):
             name_map = {
                 "dashboard": "Dashboard",
                 "ai_usage": "AI Usage & ASI",
+                "chat": "Chat",
                 "sustain_index": "Product / Waste Index",
                 "news": "News",
                 "forum": "Forum",
@@ -950,6 +1424,10 @@ class AppFrame(QWidget):
         )
         self.ai_usage_screen.setObjectName("ai_usage")
 
+        self.chat_screen = ChatScreen(self.app_state, on_send=self.send_chat_message)
+        self.chat_screen.setObjectName("chat")
+        self._chat_session_id = None
+
         self.index_screen = SustainIndexScreen(
             self.app_state,
             on_pick_image=self.pick_image,
@@ -972,6 +1450,7 @@ class AppFrame(QWidget):
         for w in [
             self.dashboard_screen,
             self.ai_usage_screen,
+            self.chat_screen,
             self.index_screen,
             self.news_screen,
             self.forum_screen,
@@ -983,45 +1462,192 @@ class AppFrame(QWidget):
         root.addLayout(center)
         root.setStretchFactor(center, 1)
 
+        # Dirty tracking: state changes mark the bound widgets dirty; only
+        # the top bar and the visible screen are refreshed (once per event
+        # loop turn), hidden screens catch up when they are shown.
+        self._bound_widgets = [
+            self.topbar,
+            self.dashboard_screen,
+            self.ai_usage_screen,
+            self.chat_screen,
+            self.index_screen,
+            self.news_screen,
+            self.forum_screen,
+        ]
+        self._dirty = set()
+        self._flush_pending = False
+        self.app_state.subscribe(self._on_state_changed)
+
         self.set_current_page("dashboard")
+        if self.outbox is not None:
+            QTimer.singleShot(0, self.outbox.kick)  # deliver what was queued offline
 
     def set_current_page(self, name: str):
+        previous = self.inner_stack.currentWidget()
+        if self.api is not None and previous is not None and previous.objectName() != name:
+            # replies for a screen the user left are no longer wanted
+            self.api.cancel_tag(previous.objectName())
+        self._load_collection(name)
+        if name == "news":
+            self._fetch_news()
+        elif name == "dashboard":
+            self.fetch_dashboard_data()
         for i in range(self.inner_stack.count()):
             w = self.inner_stack.widget(i)
             if w.objectName() == name:
                 self.inner_stack.setCurrentIndex(i)
                 break
-        self.refresh_all()
+        self._dirty.add(self.topbar)  # context title follows the page
+        self.flush()
+
+    def _load_collection(self, page: str):
+        if self.store is None or page not in LAZY_COLLECTIONS or page in self._loaded_collections:
+            return
+        self._loaded_collections.add(page)
+        field, newest_first = LAZY_COLLECTIONS[page]
+        items = self.store.load_collection(field)
+        if not items:
+            return  # keep the built-in defaults
+        if newest_first:
+            items.reverse()
+        setattr(self.app_state, field, items)
+        if field == "chat_messages":
+            self.chat_screen.reset_history()
+
+    def _on_state_changed(self, field: str):
+        for w in self._bound_widgets:
+            if field in w.bound_fields:
+                self._dirty.add(w)
+        if self.store is not None and field in PERSISTED_FIELDS:
+            self.store.record_field(field, getattr(self.app_state, field))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if not self._flush_pending:
+            self._flush_pending = True
+            QTimer.singleShot(0, self.flush)
+
+    def flush(self):
+        """Refresh the dirty widgets that are currently on screen and save state."""
+        self._flush_pending = False
+        for w in (self.topbar, self.inner_stack.currentWidget()):
+            if w in self._dirty:
+                self._dirty.discard(w)
+                w.refresh()
+        if self.store is not None:
+            self.store.flush()
 
     def refresh_all(self):
-        self.dashboard_screen.refresh()
-        self.ai_usage_screen.refresh()
-        self.index_screen.refresh()
-        self.news_screen.refresh()
-        self.forum_screen.refresh()
-        self.topbar.refresh()
+        """Refresh every screen regardless of dirty state."""
+        self._dirty.clear()
+        for w in self._bound_widgets:
+            w.refresh()
 
     def simulate_prompt_use(self):
         st = self.app_state
+        if self.api is not None:
+            self.api.post_json(
+                "/chat",
+                self._with_profile({"user_id": st.current_username or "guest", "message": "Simulated prompt"}),
+                tag="ai_usage",
+                idempotent=True,
+                on_finished=self._on_chat_reply,
+                on_failed=self._on_chat_failed,
+            )
+            return
         if st.prompts_used_today >= st.max_prompts_per_day:
             st.prompt_limit_message = "Daily limit reached."
         else:
             st.prompts_used_today += 1
             st.prompt_limit_message = ""
         self._recompute_asi()
-        self.refresh_all()
+
+    def _on_chat_reply(self, data):
+        st = self.app_state
+        st.prompts_used_today = max(0, st.max_prompts_per_day - data["prompts_left"])
+        st.prompt_limit_message = ""
+        st.current_asi = data["ASI"]
+        self._interpret_asi()
+
+    def _on_push_update(self, data):
+        # any subset of the fields, e.g. after usage on another device
+        st = self.app_state
+        if "prompts_left" in data:
+            st.prompts_used_today = max(0, st.max_prompts_per_day - data["prompts_left"])
+        if "ASI" in data:
+            st.current_asi = data["ASI"]
+            self._interpret_asi()
+        if "uses_left" in data:
+            st.index_uses_today = max(0, st.index_daily_limit - data["uses_left"])
+        if "PSI" in data:
+            self._show_index_score(data["PSI"])
+
+    def _on_chat_failed(self, exc):
+        if isinstance(exc, ApiError) and exc.status == 429:
+            self.app_state.prompt_limit_message = "Daily limit reached."
+        else:
+            self.app_state.prompt_limit_message = f"Backend unavailable: {exc}"
+
+    def send_chat_message(self, text: str):
+        st = self.app_state
+        self._add_chat_message("user", text)
+        self.chat_screen.append_message("user", text)
+        if self.api is None:
+            st.chat_status = "Chat needs the backend: set SUSTAIN_API_URL."
+            return
+        self.chat_screen.begin_reply()
+        # not tagged: the prompt is charged once the reply streams, so
+        # leaving the screen must not throw the answer away
+        self.api.request(
+            "POST",
+            "/chat/stream",
+            json_body=self._with_profile({
+                "user_id": st.current_username or "guest",
+                "message": text,
+                "session_id": self._chat_session_id,
+            }),
+            on_chunk=lambda data: self.chat_screen.append_delta(data["delta"]),
+            on_finished=self._on_chat_stream_done,
+            on_failed=self._on_chat_stream_failed,
+        )
+
+    def _add_chat_message(self, role, text):
+        message = {"role": role, "text": text}
+        if self.store is not None:
+            self._load_collection("chat")
+            self.store.append("chat_messages", message)
+            self._schedule_flush()
+        self.app_state.chat_messages.append(message)
+
+    def _on_chat_stream_done(self, trailer):
+        st = self.app_state
+        reply = self.chat_screen.end_reply()
+        self._add_chat_message("model", reply)
+        self._chat_session_id = trailer["session_id"]
+        st.chat_status = f"{trailer['tokens_used']} tokens · {trailer['tokens_left']} left today"
+        self._on_chat_reply(trailer)
+
+    def _on_chat_stream_failed(self, exc):
+        st = self.app_state
+        reply = self.chat_screen.end_reply(note="interrupted")
+        if reply:
+            self._add_chat_message("model", reply)
+        st.chat_status = exc.detail if isinstance(exc, ApiError) else f"Backend unavailable: {exc}"
 
     def reset_prompt_usage(self):
         st = self.app_state
         st.prompts_used_today = 0
         st.prompt_limit_message = ""
         self._recompute_asi()
-        self.refresh_all()
 
     def _recompute_asi(self):
         st = self.app_state
         ratio = st.prompts_used_today / float(st.max_prompts_per_day)
         st.current_asi = max(0, 100 * (1 - min(1, ratio)))
+        self._interpret_asi()
+
+    def _interpret_asi(self):
+        st = self.app_state
         if st.current_asi > 70:
             st.asi_interpretation = "Using AI sparingly today."
         elif st.current_asi > 40:
@@ -1037,18 +1663,79 @@ class AppFrame(QWidget):
             "Images (*.png *.jpg *.jpeg)",
         )
         if path:
-            self.app_state.selected_image_path = path
-            self.app_state.selected_image_name = path.split("/")[-1]
-        self.refresh_all()
+            st = self.app_state
+            st.selected_image_path = path
+            st.selected_image_name = path.split("/")[-1]
+            st.selected_image_thumbnail = None
+            st.index_limit_message = "Preparing image..."
+            self._prepared_image = None
+            self.image_loader.load(path, self._on_image_prepared, self._on_image_failed)
+
+    def _on_image_prepared(self, prepared):
+        st = self.app_state
+        if prepared.path != st.selected_image_path:
+            return  # another image was picked meanwhile
+        self._prepared_image = prepared
+        st.selected_image_thumbnail = prepared.thumbnail
+        st.index_limit_message = ""
+
+    def _on_image_failed(self, exc):
+        st = self.app_state
+        st.selected_image_path = ""
+        st.selected_image_name = "No image selected"
+        st.index_limit_message = str(exc)
 
     def compute_sustainability_score(self, materials: str, tech: str):
         st = self.app_state
         if not st.selected_image_path:
             st.index_limit_message = "Please upload an image first."
-            self.refresh_all()
             return
 
-        score = 60  # placeholder
+        if self.api is not None:
+            prepared = self._prepared_image
+            if prepared is None:
+                st.index_limit_message = "Still preparing the image..."
+                return
+            st.index_limit_message = "Scoring..."
+            # the backend folds the materials it recognises into the PSI
+            self._index_description = " ".join(part.strip() for part in (materials, tech) if part.strip())
+            self._request_index_score(prepared, send_image=prepared.sha256 not in self._scored_hashes)
+            return
+
+        self._show_index_score(60)  # placeholder
+
+    def _request_index_score(self, prepared, send_image):
+        name = os.path.splitext(os.path.basename(prepared.path))[0] + ".jpg"
+        files = {"image": (name, prepared.upload, "image/jpeg")} if send_image else {}
+        fields = self._with_profile({"image_sha256": prepared.sha256})
+        if self._index_description:
+            fields["description"] = self._index_description
+        self.api.post_multipart(
+            f"/gradcam/{self.app_state.current_username or 'guest'}",
+            fields=fields,
+            files=files,
+            tag="sustain_index",
+            idempotent=True,
+            on_finished=lambda data: self._on_index_scored(prepared, data),
+            on_failed=lambda exc: self._on_index_failed(exc, prepared, send_image),
+        )
+
+    def _on_index_scored(self, prepared, data):
+        self._scored_hashes.add(prepared.sha256)
+        self._show_index_score(data["PSI"])
+
+    def _on_index_failed(self, exc, prepared, sent_image):
+        if isinstance(exc, ApiError) and exc.status == 404 and not sent_image:
+            # the backend no longer has the score (restart, eviction): upload after all
+            self._scored_hashes.discard(prepared.sha256)
+            self._request_index_score(prepared, send_image=True)
+        elif isinstance(exc, ApiError) and exc.status == 429:
+            self.app_state.index_limit_message = "Daily limit reached."
+        else:
+            self.app_state.index_limit_message = f"Backend unavailable: {exc}"
+
+    def _show_index_score(self, score):
+        st = self.app_state
         st.last_index_score = score
         st.index_score_line = f"Sustainability Score: {score}/100"
 
@@ -1061,22 +1748,107 @@ class AppFrame(QWidget):
         st.index_score_interpretation = interpretation
         st.index_limit_message = ""
 
-        self.refresh_all()
+    def _with_profile(self, payload):
+        # company history and the company / role limit policy on the backend
+        st = self.app_state
+        if st.current_company:
+            payload["company"] = st.current_company
+        payload["role"] = st.current_role
+        return payload
+
+    def fetch_limits(self):
+        """The daily limits of this company and role, as the backend enforces them."""
+        if self.api is None:
+            return
+        query = urlencode(self._with_profile({}))
+        self.api.get(
+            f"/policies/limits?{query}",
+            tag="limits",
+            on_finished=self._on_limits,
+            on_failed=lambda exc: None,  # keep the last known limits
+        )
+
+    def _on_limits(self, data):
+        st = self.app_state
+        st.max_prompts_per_day = data["max_prompts_per_day"]
+        st.index_daily_limit = data["max_gradcam_per_day"]
+        st.index_usage_limit_description = index_limit_text(st.index_daily_limit)
+
+    def fetch_dashboard_data(self):
+        """ASI trend and leaderboard rank; both optional."""
+        if self.api is None:
+            return
+        user_id = self.app_state.current_username or "guest"
+        query = urlencode({"user_id": user_id, "points": DashboardScreen.TREND_POINTS})
+        self.api.get(
+            f"/history?{query}",
+            tag="dashboard",
+            on_finished=self._on_asi_history,
+            on_failed=lambda exc: None,
+        )
+        self.api.get(
+            f"/leaderboard/rank?{urlencode({'user_id': user_id})}",
+            tag="dashboard",
+            on_finished=self._on_asi_rank,
+            on_failed=lambda exc: None,  # 404 until the first charged prompt
+        )
+
+    def _on_asi_history(self, data):
+        self.app_state.asi_history = [p["asi"] for p in data["points"] if p["asi"] is not None]
+
+    def _on_asi_rank(self, data):
+        user = data["user"]
+        line = f"Rank #{user['rank']} of {user['total']}"
+        company = data["company"]
+        if company is not None:
+            line += f" · {company['company']}: #{company['rank']} of {company['total']} companies"
+        self.app_state.asi_rank_line = line
+
+    def _fetch_news(self):
+        if self.api is None:
+            return
+        # only what the backend stored since the last visit
+        self.api.get(
+            f"/news?since={self.app_state.news_since}&limit={NewsScreen.FETCH_LIMIT}",
+            tag="news",
+            on_finished=self._on_news_fetched,
+            on_failed=lambda exc: None,  # keep showing what we have
+        )
+
+    def _on_news_fetched(self, data):
+        st = self.app_state
+        items = data["items"]  # oldest first
+        if not items:
+            return
+        if self.store is not None:
+            for item in items:
+                self.store.append("news_items", item)
+            self._schedule_flush()
+        if st.news_since == 0:
+            st.news_items = items[::-1]  # the first real stories replace the samples
+        else:
+            st.news_items[0:0] = items[::-1]
+            st.notify("news_items")
+        st.news_since = data["next_since"]
 
     def add_forum_thread(self, title: str, body: str):
         if not title.strip() or not body.strip():
             return
         st = self.app_state
-        st.forum_threads.insert(
-            0,
-            {
-                "title": title.strip(),
-                "author": st.current_user_label,
-                "body": body.strip(),
-            },
-        )
+        thread = {
+            "title": title.strip(),
+            "author": st.current_user_label,
+            "body": body.strip(),
+        }
+        self.forum_screen.thread_model.prepend(thread)
+        st.notify("forum_threads")
+        if self.store is not None:
+            # saved locally first; the outbox posts it once the backend is reachable
+            outbox = ("POST", "/forum/threads", thread) if self.outbox is not None else None
+            self.store.append("forum_threads", thread, outbox=outbox)
+            if self.outbox is not None:
+                self.outbox.kick()
         st.forum_highlight = f"“{title.strip()}”"
-        self.refresh_all()
 
 
 # ============================================================
@@ -1087,6 +1859,12 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.app_state = AppState()
+        self.api = ApiClient(API_URL, parent=self) if API_URL else None
+        self.push = PushClient(API_URL, parent=self) if API_URL else None
+        self.store = LocalStore(default_path())
+        for name, value in self.store.restore_fields(daily=DAILY_FIELDS).items():
+            if name in PERSISTED_FIELDS:
+                setattr(self.app_state, name, value)
         self._update_role_text()
         self._update_index_text()
 
@@ -1102,6 +1880,9 @@ class MainWindow(QMainWindow):
             self.app_state,
             on_switch_role=self.show_role_select,
             on_logout=self.show_login,
+            api=self.api,
+            store=self.store,
+            push=self.push,
         )
 
         self.root_stack.addWidget(self.login_screen)        # 0
@@ -1129,16 +1910,18 @@ class MainWindow(QMainWindow):
             st.index_form_label = "Product description"
             st.index_materials_hint = "Materials (plastic, aluminum, cardboard...)"
             st.index_tech_hint = "Tech parts (battery, PCB...)"
-            st.index_usage_limit_description = "Limit: once per day"
+            st.index_usage_limit_description = index_limit_text(st.index_daily_limit)
         else:
             st.index_title = "Waste Sustainability Index"
             st.index_subtitle = "Describe the waste item."
             st.index_form_label = "Waste description"
             st.index_materials_hint = "Plastic bottle, cardboard box..."
             st.index_tech_hint = "Any electronics?"
-            st.index_usage_limit_description = "Limit: once per day"
+            st.index_usage_limit_description = index_limit_text(st.index_daily_limit)
 
     def show_login(self):
+        if self.push is not None:
+            self.push.close()
         self.root_stack.setCurrentWidget(self.login_screen)
 
     def show_role_select(self):
@@ -1146,12 +1929,17 @@ class MainWindow(QMainWindow):
 
     def show_app_frame(self):
         self.root_stack.setCurrentWidget(self.app_frame)
-        self.app_frame.refresh_all()
+        # for the user (and role) just selected
+        self.app_frame.fetch_limits()
+        self.app_frame.fetch_dashboard_data()
+        self.app_frame.flush()
 
     def handle_login(self, username: str, company: str):
         st = self.app_state
         st.current_username = username.strip()
         st.current_company = company.strip()
+        if self.push is not None:
+            self.push.connect_user(st.current_username or "guest")
         self.show_role_select()
 
     def handle_role_select(self, role: str):
@@ -1161,6 +1949,14 @@ class MainWindow(QMainWindow):
         self._update_index_text()
         self.show_app_frame()
 
+    def closeEvent(self, event):
+        if self.push is not None:
+            self.push.close()
+        if self.api is not None:
+            self.api.shutdown()
+        self.store.close()
+        super().closeEvent(event)
+
 
 # ============================================================
 #  GLOBAL THEME
@@ -1213,7 +2009,7 @@ SUSTAIN_THEME_QSS = """
         border-radius: 4px;
     }
 
-    QScrollArea {
+    QListView {
         border: none;
         background: transparent;
     }
@@ -1236,6 +2032,7 @@ def main():
     QCoreApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
 
     app = QApplication(sys.argv)
+    app.setApplicationName("sustAIn")  # names the per-user data directory
 
     base_font = QFont()
     base_font.setPointSize(11)
@@ -0,0 +1,89 @@
+"""
+Live quota and score updates from the backend's /ws endpoint.
+
+The backend pushes a JSON object whenever the signed-in user's quota or
+scores change: a full snapshot right after connecting, then only the
+fields an action changed (prompts_left, tokens_left, ASI, PSI,
+uses_left). This is how usage from another device shows up without
+polling.
+
+PushClient keeps one WebSocket open for the current user and emits each
+object as `update` on the GUI thread. A dropped connection (backend
+restart, network loss, or the backend closing a slow consumer) is
+reopened with exponential backoff; the snapshot sent on reconnect covers
+whatever was missed.
+"""
+
+import json
+from urllib.parse import quote, urlsplit, urlunsplit
+
+from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt5.QtNetwork import QAbstractSocket
+from PyQt5.QtWebSockets import QWebSocket
+
+
+def push_url(base_url):
+    """ws(s):// URL of the push endpoint for an http(s):// API URL."""
+    parts = urlsplit(base_url)
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    return urlunsplit((scheme, parts.netloc, parts.path.rstrip("/") + "/ws", "", ""))
+
+
+class PushClient(QObject):
+    update = pyqtSignal(object)  # one decoded update
+
+    RETRY_MS = (1000, 60000)
+
+    def __init__(self, base_url, parent=None):
+        super().__init__(parent)
+        self.url = push_url(base_url)
+        self.user_id = None
+        self.reconnects = 0
+        self._socket = QWebSocket(parent=self)
+        self._socket.textMessageReceived.connect(self._on_message)
+        self._socket.connected.connect(self._on_connected)
+        self._socket.disconnected.connect(self._on_disconnected)
+        # a refused connection reports an error but never "disconnected"
+        self._socket.error.connect(lambda _error: self._on_disconnected())
+        self._retry_ms = self.RETRY_MS[0]
+        self._retry = QTimer(self)
+        self._retry.setSingleShot(True)
+        self._retry.timeout.connect(self._open)
+
+    def connect_user(self, user_id):
+        """Follow `user_id` from now on; a no-op if it already does."""
+        if user_id == self.user_id and self._socket.state() != QAbstractSocket.UnconnectedState:
+            return
+        self.user_id = user_id
+        self._socket.abort()
+        # abort() may already have scheduled a retry for the old user
+        self._retry.stop()
+        self._retry_ms = self.RETRY_MS[0]
+        self._open()
+
+    def close(self):
+        self.user_id = None
+        self._retry.stop()
+        self._socket.close()
+
+    def _open(self):
+        if self.user_id is not None:
+            self._socket.open(QUrl(f"{self.url}?user_id={quote(self.user_id, safe='')}"))
+
+    def _on_connected(self):
+        self._retry_ms = self.RETRY_MS[0]
+
+    def _on_disconnected(self):
+        if self.user_id is None or self._retry.isActive():
+            return
+        self.reconnects += 1
+        self._retry.start(self._retry_ms)
+        self._retry_ms = min(self._retry_ms * 2, self.RETRY_MS[1])
+
+    def _on_message(self, text):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        if isinstance(data, dict):
+            self.update.emit(data)